@@ -0,0 +1,41 @@
+"""create generation jobs table
+
+Revision ID: 004_generation_jobs
+Revises: 003_merge_heads
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '004_generation_jobs'
+down_revision: Union[str, None] = '003_merge_heads'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'generation_jobs',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('summary_id', sa.String(), nullable=True),
+        sa.Column('job_type', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=True),
+        sa.Column('updated_at', sa.TIMESTAMP(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['summary_id'], ['post_summaries.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_generation_jobs_user_id', 'generation_jobs', ['user_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_generation_jobs_user_id', table_name='generation_jobs')
+    op.drop_table('generation_jobs')
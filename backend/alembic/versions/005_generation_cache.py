@@ -0,0 +1,35 @@
+"""create generation cache table
+
+Revision ID: 005_generation_cache
+Revises: 004_generation_jobs
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '005_generation_cache'
+down_revision: Union[str, None] = '004_generation_jobs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'generation_cache',
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('webhook', sa.String(length=255), nullable=False),
+        sa.Column('response', sa.Text(), nullable=False),
+        sa.Column('expires_at', sa.TIMESTAMP(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=True),
+        sa.PrimaryKeyConstraint('cache_key')
+    )
+    op.create_index('ix_generation_cache_expires_at', 'generation_cache', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_generation_cache_expires_at', table_name='generation_cache')
+    op.drop_table('generation_cache')
@@ -0,0 +1,49 @@
+"""create publish jobs table
+
+Revision ID: 006_publish_jobs
+Revises: 005_generation_cache
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '006_publish_jobs'
+down_revision: Union[str, None] = '005_generation_cache'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'publish_jobs',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('platform_post_id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('platform_name', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('available_at', sa.TIMESTAMP(), nullable=False),
+        sa.Column('locked_by', sa.String(length=100), nullable=True),
+        sa.Column('locked_at', sa.TIMESTAMP(), nullable=True),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=True),
+        sa.Column('updated_at', sa.TIMESTAMP(), nullable=True),
+        sa.ForeignKeyConstraint(['platform_post_id'], ['post_platforms.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_publish_jobs_platform_post_id', 'publish_jobs', ['platform_post_id'])
+    op.create_index('ix_publish_jobs_user_id', 'publish_jobs', ['user_id'])
+    op.create_index('ix_publish_jobs_claim', 'publish_jobs', ['status', 'platform_name', 'available_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_publish_jobs_claim', table_name='publish_jobs')
+    op.drop_index('ix_publish_jobs_user_id', table_name='publish_jobs')
+    op.drop_index('ix_publish_jobs_platform_post_id', table_name='publish_jobs')
+    op.drop_table('publish_jobs')
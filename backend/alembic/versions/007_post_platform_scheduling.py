@@ -0,0 +1,34 @@
+"""add scheduled_at to post_platforms with a partial due index
+
+Revision ID: 007_post_platform_scheduling
+Revises: 006_publish_jobs
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '007_post_platform_scheduling'
+down_revision: Union[str, None] = '006_publish_jobs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('post_platforms', sa.Column('scheduled_at', sa.TIMESTAMP(), nullable=True))
+    # Partial index: only unpublished, approved, scheduled rows are ever scanned
+    op.create_index(
+        'ix_post_platforms_due',
+        'post_platforms',
+        ['scheduled_at'],
+        postgresql_where=sa.text("published = false AND approved = true AND scheduled_at IS NOT NULL"),
+        sqlite_where=sa.text("published = 0 AND approved = 1 AND scheduled_at IS NOT NULL")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_post_platforms_due', table_name='post_platforms')
+    op.drop_column('post_platforms', 'scheduled_at')
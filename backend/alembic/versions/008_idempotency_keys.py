@@ -0,0 +1,61 @@
+"""create idempotency keys table and one active publish job per post
+
+Revision ID: 008_idempotency_keys
+Revises: 007_post_platform_scheduling
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '008_idempotency_keys'
+down_revision: Union[str, None] = '007_post_platform_scheduling'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('endpoint', sa.String(length=100), nullable=False),
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('request_hash', sa.String(length=64), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=True),
+        sa.Column('response', sa.Text(), nullable=True),
+        sa.Column('expires_at', sa.TIMESTAMP(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'endpoint', 'key', name='uq_idempotency_keys_scope')
+    )
+    op.create_index('ix_idempotency_keys_expires_at', 'idempotency_keys', ['expires_at'])
+
+    # Keep only the oldest active job per post before enforcing uniqueness
+    op.execute("""
+        UPDATE publish_jobs SET status = 'failed', error_message = 'Duplicate publish job'
+        WHERE status IN ('queued', 'running') AND id NOT IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY platform_post_id ORDER BY created_at, id) AS n
+                FROM publish_jobs WHERE status IN ('queued', 'running')
+            ) ranked WHERE n = 1
+        )
+    """)
+    op.create_index(
+        'uq_publish_jobs_active_post',
+        'publish_jobs',
+        ['platform_post_id'],
+        unique=True,
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+        sqlite_where=sa.text("status IN ('queued', 'running')")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_publish_jobs_active_post', table_name='publish_jobs')
+    op.drop_index('ix_idempotency_keys_expires_at', table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
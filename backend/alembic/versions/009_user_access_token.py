@@ -0,0 +1,37 @@
+"""add user_access_token to user_tokens for re-resolving facebook page tokens
+
+Revision ID: 009_user_access_token
+Revises: 008_idempotency_keys
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '009_user_access_token'
+down_revision: Union[str, None] = '008_idempotency_keys'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _user_token_columns():
+    # user_tokens is created by Base.metadata.create_all rather than an earlier revision
+    inspector = sa.inspect(op.get_bind())
+    if 'user_tokens' not in inspector.get_table_names():
+        return None
+    return {column['name'] for column in inspector.get_columns('user_tokens')}
+
+
+def upgrade() -> None:
+    columns = _user_token_columns()
+    if columns is not None and 'user_access_token' not in columns:
+        op.add_column('user_tokens', sa.Column('user_access_token', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    columns = _user_token_columns()
+    if columns is not None and 'user_access_token' in columns:
+        op.drop_column('user_tokens', 'user_access_token')
@@ -0,0 +1,37 @@
+"""create linkedin assets table for reusing uploaded images
+
+Revision ID: 010_linkedin_assets
+Revises: 009_user_access_token
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '010_linkedin_assets'
+down_revision: Union[str, None] = '009_user_access_token'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'linkedin_assets',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('member_urn', sa.String(length=100), nullable=False),
+        sa.Column('image_hash', sa.String(length=64), nullable=False),
+        sa.Column('asset_urn', sa.String(length=255), nullable=False),
+        sa.Column('expires_at', sa.TIMESTAMP(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('member_urn', 'image_hash', name='uq_linkedin_assets_member_image')
+    )
+    op.create_index('ix_linkedin_assets_expires_at', 'linkedin_assets', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_linkedin_assets_expires_at', table_name='linkedin_assets')
+    op.drop_table('linkedin_assets')
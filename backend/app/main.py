@@ -1,19 +1,49 @@
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from .database import get_db, engine
 from .models import Base
-from .routers import auth, posts, trends, oauth
+from .routers import auth, posts, trends, oauth, diagnostics, media
+from .services.n8n_client import n8n_client
+from .services.platform_http import platform_http
+from .services.blob_store import blob_store, image_store
+from .services.image_persistence import image_persister
+from .services.image_variants import image_variants
+from .services.publish_queue import publish_workers, PUBLISH_WORKERS_ENABLED
+from .services.publish_scheduler import publish_scheduler, PUBLISH_SCHEDULER_ENABLED
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared connection pools live for the whole process
+    await n8n_client.start()
+    await platform_http.start()
+    blob_store.load()
+    image_store.load()
+    image_variants.store.load()
+    image_persister.start()
+    if PUBLISH_WORKERS_ENABLED:
+        publish_workers.start()
+    if PUBLISH_SCHEDULER_ENABLED:
+        publish_scheduler.start()
+    yield
+    await image_persister.stop()
+    image_variants.close()
+    await publish_scheduler.stop()
+    await publish_workers.stop()
+    await platform_http.close()
+    await n8n_client.close()
+
 app = FastAPI(
     title="AI Content Generation Platform",
     description="Backend API for AI-powered content generation and multi-platform publishing",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -30,6 +60,8 @@ app.include_router(auth.router, prefix="/auth", tags=["authentication"])
 app.include_router(oauth.router, prefix="/auth", tags=["oauth"])
 app.include_router(posts.router, prefix="/posts", tags=["posts"])
 app.include_router(trends.router, prefix="/trends", tags=["trends"])
+app.include_router(diagnostics.router, prefix="/diagnostics", tags=["diagnostics"])
+app.include_router(media.router, prefix="/media", tags=["media"])
 
 @app.get("/")
 async def root():
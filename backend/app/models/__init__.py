@@ -2,7 +2,12 @@ from .user import User
 from .post import PostSummary, PostPlatform
 from .user_tokens import UserToken
 from .oauth_state import OAuthState
+from .generation_job import GenerationJob
+from .generation_cache import GenerationCacheEntry
+from .publish_job import PublishJob
+from .idempotency_key import IdempotencyKey
+from .linkedin_asset import LinkedInAsset
 from ..database import Base
 
 # Make models available at package level
-__all__ = ['User', 'PostSummary', 'PostPlatform', 'UserToken', 'OAuthState', 'Base']
+__all__ = ['User', 'PostSummary', 'PostPlatform', 'UserToken', 'OAuthState', 'GenerationJob', 'GenerationCacheEntry', 'PublishJob', 'IdempotencyKey', 'LinkedInAsset', 'Base']
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Text, TIMESTAMP
+from datetime import datetime
+from ..database import Base
+
+class GenerationCacheEntry(Base):
+    __tablename__ = "generation_cache"
+
+    # SHA-256 of the normalized n8n payload
+    cache_key = Column(String(64), primary_key=True)
+    webhook = Column(String(255), nullable=False)
+    response = Column(Text, nullable=False)  # JSON string
+    expires_at = Column(TIMESTAMP, nullable=False, index=True)
+
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
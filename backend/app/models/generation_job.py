@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, Text, TIMESTAMP, ForeignKey
+import uuid
+from datetime import datetime
+from ..database import Base
+
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+
+    # Use String for SQLite compatibility
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    summary_id = Column(String, ForeignKey("post_summaries.id"), nullable=True)
+
+    job_type = Column(String(50), nullable=False)  # summary, content
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, completed, failed
+    result = Column(Text, nullable=True)  # JSON string
+    error_message = Column(Text, nullable=True)
+
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, Text, Integer, TIMESTAMP, ForeignKey, UniqueConstraint
+import uuid
+from datetime import datetime
+from ..database import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # Use String for SQLite compatibility
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    endpoint = Column(String(100), nullable=False)
+    key = Column(String(255), nullable=False)  # client's Idempotency-Key header
+    request_hash = Column(String(64), nullable=False)  # SHA-256 of the request body
+
+    status_code = Column(Integer, nullable=True)  # null while the first request is in progress
+    response = Column(Text, nullable=True)  # JSON string
+    expires_at = Column(TIMESTAMP, nullable=False, index=True)
+
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+
+    # One stored response per key for each user and endpoint
+    __table_args__ = (
+        UniqueConstraint("user_id", "endpoint", "key", name="uq_idempotency_keys_scope"),
+    )
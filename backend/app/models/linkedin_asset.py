@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, TIMESTAMP, UniqueConstraint
+import uuid
+from datetime import datetime
+from ..database import Base
+
+class LinkedInAsset(Base):
+    __tablename__ = "linkedin_assets"
+
+    # Use String for SQLite compatibility
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    member_urn = Column(String(100), nullable=False)  # LinkedIn person id the asset is owned by
+    image_hash = Column(String(64), nullable=False)  # SHA-256 of the uploaded image (or its variant key)
+    asset_urn = Column(String(255), nullable=False)
+    expires_at = Column(TIMESTAMP, nullable=False, index=True)
+
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+
+    # One reusable asset per member and image
+    __table_args__ = (
+        UniqueConstraint("member_urn", "image_hash", name="uq_linkedin_assets_member_image"),
+    )
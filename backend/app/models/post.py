@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Boolean, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, String, Text, Boolean, TIMESTAMP, ForeignKey, Index, text
 import uuid
 from datetime import datetime
 from sqlalchemy.orm import relationship
@@ -38,9 +38,21 @@ class PostPlatform(Base):
     error_message = Column(Text, nullable=True)
     external_post_id = Column(String(255), nullable=True)  # ID from the platform
     external_post_url = Column(Text, nullable=True)  # URL to the published post
+    scheduled_at = Column(TIMESTAMP, nullable=True)  # UTC; picked up by the publish scheduler
 
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
     updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationship with summary
     summary = relationship("PostSummary", back_populates="platforms")
+
+    # Only posts still waiting to go out are indexed, so the scheduler's due-scan stays
+    # small however many posts have been published
+    __table_args__ = (
+        Index(
+            "ix_post_platforms_due",
+            "scheduled_at",
+            postgresql_where=text("published = false AND approved = true AND scheduled_at IS NOT NULL"),
+            sqlite_where=text("published = 0 AND approved = 1 AND scheduled_at IS NOT NULL")
+        ),
+    )
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, String, Text, Integer, TIMESTAMP, ForeignKey, Index, text
+import uuid
+from datetime import datetime
+from ..database import Base
+
+class PublishJob(Base):
+    __tablename__ = "publish_jobs"
+
+    # Use String for SQLite compatibility
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    platform_post_id = Column(String, ForeignKey("post_platforms.id"), nullable=False, index=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    platform_name = Column(String(50), nullable=False)
+
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, published, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(TIMESTAMP, nullable=False, default=datetime.utcnow)  # not claimable before this
+    locked_by = Column(String(100), nullable=True)  # worker id holding the claim
+    locked_at = Column(TIMESTAMP, nullable=True)
+    result = Column(Text, nullable=True)  # JSON string
+    error_message = Column(Text, nullable=True)
+
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Workers claim by platform, oldest due job first
+        Index("ix_publish_jobs_claim", "status", "platform_name", "available_at"),
+        # At most one queued or running job per post, so it can't be published twice at once
+        Index(
+            "uq_publish_jobs_active_post",
+            "platform_post_id",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+            sqlite_where=text("status IN ('queued', 'running')")
+        ),
+    )
@@ -17,6 +17,8 @@ class UserToken(Base):
     refresh_token = Column(Text, nullable=True)
     expires_at = Column(TIMESTAMP, nullable=True)
     member_id = Column(String(255), nullable=True)
+    # Facebook: long-lived user token the stored page token (access_token) is derived from
+    user_access_token = Column(Text, nullable=True)
     client_id = Column(Text, nullable=True)
     client_secret = Column(Text, nullable=True)
 
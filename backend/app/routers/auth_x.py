@@ -29,7 +29,7 @@ async def get_auth_url(user_id: str, db: Session):
         f"response_type=code&"
         f"client_id={TWITTER_CONFIG['client_id']}&"
         f"redirect_uri={TWITTER_CONFIG['redirect_uri']}&"
-        f"scope=tweet.read%20tweet.write%20users.read%20offline.access&"
+        f"scope=tweet.read%20tweet.write%20users.read%20media.write%20offline.access&"
         f"state={{user_id:{user_id}}}&"
         f"code_challenge={code_verifier}&"
         f"code_challenge_method=plain"
@@ -0,0 +1,79 @@
+from fastapi import APIRouter
+from ..services.generation_cache import generation_cache
+from ..services.n8n_client import n8n_client
+from ..services.publish_queue import publish_workers
+from ..services.publish_scheduler import publish_scheduler
+from ..services.rate_limiter import rate_limiter
+from ..services.platform_http import platform_http
+from ..services.facebook_service import facebook_page_cache
+from ..services.media_stream import media_transfers
+from ..services.blob_store import blob_store
+from ..services.image_persistence import image_persister
+from ..services.image_variants import image_variants
+from ..services.linkedin_service import linkedin_asset_stats, LINKEDIN_ASSET_REUSE_TTL
+
+router = APIRouter()
+
+@router.get("/generation-cache")
+async def get_generation_cache_stats():
+    """Get hit/miss counters for the n8n generation cache."""
+    return generation_cache.snapshot()
+
+@router.get("/n8n")
+async def get_n8n_stats():
+    """Get circuit breaker state, concurrency limits, coalescing and hedging counters for n8n."""
+    return {
+        "webhooks": {webhook: guard.snapshot() for webhook, guard in n8n_client.guards.items()},
+        "single_flight": n8n_client.single_flight.snapshot(),
+        "hedging": n8n_client.hedging_snapshot()
+    }
+
+@router.get("/publish-queue")
+async def get_publish_queue_stats():
+    """Get worker pool concurrency, in-flight publishes and outcome counters."""
+    return publish_workers.snapshot()
+
+@router.get("/publish-scheduler")
+async def get_publish_scheduler_stats():
+    """Get scheduler runs and how many scheduled posts it has queued."""
+    return publish_scheduler.snapshot()
+
+@router.get("/rate-limits")
+async def get_rate_limit_stats():
+    """Get platform token bucket levels and how often publishes were delayed or rejected."""
+    return rate_limiter.snapshot()
+
+@router.get("/platform-http")
+async def get_platform_http_stats():
+    """Get per-host connection reuse and HTTP version counters for the platform API pools."""
+    return platform_http.snapshot()
+
+@router.get("/facebook-pages")
+async def get_facebook_page_cache_stats():
+    """Get hit/miss counters for the resolved Facebook page cache."""
+    return facebook_page_cache.snapshot()
+
+@router.get("/media-transfers")
+async def get_media_transfer_stats():
+    """Get streamed image transfer totals, rejections and throughput in bytes per second."""
+    return media_transfers.snapshot()
+
+@router.get("/media-cache")
+async def get_media_cache_stats():
+    """Get the local image store's size, hit ratio and bytes saved on origin downloads."""
+    return blob_store.snapshot()
+
+@router.get("/image-persistence")
+async def get_image_persistence_stats():
+    """Get how many generated images were stored locally and rows pointed at their stable URLs."""
+    return image_persister.snapshot()
+
+@router.get("/image-variants")
+async def get_image_variant_stats():
+    """Get per-platform image specs, cached variants, build times and bytes saved."""
+    return image_variants.snapshot()
+
+@router.get("/linkedin-assets")
+async def get_linkedin_asset_stats():
+    """Get how often LinkedIn image uploads were skipped by reusing a stored asset."""
+    return {"reuse_ttl_seconds": LINKEDIN_ASSET_REUSE_TTL, **linkedin_asset_stats}
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from ..services.blob_store import image_store
+from ..services.media_stream import sniff_content_type
+from ..services.image_variants import image_variants
+
+router = APIRouter()
+
+@router.get("/{digest}")
+async def get_stored_image(digest: str):
+    """Serve a persisted generated image by its SHA-256 digest.
+
+    Unauthenticated on purpose: platforms such as Instagram fetch post images from
+    this URL themselves. Digests are unguessable and the content never changes.
+    """
+    entry = image_store.entry_for(digest)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    path = image_store.path_for(entry)
+    with open(path, "rb") as f:
+        content_type = sniff_content_type(f.read(16)) or "application/octet-stream"
+    return FileResponse(
+        path,
+        media_type=content_type,
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+@router.get("/{digest}/{platform}")
+async def get_stored_image_variant(digest: str, platform: str):
+    """Serve a platform's resized variant of a persisted image, building it if needed."""
+    entry = image_store.entry_for(digest)
+    if entry is None or platform not in image_variants.specs:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    variant = await image_variants.variant_for(entry, image_store.path_for(entry), platform)
+    if variant is None:
+        # Variants unavailable: the original is still a valid image
+        return await get_stored_image(digest)
+    return FileResponse(
+        image_variants.store.path_for(variant),
+        media_type=image_variants.specs[platform].content_type,
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
@@ -66,7 +66,7 @@ PLATFORM_CONFIGS = {
         "client_id": os.getenv("TWITTER_CLIENT_ID"),
         "client_secret": os.getenv("TWITTER_CLIENT_SECRET"),
         "redirect_uri": os.getenv("TWITTER_REDIRECT_URI"),
-        "scope": "tweet.read tweet.write users.read"
+        "scope": "tweet.read tweet.write users.read media.write"
     },
     "facebook": {
         "auth_url": "https://www.facebook.com/v18.0/dialog/oauth",
@@ -194,6 +194,7 @@ async def handle_facebook_callback(request: Request, db: Session):
     if existing_token:
         # Update existing token
         existing_token.access_token = TokenCrypto.encrypt_token(page_token)
+        existing_token.user_access_token = TokenCrypto.encrypt_token(long_token)
         existing_token.member_id = page_id
         existing_token.updated_at = datetime.utcnow()
     else:
@@ -202,6 +203,7 @@ async def handle_facebook_callback(request: Request, db: Session):
             user_id=user_id,
             platform="facebook",
             access_token=TokenCrypto.encrypt_token(page_token),
+            user_access_token=TokenCrypto.encrypt_token(long_token),  # to re-resolve the page token
             refresh_token=None,
             expires_at=None,  # No expiry for page tokens
             member_id=page_id
@@ -469,6 +471,7 @@ async def oauth_callback(
 
         # Get additional info for certain platforms
         member_id = None
+        encrypted_user_access_token = None
         if platform == "linkedin" and access_token:
             # Get LinkedIn member ID
             me_response = requests.get("https://api.linkedin.com/v2/me", headers={
@@ -507,7 +510,8 @@ async def oauth_callback(
                         member_id = page["id"]
                         page_token = page["access_token"]
 
-                        # Store the page token instead of user token
+                        # Store the page token instead of user token, keeping the user token to re-resolve it
+                        encrypted_user_access_token = encrypted_access_token
                         encrypted_access_token = TokenCrypto.encrypt_token(page_token)
         elif platform == "instagram" and access_token:
             # Get Instagram Business Account ID
@@ -545,6 +549,8 @@ async def oauth_callback(
             existing_token.updated_at = datetime.utcnow()
             if member_id:
                 existing_token.member_id = member_id
+            if encrypted_user_access_token:
+                existing_token.user_access_token = encrypted_user_access_token
             action_performed = "updated"
         else:
             # Create new token record
@@ -554,7 +560,8 @@ async def oauth_callback(
                 access_token=encrypted_access_token,
                 refresh_token=encrypted_refresh_token,
                 expires_at=datetime.utcnow() + timedelta(seconds=expires_in),
-                member_id=member_id
+                member_id=member_id,
+                user_access_token=encrypted_user_access_token
             )
             db.add(user_token)
             action_performed = "created"
@@ -1,25 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Request, Header
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict
-from datetime import datetime
-from ..database import get_db
+from datetime import datetime, timezone
+from ..database import get_db, SessionLocal
 from ..services import BasePostingService
 from ..schemas.post import (
     PostSummaryCreate, PostSummaryResponse, PostSummaryUpdate,
     PostPlatformCreate, PostPlatformResponse, PostPlatformUpdate,
-    PostWithPlatformsResponse
+    PostWithPlatformsResponse, PostSummaryBatchCreate, PostScheduleRequest
 )
-from ..models import PostSummary, PostPlatform, User
+from ..models import PostSummary, PostPlatform, User, GenerationJob, PublishJob
 from ..utils.dependencies import get_current_user
-import requests
+from ..services.n8n_client import (
+    n8n_client, N8NError,
+    N8N_SUMMARY_WEBHOOK, N8N_POSTGEN_WEBHOOK, N8N_REGENERATE_WEBHOOK,
+    N8N_REGENERATE_IMAGE_WEBHOOK
+)
+from ..services.generation_service import (
+    save_platform_content, generate_platform_content_fan_out, generate_summaries_batch,
+    batch_concurrency, N8N_POSTGEN_FAN_OUT, N8N_BATCH_MAX_TOPICS
+)
+from ..services.generation_jobs import (
+    create_job, job_to_dict, run_summary_job, run_content_job, run_summary_batch_job
+)
+from ..services.generation_events import generation_events, format_sse, TERMINAL_EVENTS
+from ..services.publishing_service import (
+    check_publishable, post_to_platform, mark_published, mark_failed, platform_semaphore
+)
+from ..services.publish_queue import (
+    enqueue_publish, publish_job_to_dict, claim_inline_publish, record_job_outcome, publish_workers
+)
+from ..services.idempotency import run_idempotent
+from ..services.image_persistence import image_persister
+import asyncio
+import httpx
 import json
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
 
 router = APIRouter()
 
+# Seconds between keep-alive comments on idle event streams
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
 from pydantic import BaseModel
 
 class PublishRequest(BaseModel):
@@ -28,22 +51,19 @@ class PublishRequest(BaseModel):
 
 
 
-
-# Get n8n webhook URLs from environment
-N8N_BASE_URL = os.getenv("N8N_BASE_URL", "https://ganeshicogz.app.n8n.cloud")
-N8N_SUMMARY_WEBHOOK = os.getenv("N8N_SUMMARY_WEBHOOK", "/webhook/summary")
-N8N_POSTGEN_WEBHOOK = os.getenv("N8N_POSTGEN_WEBHOOK", "/webhook/generate-posts")
-N8N_REGENERATE_WEBHOOK = os.getenv("N8N_REGENERATE_WEBHOOK", "/webhook/regenerate-text")
-N8N_REGENERATE_IMAGE_WEBHOOK = os.getenv("N8N_REGENERATE_IMAGE_WEBHOOK", "/webhook/regenerate-image")
-N8N_PUBLISH_WEBHOOK = os.getenv("N8N_PUBLISH_WEBHOOK", "/webhook/publish")
-
 @router.post("/generate-summary")
 async def generate_summary(
     summary_data: PostSummaryCreate,
+    background_tasks: BackgroundTasks,
+    run_async: bool = Query(False, alias="async"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Generate AI summary via n8n and save to database."""
+    """Generate AI summary via n8n and save to database.
+
+    With ``?async=true`` the summary row is created empty, a job id is returned with
+    202 Accepted and the n8n call runs in the background (poll ``/posts/jobs/{id}``).
+    """
     # Trigger n8n workflow for summary generation
     n8n_payload = {
         "user_id": str(current_user.id),
@@ -52,18 +72,40 @@ async def generate_summary(
         "user_preferences": current_user.preferences or []
     }
 
-    try:
-        n8n_url = f"{N8N_BASE_URL}{N8N_SUMMARY_WEBHOOK}"
-        response = requests.post(n8n_url, json=n8n_payload)
+    if run_async:
+        post_summary = PostSummary(
+            user_id=current_user.id,
+            topic=summary_data.topic,
+            summary_text=None,
+            summary_approved=False
+        )
+        db.add(post_summary)
+        db.commit()
+        db.refresh(post_summary)
+
+        job = create_job(db, current_user.id, "summary", post_summary.id)
+        background_tasks.add_task(run_summary_job, job.id, n8n_payload, summary_data.bypass_cache)
 
-        if response.status_code != 200:
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={
+            "job_id": str(job.id),
+            "summary_id": str(post_summary.id),
+            "status": job.status,
+            "message": "Summary generation started"
+        })
+
+    try:
+        try:
+            n8n_response = await n8n_client.post(
+                N8N_SUMMARY_WEBHOOK, n8n_payload, cache=True, coalesce=True, bypass_cache=summary_data.bypass_cache
+            )
+        except N8NError as e:
             raise HTTPException(
                 status_code=500,
-                detail=f"n8n summary generation failed: {response.status_code}"
+                detail=f"n8n summary generation failed: {e.status_code}"
             )
 
         # Get the generated summary from n8n response
-        summary_text = response.json().get("summary", "")
+        summary_text = n8n_response.get("summary", "")
 
         # Save summary to database immediately
         post_summary = PostSummary(
@@ -76,7 +118,11 @@ async def generate_summary(
         db.add(post_summary)
         db.commit()
         db.refresh(post_summary)
-        
+        generation_events.publish(post_summary.id, "summary_ready", {
+            "summary_id": str(post_summary.id),
+            "summary_text": summary_text
+        })
+
         return {
             "summary_id": str(post_summary.id),
             "topic": summary_data.topic,
@@ -86,13 +132,61 @@ async def generate_summary(
             "message": "Summary generated and saved to database"
         }
 
-    except requests.RequestException as e:
+    except HTTPException:
+        raise
+    except httpx.HTTPError as e:
         print(e)
         raise HTTPException(status_code=500, detail=f"Error calling n8n: {str(e)}")
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
+@router.post("/generate-summaries/batch")
+async def generate_summaries_batch_endpoint(
+    batch_data: PostSummaryBatchCreate,
+    background_tasks: BackgroundTasks,
+    run_async: bool = Query(False, alias="async"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Generate summaries for many topics with bounded n8n concurrency.
+
+    All summaries are inserted in one transaction and results are reported per topic.
+    With ``?async=true`` a job id is returned with 202 Accepted instead.
+    """
+    topics = [t.strip() for t in batch_data.topics if t and t.strip()]
+
+    if not topics:
+        raise HTTPException(status_code=400, detail="topics list cannot be empty")
+
+    if len(topics) > N8N_BATCH_MAX_TOPICS:
+        raise HTTPException(status_code=400, detail=f"At most {N8N_BATCH_MAX_TOPICS} topics per batch")
+
+    payloads = [{
+        "user_id": str(current_user.id),
+        "topic": topic,
+        "user_name": current_user.name or "",
+        "user_preferences": current_user.preferences or []
+    } for topic in topics]
+    concurrency = batch_concurrency(batch_data.concurrency)
+
+    if run_async:
+        job = create_job(db, current_user.id, "summary_batch")
+        background_tasks.add_task(run_summary_batch_job, job.id, payloads, concurrency, batch_data.bypass_cache)
+
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={
+            "job_id": str(job.id),
+            "topics": len(topics),
+            "status": job.status,
+            "message": "Batch summary generation started"
+        })
+
+    try:
+        return await generate_summaries_batch(db, current_user.id, payloads, concurrency, batch_data.bypass_cache)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
 @router.post("/approve-summary")
 async def approve_summary(
     request_data: dict,  # { summary_id, summary_text }
@@ -137,12 +231,22 @@ async def approve_summary(
 @router.post("/generate-content")
 async def generate_platform_content(
     request_data: dict,
+    background_tasks: BackgroundTasks,
+    run_async: bool = Query(False, alias="async"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Generate posts for selected platforms via n8n without saving to database."""
+    """Generate posts for selected platforms via n8n and save them as platform records.
+
+    With ``?async=true`` a job id is returned with 202 Accepted and the records are
+    written in the background (poll ``/posts/jobs/{id}``).
+    With ``fan_out`` each platform and the image are generated by separate concurrent
+    n8n calls, saved as they arrive and reported per platform.
+    """
     summary_id = request_data.get("summary_id")
     platforms = request_data.get("platforms", [])
+    bypass_cache = bool(request_data.get("bypass_cache", False))
+    fan_out = bool(request_data.get("fan_out", N8N_POSTGEN_FAN_OUT))
 
     if not summary_id:
         raise HTTPException(status_code=400, detail="summary_id is required")
@@ -176,85 +280,63 @@ async def generate_platform_content(
         "user_preferences": current_user.preferences or []
     }
 
-    try:
-        n8n_url = f"{N8N_BASE_URL}{N8N_POSTGEN_WEBHOOK}"
-        response = requests.post(n8n_url, json=n8n_payload, timeout=60)
+    image_payload = None
+    if fan_out:
+        summary_content = f"Topic: {post_summary.topic}\nSummary: {post_summary.summary_text}"
+        image_payload = {
+            "user_id": str(current_user.id),
+            "summary_id": str(summary_id),
+            "summary_content": post_summary.summary_text,
+            "topic": post_summary.topic,
+            "all_content": summary_content,
+            "platform_contents": [],
+            "user_suggestions": "",
+            "regenerate_type": "image",
+            "user_name": current_user.name or "",
+            "user_preferences": current_user.preferences or []
+        }
 
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=500,
-                detail=f"n8n post generation failed: {response.status_code}"
-            )
+    generation_events.publish(summary_id, "generation_started", {"platforms": platforms})
 
-        # Parse n8n response and create platform records
-        n8n_response = response.json()
-        platforms_list = n8n_response.get("Platforms", [])
-        image_url = n8n_response.get("image url", "")
-
-        # Create platform records for each platform
-        created_platforms = []
-        for platform_name in platforms_list:
-            # Map platform names to proper format
-            platform_map = {
-                "x": "twitter",
-                "facebook": "facebook",
-                "linkedin": "linkedin",
-                "instagram": "instagram",
-                "youtube": "youtube"
-            }
+    if run_async:
+        job = create_job(db, current_user.id, "content", post_summary.id)
+        background_tasks.add_task(run_content_job, job.id, n8n_payload, bypass_cache, image_payload)
 
-            clean_platform_name = platform_map.get(platform_name.lower(), platform_name.lower())
-
-            # Get platform-specific content
-            content_key = f"{clean_platform_name.title()} Post"
-            if clean_platform_name == "twitter":
-                content_key = "X Post"
-            elif clean_platform_name == "facebook":
-                content_key = "facebook Caption"
-            elif clean_platform_name == "instagram":
-                content_key = "Instagram Caption"
-            elif clean_platform_name == "linkedin":
-                content_key = "LinkedIn Post"
-            elif clean_platform_name == "youtube":
-                content_key = "youtube Caption"
-
-            post_content = n8n_response.get(content_key, "")
-
-            # Check if platform record already exists
-            existing_platform = db.query(PostPlatform).filter(
-                PostPlatform.summary_id == summary_id,
-                PostPlatform.platform_name == clean_platform_name
-            ).first()
-
-            if existing_platform:
-                # Update existing record
-                existing_platform.post_text = post_content
-                existing_platform.image_url = image_url
-                existing_platform.updated_at = datetime.utcnow()
-                platform_record = existing_platform
-            else:
-                # Create new platform record
-                platform_record = PostPlatform(
-                    summary_id=summary_id,
-                    platform_name=clean_platform_name,
-                    post_text=post_content,
-                    image_url=image_url
-                )
-                db.add(platform_record)
-                
-            db.commit()
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={
+            "job_id": str(job.id),
+            "summary_id": str(summary_id),
+            "status": job.status,
+            "message": "Content generation started"
+        })
+
+    try:
+        if fan_out:
+            result = await generate_platform_content_fan_out(
+                db, summary_id, n8n_payload, image_payload, bypass_cache
+            )
+            if not result["generated"]:
+                errors = "; ".join(f"{p['platform_name']}: {p['error']}" for p in result["failed_platforms"])
+                raise HTTPException(status_code=500, detail=f"n8n post generation failed: {errors}")
 
-            created_platforms.append({
-                "platform_id": str(platform_record.id),
-                "platform_name": clean_platform_name,
-                "post_text": post_content,
-                "image_url": image_url,
-                "updated": existing_platform is not None
+            generation_events.publish(summary_id, "generation_complete", {
+                "platforms": len(result["platforms"]),
+                "failed_platforms": len(result["failed_platforms"])
             })
+            return result
 
-            # Commit after all operations per platform
+        try:
+            n8n_response = await n8n_client.post(
+                N8N_POSTGEN_WEBHOOK, n8n_payload, cache=True, coalesce=True, bypass_cache=bypass_cache
+            )
+        except N8NError as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"n8n post generation failed: {e.status_code}"
+            )
 
-        db.commit()
+        # Parse n8n response and create platform records
+        created_platforms = save_platform_content(db, summary_id, n8n_response)
+        generation_events.publish(summary_id, "generation_complete", {"platforms": len(created_platforms)})
 
         return {
             "summary_id": summary_id,
@@ -263,13 +345,83 @@ async def generate_platform_content(
             "message": f"Generated content for {len(created_platforms)} platforms"
         }
 
-    except requests.RequestException as e:
+    except HTTPException as e:
+        generation_events.publish(summary_id, "generation_failed", {"error": e.detail})
+        raise
+    except httpx.HTTPError as e:
         print(e)
+        generation_events.publish(summary_id, "generation_failed", {"error": f"Error calling n8n: {str(e)}"})
         raise HTTPException(status_code=500, detail=f"Error calling n8n: {str(e)}")
     except Exception as e:
         print(e)
+        generation_events.publish(summary_id, "generation_failed", {"error": str(e)})
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
+@router.get("/summary/{summary_id}/events")
+async def stream_generation_events(
+    summary_id: str,
+    request: Request,
+    job_id: Optional[str] = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Stream generation progress for a summary as server-sent events.
+
+    Events: ``summary_ready``, ``generation_started``, ``post_ready`` (one per platform),
+    ``image_ready``, then ``generation_complete`` or ``generation_failed`` which ends the stream.
+    A summary job ends its stream the same way right after ``summary_ready``. A run that
+    already finished is only replayed when its ``job_id`` is passed; otherwise the stream
+    waits for the next run.
+    """
+    post_summary = db.query(PostSummary).filter(
+        PostSummary.id == summary_id,
+        PostSummary.user_id == current_user.id
+    ).first()
+
+    if not post_summary:
+        raise HTTPException(status_code=404, detail="Post summary not found")
+
+    async def event_stream():
+        queue = generation_events.subscribe(summary_id, job_id)
+        try:
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                yield format_sse(message)
+                if message["event"] in TERMINAL_EVENTS:
+                    break
+        finally:
+            generation_events.unsubscribe(summary_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/jobs/{job_id}")
+async def get_generation_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the status and result of a background generation job."""
+    job = db.query(GenerationJob).filter(
+        GenerationJob.id == job_id,
+        GenerationJob.user_id == current_user.id
+    ).first()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job_to_dict(job)
+
 @router.post("/approve-content")
 async def approve_platform_content(
     platform_data: dict,  # { platform_id, post_text, image_url }
@@ -288,10 +440,11 @@ async def approve_platform_content(
         PostPlatform.id == platform_id
     ).first()
 
+    image_url = image_persister.resolve(platform_data.get("image_url"))
     if platform_post:
         # Update existing record
         platform_post.post_text = platform_data.get("post_text")
-        platform_post.image_url = platform_data.get("image_url")
+        platform_post.image_url = image_url
         platform_post.approved = True
         from datetime import datetime, timezone
         platform_post.updated_at = datetime.now(timezone.utc)
@@ -303,13 +456,14 @@ async def approve_platform_content(
             summary_id=platform_data.get("summary_id"),
             platform_name=platform_data.get("platform_name"),
             post_text=platform_data.get("post_text"),
-            image_url=platform_data.get("image_url"),
+            image_url=image_url,
             approved=True
         )
         db.add(platform_post)
 
     db.commit()
     db.refresh(platform_post)
+    image_persister.schedule(platform_post.summary_id, image_url)
 
     return {
         "message": f"Post approved for {platform_post.platform_name}",
@@ -321,191 +475,232 @@ async def approve_platform_content(
 async def publish_post(
     request: PublishRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
+    """Queue an approved post for publishing to its platform.
+
+    Returns 202 Accepted with a publish job id right away; a worker publishes the post
+    through the platform's API (poll ``/posts/publish-jobs/{id}``). Retries sent with
+    the same ``Idempotency-Key`` get the original response back.
+    """
     platform_id = request.platform_id
-    print(platform_id)
 
-    """Publish approved post to platform via direct API calls."""
+    async def queue_publish():
+        platform_post = db.query(PostPlatform).join(PostSummary).filter(
+            PostPlatform.id == platform_id,
+            PostSummary.user_id == current_user.id
+        ).first()
+
+        if not platform_post:
+            raise HTTPException(status_code=404, detail="Platform post not found")
+
+        check_publishable(platform_post)
+
+        job = enqueue_publish(db, platform_post, str(current_user.id))
+
+        return status.HTTP_202_ACCEPTED, {
+            "message": f"Post queued for {platform_post.platform_name}",
+            "platform_id": platform_id,
+            "job_id": str(job.id),
+            "status": job.status
+        }
+
+    return await run_idempotent(
+        db, str(current_user.id), "publish", idempotency_key, request, queue_publish
+    )
+
+@router.get("/publish-jobs/{job_id}")
+async def get_publish_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the status and platform response of a queued publish."""
+    job = db.query(PublishJob).filter(
+        PublishJob.id == job_id,
+        PublishJob.user_id == current_user.id
+    ).first()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Publish job not found")
+
+    return publish_job_to_dict(job)
+
+@router.post("/schedule")
+async def schedule_post(
+    request: PostScheduleRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Schedule an approved post to be published at ``scheduled_at`` (UTC if no offset)."""
     platform_post = db.query(PostPlatform).join(PostSummary).filter(
-        PostPlatform.id == platform_id,
+        PostPlatform.id == request.platform_id,
         PostSummary.user_id == current_user.id
     ).first()
 
     if not platform_post:
         raise HTTPException(status_code=404, detail="Platform post not found")
 
-    if not platform_post.approved:
-        raise HTTPException(status_code=400, detail=f"Post not approved for {platform_post.platform_name}")
+    if platform_post.published:
+        raise HTTPException(status_code=400, detail=f"Post already published to {platform_post.platform_name}")
 
-    if not platform_post.post_text:
-        raise HTTPException(status_code=400, detail="No post content generated yet")
+    check_publishable(platform_post)
 
-    # Import platform services
-    from ..services.linkedin_service import LinkedInPostingService
-    from ..services.twitter_service import TwitterPostingService
-    from ..services.facebook_service import FacebookPostingService
-    from ..services.instagram_service import InstagramPostingService
+    scheduled_at = request.scheduled_at
+    if scheduled_at.tzinfo is not None:
+        scheduled_at = scheduled_at.astimezone(timezone.utc).replace(tzinfo=None)
 
-    platform_name = platform_post.platform_name.lower()
+    if scheduled_at <= datetime.utcnow():
+        raise HTTPException(status_code=400, detail="scheduled_at must be in the future")
 
-    try:
-        if platform_name == "linkedin":
-            service = LinkedInPostingService()
-            result = await service.post_content(
-                str(current_user.id),
-                platform_post.post_text[:280],
-                platform_post.image_url,
-                db
-            )
-        elif platform_name == "twitter":
-            service = TwitterPostingService()
-            result = await service.post_content(
-                str(current_user.id),
-                platform_post.post_text,
-                platform_post.image_url,
-                db
-            )
-        elif platform_name == "facebook":
-            service = FacebookPostingService()
-            result = await service.post_content(
-                str(current_user.id),
-                platform_post.post_text,
-                platform_post.image_url,
-                db
-            )
-        elif platform_name == "instagram":
-            service = InstagramPostingService()
-            result = await service.post_content(
-                str(current_user.id),
-                platform_post.post_text,
-                platform_post.image_url,
-                db
-            )
-        else:
-            raise HTTPException(status_code=400, detail=f"Unsupported platform: {platform_name}")
-
-        # Update publish status on success
-        platform_post.published = True
-        platform_post.published_at = datetime.utcnow()
-        platform_post.external_post_id = result.get("post_id")
-        platform_post.external_post_url = result.get("url")
-        db.commit()
+    platform_post.scheduled_at = scheduled_at
+    platform_post.updated_at = datetime.utcnow()
+    db.commit()
 
-        return {
-            "message": f"Post published to {platform_post.platform_name}",
-            "platform_id": platform_id,
-            "status": "published",
-            "post_url": result.get("url"),
-            "platform_response": result
-        }
+    return {
+        "message": f"Post scheduled for {platform_post.platform_name}",
+        "platform_id": str(platform_post.id),
+        "scheduled_at": scheduled_at.isoformat()
+    }
 
-    except Exception as e:
-        # Store error message on failure
-        platform_post.error_message = str(e)
-        platform_post.updated_at = datetime.utcnow()
-        db.commit()
+@router.delete("/schedule/{platform_id}")
+async def unschedule_post(
+    platform_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Cancel a scheduled publish that hasn't been picked up yet."""
+    platform_post = db.query(PostPlatform).join(PostSummary).filter(
+        PostPlatform.id == platform_id,
+        PostSummary.user_id == current_user.id
+    ).first()
+
+    if not platform_post:
+        raise HTTPException(status_code=404, detail="Platform post not found")
+
+    if platform_post.scheduled_at is None:
+        raise HTTPException(status_code=400, detail="Post is not scheduled")
 
-        raise HTTPException(status_code=500, detail=f"Publishing failed: {str(e)}")
+    platform_post.scheduled_at = None
+    platform_post.updated_at = datetime.utcnow()
+    db.commit()
+
+    return {
+        "message": f"Schedule cancelled for {platform_post.platform_name}",
+        "platform_id": str(platform_post.id)
+    }
+
+@router.get("/scheduled", response_model=List[PostPlatformResponse])
+async def get_scheduled_posts(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the user's posts waiting to be published, soonest first."""
+    return db.query(PostPlatform).join(PostSummary).filter(
+        PostSummary.user_id == current_user.id,
+        PostPlatform.published == False,
+        PostPlatform.scheduled_at.isnot(None)
+    ).order_by(PostPlatform.scheduled_at).all()
 
 @router.post("/publish-multiple")
 async def publish_multiple_posts(
     request_data: dict,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
-    """Publish multiple approved posts to their respective platforms via n8n."""
+    """Publish multiple approved posts to their platforms concurrently via direct API calls.
+
+    Publishes to different platforms run in parallel, bounded per platform, each in its
+    own session that saves the outcome as soon as that publish finishes. Each post is claimed as a running publish job
+    first, so a post the workers (or another request) are already publishing is skipped.
+    Retries sent with the same ``Idempotency-Key`` get the original results back.
+    """
     platform_ids = request_data.get("platform_ids", [])
 
     if not platform_ids or len(platform_ids) == 0:
         raise HTTPException(status_code=400, detail="platform_ids list cannot be empty")
 
-    results = []
-
-    for platform_id in platform_ids:
-        try:
-            platform_post = db.query(PostPlatform).join(PostSummary).filter(
-                PostPlatform.id == platform_id,
-                PostSummary.user_id == current_user.id
-            ).first()
+    platform_ids = list(dict.fromkeys(str(platform_id) for platform_id in platform_ids))
 
-            if not platform_post:
-                results.append({
-                    "platform_id": platform_id,
-                    "status": "failed",
-                    "error": "Platform post not found"
-                })
-                continue
+    async def publish_all():
+        # Load every requested post the user owns in one query
+        platform_posts = db.query(PostPlatform).join(PostSummary).filter(
+            PostPlatform.id.in_(platform_ids),
+            PostSummary.user_id == current_user.id
+        ).all()
+        posts_by_id = {str(p.id): p for p in platform_posts}
 
-            if not platform_post.approved:
-                results.append({
-                    "platform_id": platform_id,
-                    "status": "failed",
-                    "error": f"Post not approved for {platform_post.platform_name}"
-                })
+        # Claim the publishable posts before any platform call
+        claims = {}
+        for platform_post in platform_posts:
+            try:
+                check_publishable(platform_post)
+            except HTTPException:
                 continue
+            job = claim_inline_publish(db, platform_post, str(current_user.id), publish_workers.worker_id)
+            if job is not None:
+                claims[str(platform_post.id)] = job.id
 
-            if not platform_post.post_text:
-                results.append({
+        async def publish_one(platform_id: str) -> dict:
+            if platform_id not in posts_by_id:
+                return {
                     "platform_id": platform_id,
                     "status": "failed",
-                    "error": "No post content generated yet"
-                })
-                continue
-
-            # Trigger n8n workflow for publishing
-            n8n_payload = {
-                "user_id": str(current_user.id),
-                "platform_id": str(platform_id),
-                "platform_name": platform_post.platform_name,
-                "post_text": platform_post.post_text,
-                "image_url": platform_post.image_url or "",
-                "summary_text": platform_post.summary.summary_text
-            }
+                    "error": "Platform post not found"
+                }
 
+            # Platform services commit or roll back the session they are given, so each
+            # publish gets its own and saves its outcome as soon as it finishes
+            publish_db = SessionLocal()
             try:
-                n8n_url = f"{N8N_BASE_URL}{N8N_PUBLISH_WEBHOOK}"
-                response = requests.post(n8n_url, json=n8n_payload, timeout=60)
-
-                if response.status_code == 200:
-                    # Update publish status on success
-                    platform_post.published = True
-                    platform_post.published_at = datetime.utcnow()
-                    status = "published"
-                    error_msg = None
-                else:
-                    # Store error message on failure
-                    platform_post.error_message = f"n8n publishing failed: {response.status_code}"
-                    status = "failed"
-                    error_msg = f"n8n publishing failed: {response.status_code}"
-
-            except Exception as e:
-                print(f"Error calling n8n publish: {str(e)}")
-                platform_post.error_message = f"Error calling n8n: {str(e)}"
-                status = "failed"
-                error_msg = f"Error calling n8n: {str(e)}"
-
-            platform_post.updated_at = datetime.utcnow()
-            results.append({
-                "platform_id": platform_id,
-                "platform_name": platform_post.platform_name,
-                "status": status,
-                "error": error_msg
-            })
-
-        except Exception as e:
-            results.append({
-                "platform_id": platform_id,
-                "status": "failed",
-                "error": str(e)
-            })
-
-    db.commit()
+                platform_post = publish_db.query(PostPlatform).filter(PostPlatform.id == platform_id).first()
+                job_id = claims.get(platform_id)
+                job = publish_db.query(PublishJob).filter(PublishJob.id == job_id).first() if job_id is not None else None
+                try:
+                    check_publishable(platform_post)
+                    if job is None:
+                        raise HTTPException(status_code=409, detail=f"Post is already being published to {platform_post.platform_name}")
+                    async with platform_semaphore(platform_post.platform_name.lower()):
+                        result = await post_to_platform(publish_db, platform_post, str(current_user.id))
+                except Exception as e:
+                    error_msg = e.detail if isinstance(e, HTTPException) else str(e)
+                    if not isinstance(e, HTTPException) or e.status_code != 409:
+                        mark_failed(platform_post, error_msg)
+                    if job is not None:
+                        record_job_outcome(job, "failed", error=error_msg)
+                    publish_db.commit()
+                    return {
+                        "platform_id": platform_id,
+                        "platform_name": platform_post.platform_name,
+                        "status": "failed",
+                        "error": error_msg
+                    }
+
+                mark_published(platform_post, result)
+                record_job_outcome(job, "published", result=result)
+                publish_db.commit()
+                return {
+                    "platform_id": platform_id,
+                    "platform_name": platform_post.platform_name,
+                    "status": "published",
+                    "post_url": result.get("url"),
+                    "error": None
+                }
+            finally:
+                publish_db.close()
+
+        results = await asyncio.gather(*(publish_one(platform_id) for platform_id in platform_ids))
+
+        return status.HTTP_200_OK, {
+            "message": f"Processed {len(platform_ids)} platforms",
+            "results": results
+        }
 
-    return {
-        "message": f"Processed {len(platform_ids)} platforms",
-        "results": results
-    }
+    return await run_idempotent(
+        db, str(current_user.id), "publish-multiple", idempotency_key, {"platform_ids": platform_ids}, publish_all
+    )
 
 @router.post("/create-platform-records")
 async def create_platform_records(
@@ -577,12 +772,16 @@ async def regenerate_text(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Regenerate text content with user suggestions via n8n/Gemini."""
+    """Regenerate text content with user suggestions via n8n/Gemini.
+
+    Never served from the generation cache: asking again with the same suggestions
+    should produce new text.
+    """
     summary_id = request_data.get("summary_id")
     platform_id = request_data.get("platform_id")
     user_suggestions = request_data.get("user_suggestions", "")
     content_type = request_data.get("content_type", "summary")  # "summary" or "post"
-    
+
     # Extract summary_id either directly or from platform_id
     if not summary_id and not platform_id:
         raise HTTPException(status_code=400, detail="Either summary_id or platform_id is required")
@@ -636,17 +835,18 @@ async def regenerate_text(
         }
 
         try:
-            n8n_url = f"{N8N_BASE_URL}{N8N_REGENERATE_WEBHOOK}"
-            response = requests.post(n8n_url, json=n8n_payload, timeout=60)
-
-            if response.status_code != 200:
+            try:
+                n8n_response = await n8n_client.post(
+                    N8N_REGENERATE_WEBHOOK, n8n_payload, coalesce=True, hedge=True
+                )
+            except N8NError as e:
                 raise HTTPException(
                     status_code=500,
-                    detail=f"n8n summary regeneration failed: {response.status_code}"
+                    detail=f"n8n summary regeneration failed: {e.status_code}"
                 )
 
             # Get the regenerated summary from n8n response
-            regenerated_content = response.json().get("summary", "")
+            regenerated_content = n8n_response.get("summary", "")
 
             # Update the summary in database immediately
             post_summary.summary_text = regenerated_content
@@ -663,7 +863,7 @@ async def regenerate_text(
                 "message": "Summary text regenerated and updated successfully"
             }
 
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             raise HTTPException(status_code=500, detail=f"Error calling n8n: {str(e)}")
 
     elif content_type == "post":
@@ -703,17 +903,18 @@ async def regenerate_text(
         }
 
         try:
-            n8n_url = f"{N8N_BASE_URL}{N8N_REGENERATE_WEBHOOK}"
-            response = requests.post(n8n_url, json=n8n_payload, timeout=60)
-
-            if response.status_code != 200:
+            try:
+                n8n_response = await n8n_client.post(
+                    N8N_REGENERATE_WEBHOOK, n8n_payload, coalesce=True, hedge=True
+                )
+            except N8NError as e:
                 raise HTTPException(
                     status_code=500,
-                    detail=f"n8n post regeneration failed: {response.status_code}"
+                    detail=f"n8n post regeneration failed: {e.status_code}"
                 )
 
             # Get the regenerated post content from n8n response
-            regenerated_content = response.json().get("output", "")
+            regenerated_content = n8n_response.get("output", "")
 
             # Update the platform post in database immediately
             platform_post.post_text = regenerated_content
@@ -732,7 +933,7 @@ async def regenerate_text(
                 "message": f"Post text regenerated and updated successfully for {platform_post.platform_name}"
             }
 
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             raise HTTPException(status_code=500, detail=f"Error calling n8n: {str(e)}")
 
     else:
@@ -814,17 +1015,16 @@ async def regenerate_image(
     }
 
     try:
-        n8n_url = f"{N8N_BASE_URL}{N8N_REGENERATE_IMAGE_WEBHOOK}"
-        response = requests.post(n8n_url, json=n8n_payload, timeout=60)
-
-        if response.status_code != 200:
+        try:
+            n8n_response = await n8n_client.post(N8N_REGENERATE_IMAGE_WEBHOOK, n8n_payload, coalesce=True)
+        except N8NError as e:
             raise HTTPException(
                 status_code=500,
-                detail=f"n8n image regeneration failed: {response.status_code}"
+                detail=f"n8n image regeneration failed: {e.status_code}"
             )
 
         # Get the regenerated image URL from n8n response
-        regenerated_image_url = response.json().get("image url", "")
+        regenerated_image_url = n8n_response.get("image url", "")
 
         if not regenerated_image_url:
             raise HTTPException(status_code=500, detail="No image URL returned from n8n")
@@ -832,11 +1032,13 @@ async def regenerate_image(
         # Update image URL for all platforms associated with this summary
         updated_count = 0
         for platform in platforms:
-            platform.image_url = regenerated_image_url
+            platform.image_url = image_persister.resolve(regenerated_image_url)
             platform.updated_at = datetime.utcnow()
             updated_count += 1
 
         db.commit()
+        generation_events.publish(summary_id, "image_ready", {"image_url": regenerated_image_url})
+        image_persister.schedule(summary_id, regenerated_image_url)
 
         return {
             "summary_id": summary_id,
@@ -852,7 +1054,9 @@ async def regenerate_image(
             "message": f"Image regenerated and updated for {updated_count} platforms successfully"
         }
 
-    except requests.RequestException as e:
+    except HTTPException:
+        raise
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Error calling n8n: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
@@ -905,12 +1109,14 @@ async def update_content(
         if new_content:
             platform_post.post_text = new_content
         if new_image_url:
-            platform_post.image_url = new_image_url
+            platform_post.image_url = image_persister.resolve(new_image_url)
 
         platform_post.updated_at = datetime.utcnow()
         message = f"Post content updated for {platform_post.platform_name}"
 
     db.commit()
+    if content_type != "summary" and new_image_url:
+        image_persister.schedule(summary_id, new_image_url)
 
     return {
         "summary_id": summary_id,
@@ -953,7 +1159,8 @@ async def update_image_for_all_platforms(
     if not platforms:
         raise HTTPException(status_code=404, detail="No platforms found for this summary")
 
-    # Update image URL for all platforms
+    # Update image URL for all platforms, using the stored copy once it is persisted
+    source_url, image_url = image_url, image_persister.resolve(image_url)
     updated_platforms = []
     for platform in platforms:
         platform.image_url = image_url
@@ -965,6 +1172,7 @@ async def update_image_for_all_platforms(
         })
 
     db.commit()
+    image_persister.schedule(summary_id, source_url)
 
     return {
         "summary_id": summary_id,
@@ -10,7 +10,12 @@ class PostSummaryBase(BaseModel):
     summary_approved: Optional[bool] = False
 
 class PostSummaryCreate(PostSummaryBase):
-    pass
+    bypass_cache: Optional[bool] = False  # Skip the generation cache for this request
+
+class PostSummaryBatchCreate(BaseModel):
+    topics: List[str]
+    concurrency: Optional[int] = None  # Max concurrent n8n calls, capped server-side
+    bypass_cache: Optional[bool] = False
 
 class PostSummaryUpdate(BaseModel):
     summary_text: Optional[str] = None
@@ -34,6 +39,7 @@ class PostPlatformBase(BaseModel):
     published: Optional[bool] = False
     published_at: Optional[datetime] = None
     error_message: Optional[str] = None
+    scheduled_at: Optional[datetime] = None
 
 class PostPlatformCreate(PostPlatformBase):
     summary_id: UUID
@@ -46,6 +52,10 @@ class PostPlatformUpdate(BaseModel):
     published_at: Optional[datetime] = None
     error_message: Optional[str] = None
 
+class PostScheduleRequest(BaseModel):
+    platform_id: str
+    scheduled_at: datetime  # Naive values are taken as UTC
+
 class PostPlatformResponse(PostPlatformBase):
     id: UUID
     summary_id: UUID
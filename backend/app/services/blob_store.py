@@ -0,0 +1,249 @@
+"""Content-addressed on-disk store for downloaded images.
+
+Blobs live under ``MEDIA_CACHE_DIR`` named by the SHA-256 of their bytes, so an image
+published to several platforms (or republished later) is fetched from its origin
+once and identical images share one file. An in-memory index maps each source URL to
+its digest. Total size is bounded by ``MEDIA_CACHE_MAX_BYTES`` with least recently
+used eviction, and blobs are read through a read-only ``mmap`` so serving one does not
+copy it onto the heap. On startup the directory is rescanned, so blobs survive
+restarts (their URLs are learned again on the next fetch, which then dedupes).
+
+``image_store`` uses the same layout without LRU eviction for generated images that
+posts keep referring to: they are served by the backend at ``/media/{digest}``, so
+a post keeps a stable image URL after the generator's signed link expires. Images no
+post refers to any more are removed by the image persister's retention sweep.
+"""
+import asyncio
+import mmap
+import os
+import re
+import tempfile
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MEDIA_CACHE_ENABLED = os.getenv("MEDIA_CACHE_ENABLED", "true").lower() == "true"
+MEDIA_CACHE_DIR = os.getenv(
+    "MEDIA_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "media_cache")
+)
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+MEDIA_CACHE_MAX_URLS = int(os.getenv("MEDIA_CACHE_MAX_URLS", "10000"))
+
+MEDIA_STORE_DIR = os.getenv(
+    "MEDIA_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "media_store")
+)
+# Public base URL the stored images are served from; platforms fetch Instagram images
+# from it, so images are only persisted when it is set
+MEDIA_PUBLIC_BASE_URL = os.getenv("MEDIA_PUBLIC_BASE_URL", "").rstrip("/")
+
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BlobEntry:
+    """A stored blob as known to the URL index."""
+
+    __slots__ = ("digest", "size", "content_type")
+
+    def __init__(self, digest: str, size: int, content_type: Optional[str]):
+        self.digest = digest
+        self.size = size
+        self.content_type = content_type
+
+
+class BlobStore:
+    """SHA-256 keyed blob store on local disk, LRU-bounded unless ``max_bytes`` is None."""
+
+    def __init__(self, root: str = MEDIA_CACHE_DIR, max_bytes: Optional[int] = MEDIA_CACHE_MAX_BYTES,
+                 max_urls: int = MEDIA_CACHE_MAX_URLS, enabled: bool = MEDIA_CACHE_ENABLED):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_urls = max_urls
+        self.enabled = enabled and (max_bytes is None or max_bytes > 0)
+        self._blobs: "OrderedDict[str, int]" = OrderedDict()  # digest -> size, least recent first
+        self._urls: "OrderedDict[str, BlobEntry]" = OrderedDict()
+        self._fills: Dict[str, asyncio.Lock] = {}
+        self._loaded = False
+        self.bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "deduplicated": 0, "evictions": 0, "bytes_saved": 0}
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def load(self):
+        """Index blobs already on disk, oldest access first."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.enabled:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if len(name) != 64 or os.path.basename(dirpath) != name[:2]:
+                    # Partial download left behind by a crash
+                    if name.endswith(".part"):
+                        os.unlink(path)
+                    continue
+                st = os.stat(path)
+                found.append((st.st_atime, name, st.st_size))
+        for _, digest, size in sorted(found):
+            self._blobs[digest] = size
+            self.bytes += size
+        self._evict()
+
+    def entry_for(self, digest: str) -> Optional[BlobEntry]:
+        """Get a stored blob by digest."""
+        self.load()
+        if not DIGEST_PATTERN.match(digest):
+            return None
+        size = self._blobs.get(digest)
+        if size is None or not os.path.exists(self._path(digest)):
+            return None
+        self._blobs.move_to_end(digest)
+        return BlobEntry(digest, size, None)
+
+    def path_for(self, entry: BlobEntry) -> str:
+        return self._path(entry.digest)
+
+    def digests(self) -> list:
+        """Digests of all stored blobs."""
+        self.load()
+        return list(self._blobs)
+
+    def age_seconds(self, digest: str) -> Optional[float]:
+        """Seconds since a stored blob was written, or None if it is gone."""
+        try:
+            return time.time() - os.stat(self._path(digest)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def remove(self, digest: str):
+        """Delete a stored blob and forget the URLs pointing at it."""
+        size = self._blobs.pop(digest, None)
+        if size is not None:
+            self.bytes -= size
+        for url in [url for url, entry in self._urls.items() if entry.digest == digest]:
+            del self._urls[url]
+        try:
+            os.unlink(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+    def fill_lock(self, url: str) -> asyncio.Lock:
+        """Lock held while a URL is fetched, so concurrent publishes download it once."""
+        return self._fills.setdefault(url, asyncio.Lock())
+
+    def release_fill_lock(self, url: str, lock: asyncio.Lock):
+        if self._fills.get(url) is lock and not lock.locked():
+            del self._fills[url]
+
+    def lookup(self, url: str) -> Optional[BlobEntry]:
+        """Get the stored blob for a URL, counting a hit or miss."""
+        self.load()
+        entry = self._urls.get(url)
+        if entry is not None and entry.digest in self._blobs and os.path.exists(self._path(entry.digest)):
+            self._urls.move_to_end(url)
+            self._blobs.move_to_end(entry.digest)
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += entry.size
+            return entry
+        self._urls.pop(url, None)
+        self.stats["misses"] += 1
+        return None
+
+    def temp_file(self) -> Tuple[int, str]:
+        """Open a partial file inside the store for a download to be written to."""
+        self.load()
+        os.makedirs(self.root, exist_ok=True)
+        return tempfile.mkstemp(dir=self.root, suffix=".part")
+
+    def commit(self, url: str, temp_path: str, digest: str, size: int, content_type: Optional[str]) -> BlobEntry:
+        """Move a finished download into place under its digest and index its URL."""
+        path = self._path(digest)
+        if digest in self._blobs and os.path.exists(path):
+            # Same bytes already stored under another URL
+            os.unlink(temp_path)
+            self._blobs.move_to_end(digest)
+            self.stats["deduplicated"] += 1
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+            self.bytes += size - self._blobs.get(digest, 0)
+            self._blobs[digest] = size
+            self.stats["stored"] += 1
+
+        entry = BlobEntry(digest, size, content_type)
+        self._urls[url] = entry
+        self._urls.move_to_end(url)
+        while len(self._urls) > self.max_urls:
+            self._urls.popitem(last=False)
+        self._evict(keep=digest)
+        return entry
+
+    def _evict(self, keep: Optional[str] = None):
+        if self.max_bytes is None:
+            return
+        while self.bytes > self.max_bytes and self._blobs:
+            digest = next(iter(self._blobs))
+            if digest == keep:
+                if len(self._blobs) == 1:
+                    break
+                self._blobs.move_to_end(digest)
+                continue
+            size = self._blobs.pop(digest)
+            self.bytes -= size
+            try:
+                # Readers holding an mmap of this blob keep their view until they close it
+                os.unlink(self._path(digest))
+            except FileNotFoundError:
+                pass
+            self.stats["evictions"] += 1
+
+    @contextmanager
+    def open(self, entry: BlobEntry):
+        """Map a stored blob read-only."""
+        with open(self._path(entry.digest), "rb") as f:
+            view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield view
+        finally:
+            view.close()
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "root": self.root,
+            "blobs": len(self._blobs),
+            "urls": len(self._urls),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hit_ratio": round(self.stats["hits"] / lookups, 3) if lookups else None,
+            **self.stats
+        }
+
+
+blob_store = BlobStore()
+image_store = BlobStore(root=MEDIA_STORE_DIR, max_bytes=None, enabled=True)
+
+
+def stored_image_url(digest: str) -> str:
+    """The stable backend URL of an image in ``image_store``."""
+    return f"{MEDIA_PUBLIC_BASE_URL}/media/{digest}"
+
+
+def stored_image_digest(url: Optional[str]) -> Optional[str]:
+    """The digest of a stable backend image URL, or None for any other URL."""
+    prefix = f"{MEDIA_PUBLIC_BASE_URL}/media/"
+    if not MEDIA_PUBLIC_BASE_URL or not url or not url.startswith(prefix):
+        return None
+    digest = url[len(prefix):]
+    return digest if DIGEST_PATTERN.match(digest) else None
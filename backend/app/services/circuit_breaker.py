@@ -0,0 +1,234 @@
+"""Circuit breaker and AIMD concurrency limiter for slow upstream dependencies."""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+
+class ServiceUnavailableError(HTTPException):
+    """Fast-fail 503 raised instead of calling an unhealthy upstream."""
+
+    def __init__(self, name: str, reason: str, retry_after: float):
+        self.name = name
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(
+            status_code=503,
+            detail=f"{name} temporarily unavailable: {reason}",
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+class CircuitBreaker:
+    """Opens when the recent failure or slow-call rate crosses a threshold.
+
+    While open every call fails fast. After ``open_seconds`` the breaker goes
+    half-open and lets ``half_open_probes`` calls through; if they succeed it closes,
+    otherwise it opens again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int = 20,
+        min_calls: int = 5,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 30.0,
+        slow_call_rate_threshold: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = self.CLOSED
+        self._window = deque(maxlen=window_size)  # (failed, slow)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def before_call(self):
+        """Raise ``ServiceUnavailableError`` if the call must not go through."""
+        if self.state == self.OPEN:
+            remaining = self._opened_at + self.open_seconds - time.monotonic()
+            if remaining > 0:
+                self.stats["rejected"] += 1
+                raise ServiceUnavailableError(self.name, "circuit open", remaining)
+            self.state = self.HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+
+        if self.state == self.HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                self.stats["rejected"] += 1
+                raise ServiceUnavailableError(self.name, "circuit half-open", 1)
+            self._probes_in_flight += 1
+
+    def cancel_call(self):
+        """Give back a half-open probe that was granted but never used."""
+        if self.state == self.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def record(self, failed: bool, latency: float):
+        """Record the outcome of a call let through by ``before_call``."""
+        self.stats["calls"] += 1
+        if failed:
+            self.stats["failures"] += 1
+        slow = latency >= self.slow_call_seconds
+
+        if self.state == self.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if failed or slow:
+                self._open()
+            else:
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self.state = self.CLOSED
+                    self._window.clear()
+            return
+
+        self._window.append((failed, slow))
+        if len(self._window) < self.min_calls:
+            return
+
+        failure_rate = sum(1 for f, _ in self._window if f) / len(self._window)
+        slow_rate = sum(1 for _, s in self._window if s) / len(self._window)
+        if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+            self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._window.clear()
+        self.stats["opened"] += 1
+
+    def snapshot(self) -> dict:
+        window = list(self._window)
+        retry_after = 0.0
+        if self.state == self.OPEN:
+            retry_after = max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+        return {
+            "state": self.state,
+            "window_calls": len(window),
+            "window_failure_rate": round(sum(1 for f, _ in window if f) / len(window), 4) if window else 0.0,
+            "window_slow_rate": round(sum(1 for _, s in window if s) / len(window), 4) if window else 0.0,
+            "retry_after_seconds": round(retry_after, 1),
+            **self.stats
+        }
+
+class AIMDLimiter:
+    """Adaptive concurrency limit: additive increase, multiplicative decrease.
+
+    The limit grows by roughly one slot per ``limit`` fast completions and is cut by
+    ``backoff`` (at most once per observed round trip) when a call fails or is slower
+    than ``target_latency``. Callers over the limit wait up to ``queue_timeout``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: float = 20,
+        min_limit: float = 2,
+        max_limit: float = 100,
+        target_latency: float = 20.0,
+        backoff: float = 0.7,
+        queue_timeout: float = 5.0
+    ):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = float(max(1, min_limit))
+        self.max_limit = float(max_limit)
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+        self.stats = {"rejected": 0, "decreases": 0}
+
+    async def acquire(self):
+        async with self._cond:
+            try:
+                await asyncio.wait_for(
+                    self._cond.wait_for(lambda: self.in_flight < int(self.limit)),
+                    self.queue_timeout
+                )
+            except asyncio.TimeoutError:
+                self.stats["rejected"] += 1
+                raise ServiceUnavailableError(self.name, "concurrency limit reached", self.queue_timeout)
+            self.in_flight += 1
+
+    async def release(self, failed: bool, latency: float, adjust: bool = True):
+        """Free a slot; ``adjust=False`` leaves the limit alone (abandoned calls)."""
+        now = time.monotonic()
+        if adjust:
+            if failed or latency > self.target_latency:
+                if now - self._last_decrease >= latency:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self._last_decrease = now
+                    self.stats["decreases"] += 1
+            else:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "target_latency_seconds": self.target_latency,
+            **self.stats
+        }
+
+class UpstreamGuard:
+    """Circuit breaker plus concurrency limiter for one upstream endpoint."""
+
+    def __init__(self, breaker: CircuitBreaker, limiter: AIMDLimiter):
+        self.breaker = breaker
+        self.limiter = limiter
+
+    @asynccontextmanager
+    async def slot(self):
+        """Guard a call; the body must set ``outcome["failed"]`` when it fails."""
+        self.breaker.before_call()
+        try:
+            await self.limiter.acquire()
+        except ServiceUnavailableError:
+            self.breaker.cancel_call()
+            raise
+
+        outcome = {"failed": False}
+        cancelled = False
+        start = time.monotonic()
+        try:
+            yield outcome
+        except asyncio.CancelledError:
+            # Abandoned (e.g. a losing hedge): says nothing about upstream health
+            cancelled = True
+            raise
+        except Exception:
+            outcome["failed"] = True
+            raise
+        finally:
+            latency = time.monotonic() - start
+            if cancelled:
+                self.breaker.cancel_call()
+            else:
+                self.breaker.record(outcome["failed"], latency)
+            await self.limiter.release(outcome["failed"], latency, adjust=not cancelled)
+
+    def snapshot(self) -> dict:
+        return {"breaker": self.breaker.snapshot(), "limiter": self.limiter.snapshot()}
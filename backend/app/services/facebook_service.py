@@ -1,6 +1,50 @@
-import requests
+import httpx
+import os
+import time
+from typing import Dict, List, Optional, Tuple
 from fastapi import HTTPException
-from ..utils.token_manager import get_valid_token
+from dotenv import load_dotenv
+from ..utils.token_manager import get_valid_token, get_token_for_user
+from ..utils.crypto import TokenCrypto, decrypt_val
+from .rate_limiter import rate_limiter
+from .platform_http import platform_http, error_detail, UPLOAD_TIMEOUT
+from .media_stream import open_media, multipart_body
+
+load_dotenv()
+
+FACEBOOK_PAGE_CACHE_TTL = float(os.getenv("FACEBOOK_PAGE_CACHE_TTL", "3600"))  # seconds
+
+# Graph API error code for an expired or revoked access token
+GRAPH_INVALID_TOKEN_CODE = 190
+
+class FacebookPageCache:
+    """In-process TTL cache of each user's resolved page (id, name, page token) and page list."""
+
+    def __init__(self, ttl: float = FACEBOOK_PAGE_CACHE_TTL):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, dict, Optional[List[dict]]]] = {}
+        self.stats = {"hits": 0, "misses": 0, "resolved": 0, "invalidated": 0}
+
+    def get(self, user_id: str) -> Optional[Tuple[dict, Optional[List[dict]]]]:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] <= time.monotonic():
+            self._entries.pop(user_id, None)
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return entry[1], entry[2]
+
+    def set(self, user_id: str, page: dict, pages: Optional[List[dict]] = None):
+        self._entries[user_id] = (time.monotonic() + self.ttl, page, pages)
+
+    def invalidate(self, user_id: str):
+        if self._entries.pop(user_id, None) is not None:
+            self.stats["invalidated"] += 1
+
+    def snapshot(self) -> dict:
+        return {"entries": len(self._entries), "ttl_seconds": self.ttl, **self.stats}
+
+facebook_page_cache = FacebookPageCache()
 
 class FacebookPostingService:
     def __init__(self, token_manager=None):
@@ -11,44 +55,21 @@ class FacebookPostingService:
     async def post_content(self, user_id: str, content: str, image_url: str = None, db=None):
         """Post content to Facebook page."""
         try:
-            token = await self.token_manager(user_id, "facebook", db)
-
-            # First, get user's pages
-            pages_url = f"{self.base_url}/me/accounts"
-            pages_response = requests.get(pages_url, params={"access_token": token})
-            pages_response.raise_for_status()
-            pages_data = pages_response.json()
-
-            if not pages_data.get("data"):
-                raise HTTPException(status_code=400, detail="No Facebook pages found. User must manage at least one page.")
-
-            # Use the first page (in a real app, user should choose)
-            page = pages_data["data"][0]
-            page_id = page["id"]
-            page_access_token = page["access_token"]
-
-            # Prepare post data
-            post_data = {
-                "message": content,
-                "access_token": page_access_token
-            }
+            await rate_limiter.acquire("facebook", user_id)
+            page = await self.resolve_page(user_id, db)
 
-            # Add image if provided
-            if image_url:
-                # For images, we need to upload via multipart
-                post_url = f"{self.base_url}/{page_id}/photos"
-                files = {
-                    "source": requests.get(image_url).content
-                }
-                response = requests.post(post_url, data=post_data, files=files)
-            else:
-                # Text-only post
-                post_url = f"{self.base_url}/{page_id}/feed"
-                response = requests.post(post_url, data=post_data)
+            response = await self._post_to_page(user_id, page, content, image_url)
+            if self._token_rejected(response):
+                # Page token revoked or expired: derive a fresh one and retry once
+                facebook_page_cache.invalidate(user_id)
+                page = await self.resolve_page(user_id, db, refresh=True)
+                await rate_limiter.acquire("facebook", user_id)
+                response = await self._post_to_page(user_id, page, content, image_url)
 
             response.raise_for_status()
             result = response.json()
 
+            page_id = page["id"]
             post_id = result.get("id") or result.get("post_id")
             return {
                 "success": True,
@@ -58,27 +79,128 @@ class FacebookPostingService:
                 "url": f"https://www.facebook.com/{page_id}/posts/{post_id.split('_')[-1] if '_' in post_id else post_id}"
             }
 
-        except requests.RequestException as e:
-            error_detail = e.response.json() if e.response else str(e)
-            raise HTTPException(status_code=500, detail=f"Facebook posting failed: {error_detail}")
+        except HTTPException:
+            raise
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=500, detail=f"Facebook posting failed: {error_detail(e)}")
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Facebook posting error: {str(e)}")
 
+    async def _post_to_page(self, user_id: str, page: dict, content: str, image_url: Optional[str]) -> httpx.Response:
+        post_data = {
+            "message": content,
+            "access_token": page["access_token"]
+        }
+
+        if image_url:
+            # For images, stream the download into a multipart upload
+            post_url = f"{self.base_url}/{page['id']}/photos"
+            async with open_media(image_url, platform="facebook") as media:
+                headers, body = multipart_body(post_data, "source", media)
+                response = await platform_http.client_for(post_url).post(
+                    post_url, headers=headers, content=body, timeout=UPLOAD_TIMEOUT
+                )
+        else:
+            # Text-only post
+            post_url = f"{self.base_url}/{page['id']}/feed"
+            response = await platform_http.client_for(post_url).post(post_url, data=post_data)
+
+        rate_limiter.check_graph_response("facebook", user_id, response)
+        return response
+
+    @staticmethod
+    def _token_rejected(response: httpx.Response) -> bool:
+        if response.status_code < 400:
+            return False
+        try:
+            error = response.json().get("error") or {}
+        except ValueError:
+            return False
+        return isinstance(error, dict) and error.get("code") == GRAPH_INVALID_TOKEN_CODE
+
+    async def resolve_page(self, user_id: str, db, refresh: bool = False) -> dict:
+        """Get the page to publish to and its page token.
+
+        Served from the in-process cache, then from the token row (OAuth stores the page
+        id in ``member_id`` and the page token as the access token). ``/me/accounts`` is
+        only called when the row has no page yet or ``refresh`` is set because the stored
+        page token was rejected.
+        """
+        if not refresh:
+            cached = facebook_page_cache.get(user_id)
+            if cached:
+                return cached[0]
+
+        token_row = get_token_for_user(user_id, "facebook", db)
+        if not token_row or not token_row.access_token:
+            raise HTTPException(status_code=401, detail="No linked Facebook account")
+
+        if token_row.member_id and not refresh:
+            page = {"id": token_row.member_id, "name": None, "access_token": decrypt_val(token_row.access_token)}
+            facebook_page_cache.set(user_id, page)
+            return page
+
+        page, pages = await self._resolve_from_user_token(user_id, token_row, db)
+        facebook_page_cache.set(user_id, page, pages)
+        return page
+
+    async def _resolve_from_user_token(self, user_id: str, token_row, db) -> Tuple[dict, List[dict]]:
+        """Look the page up with the user token and store it on the token row."""
+        if token_row.user_access_token:
+            user_token = decrypt_val(token_row.user_access_token)
+        elif not token_row.member_id:
+            # No page resolved yet, so the access token is still the user token
+            user_token = await self.token_manager(user_id, "facebook", db)
+        else:
+            raise HTTPException(status_code=401, detail="Facebook page token was rejected. Please reconnect Facebook.")
+
+        pages = await self._fetch_pages(user_id, user_token)
+        if not pages:
+            raise HTTPException(status_code=400, detail="No Facebook pages found. User must manage at least one page.")
+
+        # Keep the page the user connected, falling back to the first one
+        page = next((p for p in pages if p["id"] == token_row.member_id), pages[0])
+
+        token_row.member_id = page["id"]
+        token_row.access_token = TokenCrypto.encrypt_token(page["access_token"])
+        token_row.user_access_token = TokenCrypto.encrypt_token(user_token)
+        db.commit()
+        facebook_page_cache.stats["resolved"] += 1
+        return page, pages
+
+    async def _fetch_pages(self, user_id: str, user_token: str) -> List[dict]:
+        pages_url = f"{self.base_url}/me/accounts"
+        await rate_limiter.acquire("facebook", user_id)
+        response = await platform_http.client_for(pages_url).get(
+            pages_url, params={"access_token": user_token, "fields": "id,name,access_token"}
+        )
+        rate_limiter.check_graph_response("facebook", user_id, response)
+        if self._token_rejected(response):
+            raise HTTPException(status_code=401, detail="Facebook authorization expired. Please reconnect Facebook.")
+        response.raise_for_status()
+        return [{
+            "id": page["id"],
+            "name": page.get("name"),
+            "access_token": page["access_token"]
+        } for page in response.json().get("data", [])]
+
     async def get_user_pages(self, user_id: str, db=None):
         """Get user's Facebook pages."""
         try:
-            token = await self.token_manager(user_id, "facebook", db)
+            cached = facebook_page_cache.get(user_id)
+            if cached and cached[1] is not None:
+                return cached[1]
 
-            pages_url = f"{self.base_url}/me/accounts"
-            response = requests.get(pages_url, params={"access_token": token})
-            response.raise_for_status()
-            pages_data = response.json()
+            token_row = get_token_for_user(user_id, "facebook", db)
+            if not token_row or not token_row.access_token:
+                return []
+            if token_row.member_id and not token_row.user_access_token:
+                # Connected before user tokens were kept: only the stored page is known
+                return [await self.resolve_page(user_id, db)]
 
-            return [{
-                "id": page["id"],
-                "name": page["name"],
-                "access_token": page["access_token"]
-            } for page in pages_data.get("data", [])]
+            page, pages = await self._resolve_from_user_token(user_id, token_row, db)
+            facebook_page_cache.set(user_id, page, pages)
+            return pages
 
         except Exception as e:
             print(f"Failed to get Facebook pages: {str(e)}")
@@ -0,0 +1,210 @@
+"""Content-addressed cache for n8n generation results.
+
+Entries are keyed on a SHA-256 of the webhook path and the normalized payload, minus
+fields that only identify the caller, so users generating for the same trending topic
+share one Gemini run. Entries live in an in-memory LRU with a TTL and, optionally, in
+the ``generation_cache`` table so hits survive restarts. Postgen responses carry signed
+image URLs that expire (the ``se=`` query parameter), so an entry never outlives the
+earliest such expiry.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from urllib.parse import urlsplit, parse_qs
+from dotenv import load_dotenv
+from ..database import SessionLocal
+from ..models import GenerationCacheEntry
+
+load_dotenv()
+
+GENERATION_CACHE_ENABLED = os.getenv("GENERATION_CACHE_ENABLED", "true").lower() == "true"
+GENERATION_CACHE_TTL_SECONDS = int(os.getenv("GENERATION_CACHE_TTL_SECONDS", "21600"))  # 6 hours
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "1000"))
+GENERATION_CACHE_PERSISTENT = os.getenv("GENERATION_CACHE_PERSISTENT", "false").lower() == "true"
+
+# Cached signed URLs must stay fetchable this long after a hit (image persistence downloads them)
+SIGNED_URL_MARGIN = timedelta(minutes=10)
+
+# Payload fields that identify the caller but do not change what n8n generates (no
+# workflow reads user_name; preferences, which do shape the output, stay in the key)
+IDENTITY_FIELDS = {"user_id", "user_name", "summary_id", "platform_id"}
+
+def normalize_preferences(preferences) -> list:
+    """Turn stored preferences (JSON string or list) into a sorted, lower-cased list."""
+    if isinstance(preferences, str):
+        try:
+            preferences = json.loads(preferences) if preferences.strip() else []
+        except json.JSONDecodeError:
+            preferences = [preferences]
+    if not isinstance(preferences, list):
+        preferences = [preferences] if preferences else []
+    return sorted({str(p).strip().lower() for p in preferences if str(p).strip()})
+
+def cache_key(webhook: str, payload: dict) -> str:
+    """Hash a webhook call into a cache key."""
+    normalized = {k: v for k, v in payload.items() if k not in IDENTITY_FIELDS}
+    if "user_preferences" in normalized:
+        normalized["user_preferences"] = normalize_preferences(normalized["user_preferences"])
+    if isinstance(normalized.get("platforms"), list):
+        normalized["platforms"] = sorted(str(p).lower() for p in normalized["platforms"])
+
+    canonical = json.dumps({"webhook": webhook, "payload": normalized}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def signed_url_expiry(value) -> Optional[datetime]:
+    """The earliest ``se=`` expiry of any signed URL in a response, as naive UTC."""
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        expiries = [e for e in (signed_url_expiry(v) for v in value) if e is not None]
+        return min(expiries) if expiries else None
+    if not isinstance(value, str) or "se=" not in value or not value.startswith(("http://", "https://")):
+        return None
+    expiry = parse_qs(urlsplit(value).query).get("se")
+    if not expiry:
+        return None
+    try:
+        parsed = datetime.fromisoformat(expiry[0].replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+class GenerationCache:
+    """TTL + LRU cache of n8n responses with an optional database tier."""
+
+    def __init__(
+        self,
+        max_entries: int = GENERATION_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = GENERATION_CACHE_TTL_SECONDS,
+        persistent: bool = GENERATION_CACHE_PERSISTENT
+    ):
+        self.max_entries = max_entries
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, json)
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "bypassed": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "uncacheable": 0
+        }
+
+    def get(self, key: str) -> Optional[dict]:
+        """Get a cached response, or None on a miss."""
+        now = datetime.utcnow()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                self.stats["memory_hits"] += 1
+                return json.loads(value)
+            del self._entries[key]
+            self.stats["expirations"] += 1
+
+        if self.persistent:
+            value = self._get_persistent(key, now)
+            if value is not None:
+                self.stats["hits"] += 1
+                self.stats["persistent_hits"] += 1
+                return value
+
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, key: str, webhook: str, value: dict):
+        """Store a response in memory and, if enabled, in the database.
+
+        The entry expires before any signed URL in it does; a response whose URLs are
+        about to expire is not cached at all.
+        """
+        expires_at = datetime.utcnow() + self.ttl
+        url_expiry = signed_url_expiry(value)
+        if url_expiry is not None:
+            expires_at = min(expires_at, url_expiry - SIGNED_URL_MARGIN)
+            if expires_at <= datetime.utcnow():
+                self.stats["uncacheable"] += 1
+                return
+        serialized = json.dumps(value)
+        self._remember(key, expires_at, serialized)
+
+        if self.persistent:
+            self._set_persistent(key, webhook, serialized, expires_at)
+
+    def clear(self):
+        """Drop all in-memory entries."""
+        self._entries.clear()
+
+    def snapshot(self) -> dict:
+        """Counters and sizing for the diagnostics endpoint."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": int(self.ttl.total_seconds()),
+            "persistent": self.persistent
+        }
+
+    def _remember(self, key: str, expires_at: datetime, serialized: str):
+        self._entries[key] = (expires_at, serialized)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _get_persistent(self, key: str, now: datetime) -> Optional[dict]:
+        db = SessionLocal()
+        try:
+            row = db.query(GenerationCacheEntry).filter(GenerationCacheEntry.cache_key == key).first()
+            if row is None:
+                return None
+            if row.expires_at <= now:
+                db.delete(row)
+                db.commit()
+                self.stats["expirations"] += 1
+                return None
+
+            # Promote to the memory tier
+            self._remember(key, row.expires_at, row.response)
+            return json.loads(row.response)
+        except Exception as e:
+            print(f"[GENERATION CACHE] Persistent lookup failed: {str(e)}")
+            return None
+        finally:
+            db.close()
+
+    def _set_persistent(self, key: str, webhook: str, serialized: str, expires_at: datetime):
+        db = SessionLocal()
+        try:
+            row = db.query(GenerationCacheEntry).filter(GenerationCacheEntry.cache_key == key).first()
+            if row:
+                row.response = serialized
+                row.expires_at = expires_at
+            else:
+                db.add(GenerationCacheEntry(
+                    cache_key=key,
+                    webhook=webhook,
+                    response=serialized,
+                    expires_at=expires_at
+                ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"[GENERATION CACHE] Persistent store failed: {str(e)}")
+        finally:
+            db.close()
+
+generation_cache = GenerationCache()
@@ -0,0 +1,87 @@
+"""In-process pub/sub of generation progress, streamed to clients as server-sent events."""
+import asyncio
+import json
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+# Events after which a stream is closed
+TERMINAL_EVENTS = {"generation_complete", "generation_failed"}
+
+class GenerationEventBus:
+    """Fan out progress events for a summary to every subscribed stream.
+
+    A short history is kept per summary so a client that subscribes right after
+    starting a generation still receives the events published before it connected.
+    A finished run is not replayed, so a late subscriber waits for the next run instead
+    of being closed at once, unless it asks for that run's job id.
+    """
+
+    def __init__(self, history_size: int = 50, max_tracked_summaries: int = 1000):
+        self.history_size = history_size
+        self.max_tracked_summaries = max_tracked_summaries
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._history: "OrderedDict[str, deque]" = OrderedDict()
+
+    def publish(self, summary_id: str, event: str, data: dict = None):
+        """Publish an event for a summary."""
+        summary_id = str(summary_id)
+        message = {
+            "event": event,
+            "data": data or {},
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+        # A new generation run starts a fresh history
+        if event == "generation_started":
+            self._history.pop(summary_id, None)
+
+        history = self._history.get(summary_id)
+        if history is None:
+            history = deque(maxlen=self.history_size)
+            self._history[summary_id] = history
+            while len(self._history) > self.max_tracked_summaries:
+                self._history.popitem(last=False)
+        else:
+            self._history.move_to_end(summary_id)
+        history.append(message)
+
+        for queue in self._subscribers.get(summary_id, ()):
+            queue.put_nowait(message)
+
+    def subscribe(self, summary_id: str, job_id: Optional[str] = None) -> asyncio.Queue:
+        """Subscribe to a summary's events, replaying the recent history.
+
+        History up to the last terminal event is skipped unless that event belongs to
+        ``job_id``, the job the client is waiting on.
+        """
+        summary_id = str(summary_id)
+        queue: asyncio.Queue = asyncio.Queue()
+        history = list(self._history.get(summary_id, ()))
+        for index in range(len(history) - 1, -1, -1):
+            message = history[index]
+            if message["event"] in TERMINAL_EVENTS:
+                if job_id is None or message["data"].get("job_id") != str(job_id):
+                    history = history[index + 1:]
+                break
+        for message in history:
+            queue.put_nowait(message)
+        self._subscribers.setdefault(summary_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, summary_id: str, queue: asyncio.Queue):
+        """Remove a subscriber queue."""
+        summary_id = str(summary_id)
+        subscribers = self._subscribers.get(summary_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[summary_id]
+
+def format_sse(message: dict) -> str:
+    """Format a bus message as a server-sent event frame."""
+    payload = dict(message["data"], timestamp=message["timestamp"])
+    return f"event: {message['event']}\ndata: {json.dumps(payload)}\n\n"
+
+generation_events = GenerationEventBus()
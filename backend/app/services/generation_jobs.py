@@ -0,0 +1,174 @@
+"""Background execution of n8n generation requests.
+
+Endpoints called with ``?async=true`` create a ``GenerationJob`` row, answer 202 right
+away and let these coroutines run the n8n round trip after the response is sent.
+"""
+import json
+import httpx
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models import GenerationJob, PostSummary
+from .n8n_client import n8n_client, N8NError, N8N_SUMMARY_WEBHOOK, N8N_POSTGEN_WEBHOOK
+from .generation_service import (
+    save_platform_content, generate_platform_content_fan_out, generate_summaries_batch
+)
+from .generation_events import generation_events
+
+def create_job(db: Session, user_id: str, job_type: str, summary_id: str = None) -> GenerationJob:
+    """Create a pending generation job."""
+    job = GenerationJob(
+        user_id=user_id,
+        job_type=job_type,
+        summary_id=summary_id,
+        status="pending"
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def job_to_dict(job: GenerationJob) -> dict:
+    """Serialize a job for the status endpoint."""
+    return {
+        "job_id": str(job.id),
+        "job_type": job.job_type,
+        "status": job.status,
+        "summary_id": str(job.summary_id) if job.summary_id else None,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error_message,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None
+    }
+
+def _set_status(db: Session, job: GenerationJob, status: str, result: dict = None, error: str = None):
+    job.status = status
+    if result is not None:
+        job.result = json.dumps(result)
+    job.error_message = error
+    job.updated_at = datetime.utcnow()
+    db.commit()
+
+    if status == "failed" and job.summary_id:
+        generation_events.publish(job.summary_id, "generation_failed", {"job_id": str(job.id), "error": error})
+
+async def run_summary_job(job_id: str, n8n_payload: dict, bypass_cache: bool = False):
+    """Run the summary webhook and store the text on the job's PostSummary."""
+    db = SessionLocal()
+    try:
+        job = db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+        if not job:
+            return
+        _set_status(db, job, "running")
+
+        try:
+            n8n_response = await n8n_client.post(
+                N8N_SUMMARY_WEBHOOK, n8n_payload, cache=True, coalesce=True, bypass_cache=bypass_cache
+            )
+            summary_text = n8n_response.get("summary", "")
+
+            post_summary = db.query(PostSummary).filter(PostSummary.id == job.summary_id).first()
+            post_summary.summary_text = summary_text
+            post_summary.updated_at = datetime.utcnow()
+            db.commit()
+            generation_events.publish(post_summary.id, "summary_ready", {
+                "summary_id": str(post_summary.id),
+                "summary_text": summary_text
+            })
+
+            _set_status(db, job, "completed", result={
+                "summary_id": str(post_summary.id),
+                "topic": post_summary.topic,
+                "summary_text": summary_text,
+                "summary_approved": False,
+                "generated": True,
+                "message": "Summary generated and saved to database"
+            })
+            generation_events.publish(post_summary.id, "generation_complete", {
+                "job_id": str(job.id),
+                "summary_id": str(post_summary.id)
+            })
+        except N8NError as e:
+            _set_status(db, job, "failed", error=f"n8n summary generation failed: {e.status_code}")
+        except HTTPException as e:
+            _set_status(db, job, "failed", error=e.detail)
+        except httpx.HTTPError as e:
+            _set_status(db, job, "failed", error=f"Error calling n8n: {str(e)}")
+        except Exception as e:
+            db.rollback()
+            _set_status(db, job, "failed", error=f"Unexpected error: {str(e)}")
+    finally:
+        db.close()
+
+async def run_content_job(job_id: str, n8n_payload: dict, bypass_cache: bool = False, image_payload: dict = None):
+    """Run the postgen webhook and store the results as PostPlatform rows.
+
+    Passing ``image_payload`` runs generation in per-platform fan-out mode.
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+        if not job:
+            return
+        _set_status(db, job, "running")
+
+        try:
+            if image_payload is not None:
+                result = await generate_platform_content_fan_out(
+                    db, job.summary_id, n8n_payload, image_payload, bypass_cache
+                )
+                status = "completed" if result["generated"] else "failed"
+                _set_status(db, job, status, result=result, error=None if result["generated"] else "No platform content generated")
+                if result["generated"]:
+                    generation_events.publish(job.summary_id, "generation_complete", {
+                        "job_id": str(job.id),
+                        "platforms": len(result["platforms"]),
+                        "failed_platforms": len(result["failed_platforms"])
+                    })
+                return
+
+            n8n_response = await n8n_client.post(
+                N8N_POSTGEN_WEBHOOK, n8n_payload, cache=True, coalesce=True, bypass_cache=bypass_cache
+            )
+            created_platforms = save_platform_content(db, job.summary_id, n8n_response)
+
+            _set_status(db, job, "completed", result={
+                "summary_id": str(job.summary_id),
+                "platforms": created_platforms,
+                "generated": True,
+                "message": f"Generated content for {len(created_platforms)} platforms"
+            })
+            generation_events.publish(job.summary_id, "generation_complete", {
+                "job_id": str(job.id),
+                "platforms": len(created_platforms)
+            })
+        except N8NError as e:
+            _set_status(db, job, "failed", error=f"n8n post generation failed: {e.status_code}")
+        except HTTPException as e:
+            _set_status(db, job, "failed", error=e.detail)
+        except httpx.HTTPError as e:
+            _set_status(db, job, "failed", error=f"Error calling n8n: {str(e)}")
+        except Exception as e:
+            db.rollback()
+            _set_status(db, job, "failed", error=f"Unexpected error: {str(e)}")
+    finally:
+        db.close()
+
+async def run_summary_batch_job(job_id: str, payloads: list, concurrency: int, bypass_cache: bool = False):
+    """Run a batch of summary generations and store the per-topic results on the job."""
+    db = SessionLocal()
+    try:
+        job = db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+        if not job:
+            return
+        _set_status(db, job, "running")
+
+        try:
+            result = await generate_summaries_batch(db, job.user_id, payloads, concurrency, bypass_cache)
+            _set_status(db, job, "completed", result=result)
+        except Exception as e:
+            db.rollback()
+            _set_status(db, job, "failed", error=f"Unexpected error: {str(e)}")
+    finally:
+        db.close()
@@ -0,0 +1,311 @@
+"""Helpers that turn n8n generation responses into PostPlatform rows."""
+import asyncio
+import os
+import httpx
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from ..models import PostPlatform, PostSummary
+from .generation_events import generation_events
+from .image_persistence import image_persister
+from .n8n_client import (
+    n8n_client, N8NError, N8N_SUMMARY_WEBHOOK, N8N_POSTGEN_WEBHOOK, N8N_REGENERATE_IMAGE_WEBHOOK
+)
+
+load_dotenv()
+
+# Fan-out mode: generate each platform (and the image) with its own n8n call
+N8N_POSTGEN_FAN_OUT = os.getenv("N8N_POSTGEN_FAN_OUT", "false").lower() == "true"
+N8N_FANOUT_PLATFORM_TIMEOUT = float(os.getenv("N8N_FANOUT_PLATFORM_TIMEOUT", "45"))
+N8N_FANOUT_IMAGE_TIMEOUT = float(os.getenv("N8N_FANOUT_IMAGE_TIMEOUT", "90"))
+
+# Batch summary generation
+N8N_BATCH_CONCURRENCY = int(os.getenv("N8N_BATCH_CONCURRENCY", "5"))
+N8N_BATCH_MAX_CONCURRENCY = int(os.getenv("N8N_BATCH_MAX_CONCURRENCY", "20"))
+N8N_BATCH_MAX_TOPICS = int(os.getenv("N8N_BATCH_MAX_TOPICS", "100"))
+
+# Map platform names to proper format
+PLATFORM_MAP = {
+    "x": "twitter",
+    "facebook": "facebook",
+    "linkedin": "linkedin",
+    "instagram": "instagram",
+    "youtube": "youtube"
+}
+
+# Keys the postgen workflow uses for each platform's content
+CONTENT_KEYS = {
+    "twitter": "X Post",
+    "facebook": "facebook Caption",
+    "instagram": "Instagram Caption",
+    "linkedin": "LinkedIn Post",
+    "youtube": "youtube Caption"
+}
+
+def normalize_platform_name(platform_name: str) -> str:
+    """Map an n8n/frontend platform name to the name stored on PostPlatform."""
+    return PLATFORM_MAP.get(platform_name.lower(), platform_name.lower())
+
+def content_key_for(clean_platform_name: str) -> str:
+    """Get the n8n response key holding the post content for a platform."""
+    return CONTENT_KEYS.get(clean_platform_name, f"{clean_platform_name.title()} Post")
+
+def save_platform_post(
+    db: Session,
+    summary_id: str,
+    clean_platform_name: str,
+    post_content: str,
+    image_url: Optional[str]
+) -> dict:
+    """Create or update the PostPlatform row for one platform and publish ``post_ready``.
+
+    ``image_url=None`` leaves the image of an existing row untouched. An image that
+    has already been persisted is stored under its stable URL.
+    """
+    image_url = image_persister.resolve(image_url)
+    # Check if platform record already exists
+    existing_platform = db.query(PostPlatform).filter(
+        PostPlatform.summary_id == summary_id,
+        PostPlatform.platform_name == clean_platform_name
+    ).first()
+
+    if existing_platform:
+        # Update existing record
+        existing_platform.post_text = post_content
+        if image_url is not None:
+            existing_platform.image_url = image_url
+        existing_platform.updated_at = datetime.utcnow()
+        platform_record = existing_platform
+    else:
+        # Create new platform record
+        platform_record = PostPlatform(
+            summary_id=summary_id,
+            platform_name=clean_platform_name,
+            post_text=post_content,
+            image_url=image_url
+        )
+        db.add(platform_record)
+
+    # Commit after all operations per platform
+    db.commit()
+
+    platform_result = {
+        "platform_id": str(platform_record.id),
+        "platform_name": clean_platform_name,
+        "post_text": post_content,
+        "image_url": platform_record.image_url,
+        "updated": existing_platform is not None
+    }
+    generation_events.publish(summary_id, "post_ready", platform_result)
+    return platform_result
+
+def save_platform_content(db: Session, summary_id: str, n8n_response: dict) -> list:
+    """Create or update a PostPlatform row for each platform in a postgen response.
+
+    A ``post_ready`` event is published as each row is saved, then ``image_ready``.
+    """
+    platforms_list = n8n_response.get("Platforms", [])
+    image_url = n8n_response.get("image url", "")
+
+    # Create platform records for each platform
+    created_platforms = []
+    for platform_name in platforms_list:
+        clean_platform_name = normalize_platform_name(platform_name)
+
+        # Get platform-specific content
+        post_content = n8n_response.get(content_key_for(clean_platform_name), "")
+        created_platforms.append(save_platform_post(db, summary_id, clean_platform_name, post_content, image_url))
+
+    if image_url:
+        generation_events.publish(summary_id, "image_ready", {"image_url": image_url})
+        image_persister.schedule(summary_id, image_url)
+
+    return created_platforms
+
+def _describe_error(e: Exception, what: str) -> str:
+    if isinstance(e, N8NError):
+        return f"n8n {what} failed: {e.status_code}"
+    if isinstance(e, asyncio.TimeoutError):
+        return f"n8n {what} timed out"
+    if isinstance(e, HTTPException):
+        return str(e.detail)
+    if isinstance(e, httpx.HTTPError):
+        return f"Error calling n8n: {str(e)}"
+    return f"Unexpected error: {str(e)}"
+
+async def generate_platform_content_fan_out(
+    db: Session,
+    summary_id: str,
+    postgen_payload: dict,
+    image_payload: dict,
+    bypass_cache: bool = False
+) -> dict:
+    """Generate each platform's post and the shared image as concurrent n8n calls.
+
+    Every platform gets its own postgen call (``generate_image`` off) and the image
+    comes from one regenerate-image call, each bounded by its own timeout. Rows are
+    saved as results arrive, so a slow or failing platform no longer holds back or
+    fails the rest; failures are reported per platform.
+    """
+    platforms = postgen_payload.get("platforms", [])
+
+    async def generate_text(platform_name: str) -> dict:
+        payload = dict(postgen_payload, platforms=[platform_name], generate_image=False)
+        return await asyncio.wait_for(
+            n8n_client.post(N8N_POSTGEN_WEBHOOK, payload, cache=True, bypass_cache=bypass_cache, coalesce=True),
+            N8N_FANOUT_PLATFORM_TIMEOUT
+        )
+
+    async def generate_image() -> dict:
+        return await asyncio.wait_for(
+            n8n_client.post(N8N_REGENERATE_IMAGE_WEBHOOK, image_payload, coalesce=True),
+            N8N_FANOUT_IMAGE_TIMEOUT
+        )
+
+    tasks = {asyncio.ensure_future(generate_text(p)): p for p in platforms}
+    image_task = asyncio.ensure_future(generate_image())
+    tasks[image_task] = None
+
+    created_platforms = []
+    failed_platforms = []
+    image_url = None
+    image_error = None
+
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is image_task:
+                    try:
+                        image_url = task.result().get("image url", "") or None
+                        if not image_url:
+                            image_error = "No image URL returned from n8n"
+                    except Exception as e:
+                        image_error = _describe_error(e, "image generation")
+                        continue
+                    if image_url:
+                        _apply_image_url(db, summary_id, created_platforms, image_url)
+                    continue
+
+                clean_platform_name = normalize_platform_name(tasks[task])
+                try:
+                    n8n_response = task.result()
+                except Exception as e:
+                    error = _describe_error(e, "post generation")
+                    failed_platforms.append({"platform_name": clean_platform_name, "status": "failed", "error": error})
+                    generation_events.publish(summary_id, "post_failed", {"platform_name": clean_platform_name, "error": error})
+                    continue
+
+                post_content = n8n_response.get(content_key_for(clean_platform_name), "")
+                created_platforms.append(save_platform_post(db, summary_id, clean_platform_name, post_content, image_url))
+    finally:
+        # The request went away; don't leave orphaned n8n calls behind
+        for task in pending:
+            task.cancel()
+
+    return {
+        "summary_id": summary_id,
+        "platforms": created_platforms,
+        "failed_platforms": failed_platforms,
+        "image_url": image_url,
+        "image_error": image_error,
+        "generated": len(created_platforms) > 0,
+        "partial": bool(failed_platforms or image_error),
+        "message": f"Generated content for {len(created_platforms)} of {len(platforms)} platforms"
+    }
+
+def _apply_image_url(db: Session, summary_id: str, created_platforms: list, image_url: str):
+    """Set the generated image on the rows saved before it arrived."""
+    platform_ids = [p["platform_id"] for p in created_platforms]
+    if platform_ids:
+        db.query(PostPlatform).filter(PostPlatform.id.in_(platform_ids)).update(
+            {"image_url": image_url, "updated_at": datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+        for platform_result in created_platforms:
+            platform_result["image_url"] = image_url
+    generation_events.publish(summary_id, "image_ready", {"image_url": image_url})
+    image_persister.schedule(summary_id, image_url)
+
+def batch_concurrency(requested: Optional[int]) -> int:
+    """Clamp a client-requested batch concurrency to the configured bounds."""
+    if not requested or requested < 1:
+        return N8N_BATCH_CONCURRENCY
+    return min(requested, N8N_BATCH_MAX_CONCURRENCY)
+
+async def generate_summaries_batch(
+    db: Session,
+    user_id: str,
+    payloads: list,
+    concurrency: int,
+    bypass_cache: bool = False
+) -> dict:
+    """Run summary generation for many topics and insert all summaries in one transaction.
+
+    At most ``concurrency`` n8n calls are in flight at once. Results are returned
+    per topic, in request order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def generate(payload: dict) -> dict:
+        async with semaphore:
+            return await n8n_client.post(
+                N8N_SUMMARY_WEBHOOK, payload, cache=True, bypass_cache=bypass_cache, coalesce=True
+            )
+
+    responses = await asyncio.gather(*(generate(p) for p in payloads), return_exceptions=True)
+
+    results = []
+    new_summaries = []
+    for payload, response in zip(payloads, responses):
+        if isinstance(response, BaseException):
+            results.append({
+                "topic": payload["topic"],
+                "status": "failed",
+                "summary_id": None,
+                "summary_text": None,
+                "error": _describe_error(response, "summary generation")
+            })
+            continue
+
+        post_summary = PostSummary(
+            user_id=user_id,
+            topic=payload["topic"],
+            summary_text=response.get("summary", ""),
+            summary_approved=False  # Not approved yet
+        )
+        new_summaries.append(post_summary)
+        results.append({
+            "topic": payload["topic"],
+            "status": "generated",
+            "summary_id": None,
+            "summary_text": None,
+            "error": None,
+            "summary": post_summary
+        })
+
+    # Bulk insert every generated summary in a single transaction
+    db.add_all(new_summaries)
+    db.commit()
+
+    for result in results:
+        post_summary = result.pop("summary", None)
+        if post_summary is not None:
+            result["summary_id"] = str(post_summary.id)
+            result["summary_text"] = post_summary.summary_text
+            generation_events.publish(post_summary.id, "summary_ready", {
+                "summary_id": result["summary_id"],
+                "summary_text": post_summary.summary_text
+            })
+
+    generated = sum(1 for r in results if r["status"] == "generated")
+    return {
+        "results": results,
+        "generated": generated,
+        "failed": len(results) - generated,
+        "message": f"Generated {generated} of {len(results)} summaries"
+    }
@@ -0,0 +1,80 @@
+"""Latency tracking and a retry budget for hedged upstream calls."""
+import math
+import time
+from collections import deque
+from typing import Optional
+
+class LatencyTracker:
+    """Sliding window of successful call latencies used to pick the hedge delay."""
+
+    def __init__(self, window_size: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window_size)
+
+    def record(self, latency: float):
+        self._samples.append(latency)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Nearest-rank percentile, or None until ``min_samples`` calls were seen."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+        return ordered[rank - 1]
+
+    def snapshot(self) -> dict:
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        return {
+            "samples": len(self._samples),
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None
+        }
+
+class RetryBudget:
+    """Token bucket that caps hedges and retries to a fraction of original calls.
+
+    Every original call deposits ``ratio`` tokens and a trickle of ``min_per_second``
+    keeps low-traffic periods usable; each hedge or retry spends one token. When the
+    upstream is down the bucket drains and extra attempts stop, so they can never
+    multiply load during an outage.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 1.0, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._last_refill = time.monotonic()
+        self.stats = {"requests": 0, "spent": 0, "exhausted": 0}
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self._last_refill) * self.min_per_second)
+        self._last_refill = now
+
+    def deposit(self):
+        """Credit the budget for one original call."""
+        self._refill()
+        self.stats["requests"] += 1
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Take one token for a hedge or retry; False when the budget is exhausted."""
+        self._refill()
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            self.stats["spent"] += 1
+            return True
+        self.stats["exhausted"] += 1
+        return False
+
+    def snapshot(self) -> dict:
+        self._refill()
+        return {
+            "tokens": round(self.tokens, 2),
+            "max_tokens": self.max_tokens,
+            "ratio": self.ratio,
+            "min_per_second": self.min_per_second,
+            **self.stats
+        }
@@ -0,0 +1,123 @@
+"""``Idempotency-Key`` support for endpoints with side effects on the platforms.
+
+The first request with a key stores a placeholder row, runs, and saves its response;
+a retry with the same key gets the saved response back (with an
+``Idempotent-Replayed: true`` header) instead of running again. A retry that arrives
+while the first request is still running gets a 409, and reusing a key for a
+different request body a 422. Keys are scoped to the user and endpoint and kept for
+``IDEMPOTENCY_KEY_TTL_SECONDS``.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional, Tuple
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from ..models import IdempotencyKey
+
+load_dotenv()
+
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+def request_fingerprint(payload) -> str:
+    """SHA-256 of a request body, independent of key order."""
+    return hashlib.sha256(json.dumps(jsonable_encoder(payload), sort_keys=True).encode()).hexdigest()
+
+def _claim_key(db: Session, user_id: str, endpoint: str, key: str, request_hash: str) -> Optional[IdempotencyKey]:
+    """Insert the placeholder row for a key; returns None if the key is already taken."""
+    now = datetime.utcnow()
+    # An expired key is free to use again
+    db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.endpoint == endpoint,
+        IdempotencyKey.key == key,
+        IdempotencyKey.expires_at <= now
+    ).delete(synchronize_session=False)
+
+    record = IdempotencyKey(
+        user_id=user_id,
+        endpoint=endpoint,
+        key=key,
+        request_hash=request_hash,
+        expires_at=now + timedelta(seconds=IDEMPOTENCY_KEY_TTL_SECONDS)
+    )
+    db.add(record)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+    return record
+
+def _replay(db: Session, user_id: str, endpoint: str, key: str, request_hash: str) -> JSONResponse:
+    existing = db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.endpoint == endpoint,
+        IdempotencyKey.key == key
+    ).first()
+    if existing is None:
+        # Released between our insert and this read; the client can simply retry
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+    if existing.request_hash != request_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    if existing.status_code is None:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+
+    return JSONResponse(
+        status_code=existing.status_code,
+        content=json.loads(existing.response),
+        headers={"Idempotent-Replayed": "true"}
+    )
+
+async def run_idempotent(
+    db: Session,
+    user_id: str,
+    endpoint: str,
+    key: Optional[str],
+    payload,
+    handler: Callable[[], Awaitable[Tuple[int, dict]]]
+) -> JSONResponse:
+    """Run ``handler`` once per idempotency key and return its (stored) response.
+
+    ``handler`` returns ``(status_code, content)``. If it raises, the key is released
+    so the client can retry with the same key.
+    """
+    if not key:
+        status_code, content = await handler()
+        return JSONResponse(status_code=status_code, content=jsonable_encoder(content))
+
+    if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be at most {IDEMPOTENCY_KEY_MAX_LENGTH} characters")
+
+    request_hash = request_fingerprint(payload)
+    record = _claim_key(db, user_id, endpoint, key, request_hash)
+    if record is None:
+        return _replay(db, user_id, endpoint, key, request_hash)
+
+    try:
+        status_code, content = await handler()
+    except BaseException:
+        db.rollback()
+        db.delete(record)
+        db.commit()
+        raise
+
+    content = jsonable_encoder(content)
+    record.status_code = status_code
+    record.response = json.dumps(content)
+    db.commit()
+    return JSONResponse(status_code=status_code, content=content)
+
+def purge_expired_keys(db: Session) -> int:
+    """Delete idempotency keys past their TTL."""
+    deleted = db.query(IdempotencyKey).filter(
+        IdempotencyKey.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
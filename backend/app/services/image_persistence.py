@@ -0,0 +1,179 @@
+"""Background persistence of generated images.
+
+The postgen and regenerate-image workflows return signed blob URLs that expire
+within hours (the ``se=`` query parameter), so a post approved the next day could no
+longer be published without regenerating its image. Whenever generation writes an
+``image_url``, a background task downloads the image into ``image_store`` and points
+the summary's rows at the stable ``/media/{digest}`` URL served by this backend.
+
+Platforms such as Instagram fetch the image from that URL themselves, so persistence
+only runs when ``MEDIA_PUBLIC_BASE_URL`` is set to the backend's public address;
+otherwise rows keep the generator's URLs. Stored images that no post refers to any
+more (regenerated or deleted) are removed by a sweep that runs every
+``IMAGE_STORE_SWEEP_INTERVAL`` seconds, independent of the publish workers.
+"""
+import asyncio
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from ..database import SessionLocal
+from ..models import PostPlatform
+from .blob_store import image_store, stored_image_url, stored_image_digest, MEDIA_PUBLIC_BASE_URL
+from .generation_events import generation_events
+from .media_stream import fetch_to_store, MEDIA_MAX_BYTES
+
+load_dotenv()
+
+IMAGE_PERSIST_ENABLED = os.getenv("IMAGE_PERSIST_ENABLED", "true").lower() == "true"
+IMAGE_PERSIST_ATTEMPTS = int(os.getenv("IMAGE_PERSIST_ATTEMPTS", "3"))
+IMAGE_PERSIST_RETRY_DELAY = float(os.getenv("IMAGE_PERSIST_RETRY_DELAY", "2"))  # seconds, doubled per attempt
+# Unreferenced stored images younger than this are kept (their rows may not be written yet)
+IMAGE_STORE_RETENTION_GRACE = float(os.getenv("IMAGE_STORE_RETENTION_GRACE", "86400"))
+IMAGE_STORE_SWEEP_INTERVAL = float(os.getenv("IMAGE_STORE_SWEEP_INTERVAL", "3600"))
+
+def rewrite_image_url(db: Session, summary_id: str, source_url: str, stable_url: str) -> int:
+    """Point a summary's rows still using ``source_url`` at ``stable_url``."""
+    updated = db.query(PostPlatform).filter(
+        PostPlatform.summary_id == summary_id,
+        PostPlatform.image_url == source_url
+    ).update({"image_url": stable_url, "updated_at": datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return updated
+
+def referenced_image_digests(db: Session) -> set:
+    """Digests of the stored images that post rows still point at."""
+    prefix = f"{MEDIA_PUBLIC_BASE_URL}/media/"
+    rows = db.query(PostPlatform.image_url).filter(PostPlatform.image_url.like(f"{prefix}%")).distinct()
+    digests = (stored_image_digest(url) for (url,) in rows)
+    return {digest for digest in digests if digest}
+
+class ImagePersister:
+    """Downloads generated images in the background and rewrites rows to stable URLs."""
+
+    def __init__(self, enabled: bool = IMAGE_PERSIST_ENABLED and bool(MEDIA_PUBLIC_BASE_URL),
+                 attempts: int = IMAGE_PERSIST_ATTEMPTS, retry_delay: float = IMAGE_PERSIST_RETRY_DELAY,
+                 max_resolved: int = 1000):
+        self.enabled = enabled
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.max_resolved = max_resolved
+        self._tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._resolved: "OrderedDict[str, str]" = OrderedDict()  # source URL -> stable URL
+        self._sweeper: Optional[asyncio.Task] = None
+        self.stats = {"scheduled": 0, "persisted": 0, "failed": 0, "rows_rewritten": 0, "purged": 0}
+
+    def resolve(self, image_url: Optional[str]) -> Optional[str]:
+        """The stable URL of an already persisted image, else the URL itself."""
+        stable_url = self._resolved.get(image_url) if image_url else None
+        if stable_url is None or image_store.entry_for(stored_image_digest(stable_url) or "") is None:
+            return image_url
+        return stable_url
+
+    def schedule(self, summary_id: str, image_url: Optional[str]):
+        """Persist a freshly generated image and rewrite the summary's rows when done."""
+        if not self.enabled or not image_url or stored_image_digest(image_url):
+            return
+        if image_url in self._resolved:
+            # Rows saved after it was persisted already got the stable URL
+            return
+        key = (str(summary_id), image_url)
+        if key in self._tasks:
+            return
+        task = asyncio.ensure_future(self._persist(str(summary_id), image_url))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        self.stats["scheduled"] += 1
+
+    async def persist(self, image_url: str) -> str:
+        """Download an image into ``image_store`` and get its stable URL."""
+        stable_url = self.resolve(image_url)
+        if stable_url == image_url:
+            entry = await fetch_to_store(image_url, MEDIA_MAX_BYTES, image_store)
+            stable_url = stored_image_url(entry.digest)
+            self._resolved[image_url] = stable_url
+            while len(self._resolved) > self.max_resolved:
+                self._resolved.popitem(last=False)
+        return stable_url
+
+    async def _persist(self, summary_id: str, image_url: str):
+        for attempt in range(self.attempts):
+            try:
+                stable_url = await self.persist(image_url)
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = getattr(e, "detail", None) or str(e)
+                if attempt + 1 < self.attempts:
+                    await asyncio.sleep(self.retry_delay * (2 ** attempt))
+        else:
+            print(f"[IMAGE PERSIST] Could not store image for summary {summary_id}: {error}")
+            self.stats["failed"] += 1
+            return
+
+        db = SessionLocal()
+        try:
+            updated = rewrite_image_url(db, summary_id, image_url, stable_url)
+        finally:
+            db.close()
+        self.stats["persisted"] += 1
+        self.stats["rows_rewritten"] += updated
+        generation_events.publish(summary_id, "image_persisted", {"image_url": stable_url, "source_url": image_url})
+
+    def purge_unreferenced_images(self, db: Session) -> int:
+        """Delete stored images no post refers to any more."""
+        if not MEDIA_PUBLIC_BASE_URL:
+            return 0
+
+        referenced = referenced_image_digests(db)
+        purged = 0
+        for digest in image_store.digests():
+            if digest in referenced:
+                continue
+            age = image_store.age_seconds(digest)
+            if age is not None and age < IMAGE_STORE_RETENTION_GRACE:
+                continue
+            image_store.remove(digest)
+            purged += 1
+        self.stats["purged"] += purged
+        return purged
+
+    def start(self):
+        """Start the retention sweep (called from the app lifespan)."""
+        if self._sweeper is None and self.enabled:
+            self._sweeper = asyncio.ensure_future(self._sweep())
+
+    async def _sweep(self):
+        while True:
+            db = SessionLocal()
+            try:
+                self.purge_unreferenced_images(db)
+            except Exception as e:
+                print(f"[IMAGE PERSIST] Purging unreferenced images failed: {str(e)}")
+            finally:
+                db.close()
+            await asyncio.sleep(IMAGE_STORE_SWEEP_INTERVAL)
+
+    async def stop(self):
+        """Stop the sweep and cancel in-flight downloads (called from the app lifespan)."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        tasks, self._tasks = list(self._tasks.values()), {}
+        for task in tasks:
+            task.cancel()
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "public_base_url": MEDIA_PUBLIC_BASE_URL or None,
+            "in_flight": len(self._tasks),
+            "stored_images": image_store.snapshot()["blobs"],
+            "stored_bytes": image_store.bytes,
+            **self.stats
+        }
+
+image_persister = ImagePersister()
@@ -0,0 +1,207 @@
+"""Per-platform image variants built once and cached on disk.
+
+Each platform gets the image cropped or padded into its accepted aspect ratios,
+downscaled to its width limit and re-encoded as JPEG or WebP under its size limit
+(the generator's raw PNGs are several MB and Instagram rejects some of them after
+the container upload). Variants are built in a process pool so resizing never runs
+on the event loop, and cached in their own LRU ``BlobStore`` under the hash of
+(source digest, spec), so each source image is processed once per platform spec.
+Instagram fetches images itself, so persisted images also have a variant URL,
+``/media/{digest}/{platform}``. Without Pillow installed, the original image is used
+unchanged.
+"""
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, NamedTuple, Optional
+from dotenv import load_dotenv
+from .blob_store import BlobStore, BlobEntry, MEDIA_CACHE_DIR, image_store, stored_image_url, stored_image_digest
+
+load_dotenv()
+
+try:
+    from PIL import Image, ImageOps
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+
+IMAGE_VARIANTS_ENABLED = os.getenv("IMAGE_VARIANTS_ENABLED", "true").lower() == "true"
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", "2"))
+IMAGE_VARIANT_DIR = os.getenv("IMAGE_VARIANT_DIR", os.path.join(os.path.dirname(MEDIA_CACHE_DIR), "media_variants"))
+IMAGE_VARIANT_MAX_BYTES = int(os.getenv("IMAGE_VARIANT_MAX_BYTES", str(256 * 1024 * 1024)))
+
+class ImageSpec(NamedTuple):
+    """Target shape and encoding for one platform."""
+    min_ratio: float  # width / height
+    max_ratio: float
+    max_width: int
+    fit: str  # "crop" or "pad" into the ratio range
+    format: str  # Pillow format name
+    quality: int
+    max_bytes: int
+
+    @property
+    def content_type(self) -> str:
+        return f"image/{self.format.lower()}"
+
+    @property
+    def key(self) -> str:
+        return f"{self.min_ratio}-{self.max_ratio}-{self.max_width}-{self.fit}-{self.format}-{self.quality}-{self.max_bytes}"
+
+PLATFORM_IMAGE_SPECS: Dict[str, ImageSpec] = {
+    # Feed images between 4:5 portrait and 1.91:1 landscape, JPEG only
+    "instagram": ImageSpec(0.8, 1.91, 1080, "crop", "JPEG", 85, 8 * 1024 * 1024),
+    "facebook": ImageSpec(0.8, 1.91, 2048, "pad", "JPEG", 85, 4 * 1024 * 1024),
+    "linkedin": ImageSpec(0.8, 1.91, 1200, "pad", "JPEG", 85, 5 * 1024 * 1024),
+    "twitter": ImageSpec(0.5, 2.0, 1600, "pad", "WEBP", 80, 5 * 1024 * 1024)
+}
+
+# Lowest quality tried when an encoded variant is over the platform's byte limit
+MIN_QUALITY = 50
+
+def build_variant(source_path: str, target_path: str, spec: ImageSpec) -> int:
+    """Write the variant of an image for a spec; returns its size. Runs in the pool."""
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "L"):
+            # JPEG has no alpha; flatten onto white
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.convert("RGBA").getchannel("A"))
+            image = background
+
+        width, height = image.size
+        ratio = width / height
+        if ratio < spec.min_ratio or ratio > spec.max_ratio:
+            target_ratio = min(max(ratio, spec.min_ratio), spec.max_ratio)
+            if spec.fit == "crop":
+                if ratio > target_ratio:
+                    size = (round(height * target_ratio), height)
+                else:
+                    size = (width, round(width / target_ratio))
+                image = ImageOps.fit(image, size, method=Image.LANCZOS)
+            else:
+                if ratio > target_ratio:
+                    size = (width, round(width / target_ratio))
+                else:
+                    size = (round(height * target_ratio), height)
+                image = ImageOps.pad(image, size, method=Image.LANCZOS, color=(255, 255, 255))
+
+        if image.width > spec.max_width:
+            image = image.resize((spec.max_width, round(image.height * spec.max_width / image.width)), Image.LANCZOS)
+
+        quality = spec.quality
+        while True:
+            buffer = io.BytesIO()
+            image.save(buffer, format=spec.format, quality=quality, optimize=True)
+            if buffer.tell() <= spec.max_bytes or quality <= MIN_QUALITY:
+                break
+            quality -= 10
+
+    with open(target_path, "wb") as f:
+        f.write(buffer.getbuffer())
+    return buffer.tell()
+
+class ImageVariants:
+    """Builds and caches platform variants of stored source images."""
+
+    def __init__(self, specs: Dict[str, ImageSpec] = PLATFORM_IMAGE_SPECS, workers: int = IMAGE_VARIANT_WORKERS,
+                 enabled: bool = IMAGE_VARIANTS_ENABLED and PILLOW_AVAILABLE):
+        self.specs = specs
+        self.workers = workers
+        self.enabled = enabled
+        self.store = BlobStore(root=IMAGE_VARIANT_DIR, max_bytes=IMAGE_VARIANT_MAX_BYTES, enabled=enabled)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._builds: Dict[str, asyncio.Future] = {}
+        self.build_seconds = 0.0
+        self.stats = {"hits": 0, "built": 0, "failed": 0, "source_bytes": 0, "variant_bytes": 0}
+
+    def spec_for(self, platform: Optional[str]) -> Optional[ImageSpec]:
+        return self.specs.get(platform) if self.enabled and platform else None
+
+    def _pool_executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned workers don't inherit the server's threads or sockets
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def variant_for(self, source: BlobEntry, source_path: str, platform: str) -> Optional[BlobEntry]:
+        """Get the variant of a stored image for a platform, building it on first use.
+
+        Returns None when variants are off, the platform has no spec or the build
+        failed; callers then use the original image.
+        """
+        spec = self.spec_for(platform)
+        if spec is None:
+            return None
+
+        key = hashlib.sha256(f"{source.digest}:{spec.key}".encode()).hexdigest()
+        entry = self.store.entry_for(key)
+        if entry is not None:
+            self.stats["hits"] += 1
+            return entry
+
+        # Concurrent publishes of the same image wait for one build
+        build = self._builds.get(key)
+        if build is None:
+            build = asyncio.ensure_future(self._build(key, source, source_path, platform, spec))
+            self._builds[key] = build
+            build.add_done_callback(lambda _: self._builds.pop(key, None))
+        return await asyncio.shield(build)
+
+    async def variant_url(self, image_url: str, platform: str) -> str:
+        """A URL serving the platform's variant of a persisted image, else ``image_url``."""
+        source = image_store.entry_for(stored_image_digest(image_url) or "")
+        if source is None:
+            return image_url
+        variant = await self.variant_for(source, image_store.path_for(source), platform)
+        return f"{stored_image_url(source.digest)}/{platform}" if variant is not None else image_url
+
+    async def _build(self, key: str, source: BlobEntry, source_path: str, platform: str,
+                     spec: ImageSpec) -> Optional[BlobEntry]:
+        fd, temp_path = self.store.temp_file()
+        os.close(fd)
+        start = time.perf_counter()
+        try:
+            size = await asyncio.get_running_loop().run_in_executor(
+                self._pool_executor(), build_variant, source_path, temp_path, spec
+            )
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                # A worker died (e.g. OOM on a huge image); start a fresh pool next time
+                self._pool = None
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            print(f"[IMAGE VARIANTS] Building {platform} variant of {source.digest} failed: {str(e)}")
+            self.stats["failed"] += 1
+            return None
+        self.build_seconds += time.perf_counter() - start
+        self.stats["built"] += 1
+        self.stats["source_bytes"] += source.size
+        self.stats["variant_bytes"] += size
+        return self.store.commit(f"{source.digest}:{platform}", temp_path, key, size, spec.content_type)
+
+    def close(self):
+        """Shut the process pool down (called from the app lifespan)."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pillow_available": PILLOW_AVAILABLE,
+            "workers": self.workers,
+            "cached_variants": self.store.snapshot()["blobs"],
+            "cached_bytes": self.store.bytes,
+            "avg_build_ms": round(self.build_seconds / self.stats["built"] * 1000, 1) if self.stats["built"] else None,
+            "bytes_saved_ratio": round(1 - self.stats["variant_bytes"] / self.stats["source_bytes"], 3) if self.stats["source_bytes"] else None,
+            "specs": {platform: spec._asdict() for platform, spec in self.specs.items()},
+            **self.stats
+        }
+
+image_variants = ImageVariants()
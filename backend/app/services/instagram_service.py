@@ -1,6 +1,22 @@
-import requests
+import asyncio
+import httpx
+import os
+import time
 from fastapi import HTTPException
-from ..utils.token_manager import get_valid_token
+from dotenv import load_dotenv
+from ..utils.token_manager import get_valid_token, get_token_for_user
+from .rate_limiter import rate_limiter
+from .platform_http import platform_http, error_detail
+from .image_variants import image_variants
+from .image_persistence import image_persister
+from .blob_store import stored_image_digest
+
+load_dotenv()
+
+# Container status polling before media_publish (exponential backoff, seconds)
+INSTAGRAM_CONTAINER_POLL_INITIAL = float(os.getenv("INSTAGRAM_CONTAINER_POLL_INITIAL", "0.5"))
+INSTAGRAM_CONTAINER_POLL_MAX = float(os.getenv("INSTAGRAM_CONTAINER_POLL_MAX", "8"))
+INSTAGRAM_CONTAINER_POLL_TIMEOUT = float(os.getenv("INSTAGRAM_CONTAINER_POLL_TIMEOUT", "60"))
 
 class InstagramPostingService:
     def __init__(self, token_manager=None):
@@ -14,34 +30,27 @@ class InstagramPostingService:
                 raise HTTPException(status_code=400, detail="Instagram requires an image for posts")
 
             token = await self.token_manager(user_id, "instagram", db)
+            await rate_limiter.acquire("instagram", user_id)
 
-            # For Instagram Basic Display API, we need media upload first
-            # Step 1: Get user's media container
-            # Actually, for posting, we need Instagram Business Account or Creator Account
-            # For basic implementation, we'll use the media publish endpoint
+            # The business account id is stored at OAuth time; /me only for rows without it
+            user_id_instagram = await self._account_id(user_id, token, db)
 
-            # First, create media container
+            # Create media container, pointing Instagram at its resized variant
             media_params = {
-                "image_url": image_url,
+                "image_url": await self._container_image_url(image_url),
                 "caption": content,
                 "access_token": token
             }
-
-            # Get user ID first
-            user_url = f"{self.base_url}/me"
-            user_params = {"fields": "id,username", "access_token": token}
-            user_response = requests.get(user_url, params=user_params)
-            user_response.raise_for_status()
-            user_data = user_response.json()
-            user_id_instagram = user_data["id"]
-
-            # Create media container
             container_url = f"{self.base_url}/{user_id_instagram}/media"
-            container_response = requests.post(container_url, data=media_params)
+            container_response = await platform_http.client_for(container_url).post(container_url, data=media_params)
+            rate_limiter.check_graph_response("instagram", user_id, container_response)
             container_response.raise_for_status()
             container_data = container_response.json()
             container_id = container_data["id"]
 
+            # Instagram fetches and processes the image asynchronously
+            await self._wait_for_container(user_id, container_id, token)
+
             # Publish the media
             publish_url = f"{self.base_url}/{user_id_instagram}/media_publish"
             publish_params = {
@@ -49,7 +58,8 @@ class InstagramPostingService:
                 "access_token": token
             }
 
-            publish_response = requests.post(publish_url, data=publish_params)
+            publish_response = await platform_http.client_for(publish_url).post(publish_url, data=publish_params)
+            rate_limiter.check_graph_response("instagram", user_id, publish_response)
             publish_response.raise_for_status()
             publish_data = publish_response.json()
 
@@ -60,12 +70,84 @@ class InstagramPostingService:
                 "url": f"https://www.instagram.com/p/{publish_data.get('id')}"
             }
 
-        except requests.RequestException as e:
-            error_detail = e.response.json() if e.response else str(e)
-            raise HTTPException(status_code=500, detail=f"Instagram posting failed: {error_detail}")
+        except HTTPException:
+            raise
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=500, detail=f"Instagram posting failed: {error_detail(e)}")
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Instagram posting error: {str(e)}")
 
+    async def _container_image_url(self, image_url: str) -> str:
+        """The URL Instagram should fetch: the hosted Instagram variant when possible.
+
+        Variants are only served for images in the local store, so an image that was
+        not persisted yet is persisted first.
+        """
+        if not image_variants.enabled:
+            return image_url
+        hosted_url = image_url
+        if image_persister.enabled and not stored_image_digest(image_url):
+            try:
+                hosted_url = await image_persister.persist(image_url)
+            except Exception as e:
+                print(f"[INSTAGRAM] Could not store {image_url} for resizing: {getattr(e, 'detail', None) or str(e)}")
+        container_url = await image_variants.variant_url(hosted_url, "instagram")
+        if container_url == hosted_url:
+            print(f"[INSTAGRAM] No Instagram variant for {image_url}; using the original image")
+        return container_url
+
+    async def _account_id(self, user_id: str, token: str, db) -> str:
+        token_row = get_token_for_user(user_id, "instagram", db) if db is not None else None
+        if token_row and token_row.member_id:
+            return token_row.member_id
+
+        user_url = f"{self.base_url}/me"
+        user_response = await platform_http.client_for(user_url).get(
+            user_url, params={"fields": "id,username", "access_token": token}
+        )
+        rate_limiter.check_graph_response("instagram", user_id, user_response)
+        user_response.raise_for_status()
+        account_id = user_response.json()["id"]
+
+        if token_row:
+            token_row.member_id = account_id
+            db.commit()
+        return account_id
+
+    async def _wait_for_container(self, user_id: str, container_id: str, token: str):
+        """Poll the media container until it is ready to publish, backing off exponentially."""
+        status_url = f"{self.base_url}/{container_id}"
+        deadline = time.monotonic() + INSTAGRAM_CONTAINER_POLL_TIMEOUT
+        delay = INSTAGRAM_CONTAINER_POLL_INITIAL
+        while True:
+            response = await platform_http.client_for(status_url).get(
+                status_url, params={"fields": "status_code,status", "access_token": token}
+            )
+            rate_limiter.check_graph_response("instagram", user_id, response)
+            response.raise_for_status()
+            container = response.json()
+
+            status_code = container.get("status_code")
+            if status_code == "FINISHED":
+                return
+            if status_code in ("ERROR", "EXPIRED"):
+                # Instagram rejected the media; uploading it again won't help, so don't retry
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Instagram media container {status_code.lower()}: {container.get('status') or 'no details'}"
+                )
+            if status_code == "PUBLISHED":
+                raise HTTPException(status_code=409, detail="Instagram media container was already published")
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise HTTPException(
+                    status_code=504,
+                    detail=f"Instagram media container not ready after {INSTAGRAM_CONTAINER_POLL_TIMEOUT:.0f}s"
+                )
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, INSTAGRAM_CONTAINER_POLL_MAX)
+
     async def get_user_info(self, user_id: str, db=None):
         """Get Instagram user info."""
         try:
@@ -77,7 +159,7 @@ class InstagramPostingService:
                 "access_token": token
             }
 
-            response = requests.get(user_url, params=params)
+            response = await platform_http.client_for(user_url).get(user_url, params=params)
             response.raise_for_status()
             user_data = response.json()
 
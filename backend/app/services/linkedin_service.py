@@ -1,13 +1,24 @@
-
-import httpx
+import os
+from typing import Optional, Tuple
 from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from dotenv import load_dotenv
 from ..utils.token_manager import get_valid_token
 from ..utils.crypto import TokenCrypto, decrypt_val
 from ._base_service import BasePostingService
-from ..models import UserToken
+from ..models import UserToken, LinkedInAsset
+from .rate_limiter import rate_limiter, RateLimitedError
+from .platform_http import platform_http, UPLOAD_TIMEOUT
+from .media_stream import open_media
 from datetime import datetime, timezone, timedelta
 
+load_dotenv()
+
+# How long an uploaded image asset is reused for the same member and image (seconds, 0 disables)
+LINKEDIN_ASSET_REUSE_TTL = float(os.getenv("LINKEDIN_ASSET_REUSE_TTL", str(7 * 24 * 3600)))
+
+linkedin_asset_stats = {"reused": 0, "uploaded": 0, "rejected_reuse": 0}
 
 class LinkedInPostingService:
     def __init__(self, token_manager=None):
@@ -45,46 +56,23 @@ class LinkedInPostingService:
             if not person_urn:
                 raise HTTPException(status_code=500, detail="LinkedIn member ID not found. Please reconnect OAuth.")
 
+            await rate_limiter.acquire("linkedin", user_id)
+
             # Handle image upload
-            image_asset_urn = None
+            image_asset_urn, reused = None, False
             if image_url:
-                image_asset_urn = await self._upload_image(access_token, image_url, person_urn)
-
-            # Create post body
-            if image_asset_urn:
-                body = {
-                    "author": f"urn:li:person:{person_urn}",
-                    "lifecycleState": "PUBLISHED",
-                    "specificContent": {
-                        "com.linkedin.ugc.ShareContent": {
-                            "shareCommentary": {"text": content},
-                            "shareMediaCategory": "IMAGE",
-                            "media": [{"status": "READY", "description": {"text": ""}, "media": image_asset_urn, "title": {"text": ""}}]
-                        }
-                    },
-                    "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"}
-                }
-            else:
-                body = {
-                    "author": f"urn:li:person:{person_urn}",
-                    "lifecycleState": "PUBLISHED",
-                    "specificContent": {
-                        "com.linkedin.ugc.ShareContent": {
-                            "shareCommentary": {"text": content},
-                            "shareMediaCategory": "NONE"
-                        }
-                    },
-                    "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"}
-                }
+                image_asset_urn, reused = await self._upload_image(access_token, image_url, person_urn, db)
 
-            async with httpx.AsyncClient() as client:
-                r = await client.post(f"{self.base_url}/ugcPosts",
-                                     headers={
-                                         "Authorization": f"Bearer {access_token}",
-                                         "X-Restli-Protocol-Version": "2.0.0",
-                                         "Content-Type": "application/json"
-                                     },
-                                     json=body)
+            r = await self._create_post(user_id, access_token, person_urn, content, image_asset_urn)
+            if reused and self._rejects_asset(r, image_asset_urn):
+                # LinkedIn no longer accepts the reused asset; upload the image again once
+                linkedin_asset_stats["rejected_reuse"] += 1
+                self._forget_asset(db, person_urn, image_asset_urn)
+                image_asset_urn, _ = await self._upload_image(access_token, image_url, person_urn, db, reuse=False)
+                r = await self._create_post(user_id, access_token, person_urn, content, image_asset_urn)
+
+            if r.status_code == 429:
+                raise RateLimitedError("linkedin", rate_limiter.retry_after("linkedin", user_id))
             if r.status_code not in (200, 201):
                 raise HTTPException(status_code=500, detail=f"LinkedIn post failed: {r.text}")
             result = r.json()
@@ -96,57 +84,176 @@ class LinkedInPostingService:
                 "linkedin_response": result
             }
 
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"LinkedIn posting failed: {str(e)}")
 
-    async def _upload_image(self, access_token: str, image_url: str, person_urn: str):
+    @staticmethod
+    def _rejects_asset(r, asset_urn: str) -> bool:
+        """Whether a failed post was refused because of its image asset.
+
+        Auth (401/403) and rate limit errors say nothing about the asset and are
+        passed through; only a 400/422 naming the media counts.
+        """
+        if r.status_code not in (400, 422):
+            return False
+        text = r.text.lower()
+        return asset_urn.lower() in text or "media" in text or "asset" in text
+
+    async def _create_post(self, user_id: str, access_token: str, person_urn: str, content: str,
+                           image_asset_urn: Optional[str]):
+        # Create post body
+        if image_asset_urn:
+            body = {
+                "author": f"urn:li:person:{person_urn}",
+                "lifecycleState": "PUBLISHED",
+                "specificContent": {
+                    "com.linkedin.ugc.ShareContent": {
+                        "shareCommentary": {"text": content},
+                        "shareMediaCategory": "IMAGE",
+                        "media": [{"status": "READY", "description": {"text": ""}, "media": image_asset_urn, "title": {"text": ""}}]
+                    }
+                },
+                "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"}
+            }
+        else:
+            body = {
+                "author": f"urn:li:person:{person_urn}",
+                "lifecycleState": "PUBLISHED",
+                "specificContent": {
+                    "com.linkedin.ugc.ShareContent": {
+                        "shareCommentary": {"text": content},
+                        "shareMediaCategory": "NONE"
+                    }
+                },
+                "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"}
+            }
+
+        posts_url = f"{self.base_url}/ugcPosts"
+        r = await platform_http.client_for(posts_url).post(
+            posts_url,
+            headers={
+                "Authorization": f"Bearer {access_token}",
+                "X-Restli-Protocol-Version": "2.0.0",
+                "Content-Type": "application/json"
+            },
+            json=body
+        )
+        rate_limiter.observe("linkedin", user_id, r.status_code, r.headers)
+        return r
+
+    async def _upload_image(self, access_token: str, image_url: str, person_urn: str, db: Session = None,
+                            reuse: bool = True) -> Tuple[Optional[str], bool]:
+        """Upload an image for a member; returns ``(asset_urn, reused)``.
+
+        An asset already uploaded for the same member and the same uploaded bytes (the
+        image's SHA-256, or its LinkedIn variant's store key) within
+        ``LINKEDIN_ASSET_REUSE_TTL`` is returned without registering or uploading again.
+        """
         try:
-            # Step 1: Register upload
-            register_body = {
-                "registerUploadRequest": {
-                    "recipes": ["urn:li:digitalmediaRecipe:feedshare-image"],
-                    "owner": f"urn:li:person:{person_urn}",
-                    "serviceRelationships": [
-                        {
-                            "relationshipType": "OWNER",
-                            "identifier": "urn:li:userGeneratedContent"
-                        }
-                    ]
+            async with open_media(image_url, platform="linkedin") as media:
+                if reuse:
+                    asset_urn = self._reusable_asset(db, person_urn, media.content_digest)
+                    if asset_urn:
+                        linkedin_asset_stats["reused"] += 1
+                        return asset_urn, True
+
+                # Step 1: Register upload
+                register_body = {
+                    "registerUploadRequest": {
+                        "recipes": ["urn:li:digitalmediaRecipe:feedshare-image"],
+                        "owner": f"urn:li:person:{person_urn}",
+                        "serviceRelationships": [
+                            {
+                                "relationshipType": "OWNER",
+                                "identifier": "urn:li:userGeneratedContent"
+                            }
+                        ]
+                    }
                 }
-            }
-            async with httpx.AsyncClient() as client:
-                register_resp = await client.post(
-                    f"{self.base_url}/assets?action=registerUpload",
+                register_url = f"{self.base_url}/assets?action=registerUpload"
+                register_resp = await platform_http.client_for(register_url).post(
+                    register_url,
                     headers={
                         "Authorization": f"Bearer {access_token}",
                         "Content-Type": "application/json"
                     },
                     json=register_body
                 )
-            if register_resp.status_code != 200:
-                raise HTTPException(status_code=500, detail=f"LinkedIn image register failed: {register_resp.text}")
-            register_data = register_resp.json()
-            upload_url = register_data["value"]["uploadMechanism"]["com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest"]["uploadUrl"]
-            asset_urn = register_data["value"]["asset"]
-
-            # Step 2: Download image and upload to LinkedIn
-            async with httpx.AsyncClient() as client:
-                image_resp = await client.get(image_url)
-                if image_resp.status_code != 200:
-                    raise HTTPException(status_code=400, detail="Invalid image URL")
-                image_data = image_resp.content
-
-                upload_resp = await client.post(
+                if register_resp.status_code != 200:
+                    raise HTTPException(status_code=500, detail=f"LinkedIn image register failed: {register_resp.text}")
+                register_data = register_resp.json()
+                upload_url = register_data["value"]["uploadMechanism"]["com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest"]["uploadUrl"]
+                asset_urn = register_data["value"]["asset"]
+
+                # Step 2: Stream the image into the LinkedIn upload
+                upload_headers = {
+                    "Authorization": f"Bearer {access_token}",
+                    "Content-Type": "application/octet-stream"
+                }
+                if media.content_length is not None:
+                    upload_headers["Content-Length"] = str(media.content_length)
+                upload_resp = await platform_http.client_for(upload_url).post(
                     upload_url,
-                    headers={
-                        "Authorization": f"Bearer {access_token}",
-                        "Content-Type": "application/octet-stream"
-                    },
-                    content=image_data
+                    headers=upload_headers,
+                    content=media.iter_chunks(),
+                    timeout=UPLOAD_TIMEOUT
                 )
+                image_hash = media.content_digest
             if upload_resp.status_code != 201:
                 raise HTTPException(status_code=500, detail=f"LinkedIn image upload failed: {upload_resp.text}")
-            return asset_urn
+            linkedin_asset_stats["uploaded"] += 1
+            self._remember_asset(db, person_urn, image_hash, asset_urn)
+            return asset_urn, False
         except Exception as e:
             print(f"Image upload failed: {str(e)}")
+            return None, False
+
+    @staticmethod
+    def _reusable_asset(db: Session, person_urn: str, image_hash: Optional[str]) -> Optional[str]:
+        if db is None or not image_hash:
             return None
+        row = db.query(LinkedInAsset).filter(
+            LinkedInAsset.member_urn == person_urn,
+            LinkedInAsset.image_hash == image_hash,
+            LinkedInAsset.expires_at > datetime.utcnow()
+        ).first()
+        return row.asset_urn if row else None
+
+    @staticmethod
+    def _remember_asset(db: Session, person_urn: str, image_hash: Optional[str], asset_urn: str):
+        if db is None or not image_hash or LINKEDIN_ASSET_REUSE_TTL <= 0:
+            return
+        expires_at = datetime.utcnow() + timedelta(seconds=LINKEDIN_ASSET_REUSE_TTL)
+        row = db.query(LinkedInAsset).filter(
+            LinkedInAsset.member_urn == person_urn,
+            LinkedInAsset.image_hash == image_hash
+        ).first()
+        if row:
+            row.asset_urn = asset_urn
+            row.expires_at = expires_at
+        else:
+            db.add(LinkedInAsset(member_urn=person_urn, image_hash=image_hash, asset_urn=asset_urn, expires_at=expires_at))
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent publish stored the same image first; either asset works
+            db.rollback()
+
+    @staticmethod
+    def _forget_asset(db: Session, person_urn: str, asset_urn: str):
+        db.query(LinkedInAsset).filter(
+            LinkedInAsset.member_urn == person_urn,
+            LinkedInAsset.asset_urn == asset_urn
+        ).delete(synchronize_session=False)
+        db.commit()
+
+
+def purge_expired_assets(db: Session) -> int:
+    """Delete reusable LinkedIn assets past their validity window."""
+    deleted = db.query(LinkedInAsset).filter(
+        LinkedInAsset.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
@@ -0,0 +1,238 @@
+"""Streaming media transfer between image URLs and platform upload endpoints.
+
+``open_media`` streams a download in ``MEDIA_CHUNK_SIZE`` chunks that the services pass
+straight into their upload request (raw body or multipart), so at most a chunk or two
+of any image is in memory no matter how many publishes run at once. Size and
+content-type limits are enforced from the response headers and, while streaming,
+from the byte count and the file signature of the first chunk, so an oversized image
+or an HTML error page is rejected without being buffered. Every transfer is timed and
+the diagnostics report bytes per second.
+
+With the blob store enabled, a download is first written to the content-addressed
+store (see ``blob_store``) and uploads stream from its read-only mapping, so an image
+shared by several platforms or publishes is fetched from its origin once. Uploads
+for a platform stream its resized variant (see ``image_variants``) when available.
+"""
+import hashlib
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+from fastapi import HTTPException
+from dotenv import load_dotenv
+from .platform_http import platform_http, UPLOAD_TIMEOUT
+from .blob_store import blob_store, image_store, stored_image_digest, BlobEntry, BlobStore
+from .image_variants import image_variants
+
+load_dotenv()
+
+MEDIA_MAX_BYTES = int(os.getenv("MEDIA_MAX_BYTES", str(8 * 1024 * 1024)))
+MEDIA_CHUNK_SIZE = int(os.getenv("MEDIA_CHUNK_SIZE", str(64 * 1024)))
+MEDIA_ALLOWED_CONTENT_TYPES = {
+    t.strip().lower()
+    for t in os.getenv("MEDIA_ALLOWED_CONTENT_TYPES", "image/png,image/jpeg,image/gif,image/webp").split(",")
+    if t.strip()
+}
+
+# File signatures of the allowed image formats
+SIGNATURES = {
+    "image/png": (b"\x89PNG\r\n\x1a\n",),
+    "image/jpeg": (b"\xff\xd8\xff",),
+    "image/gif": (b"GIF87a", b"GIF89a"),
+    "image/webp": (b"RIFF",)
+}
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """Detect an allowed image type from the first bytes of a file."""
+    for content_type, signatures in SIGNATURES.items():
+        if any(head.startswith(signature) for signature in signatures):
+            if content_type == "image/webp" and head[8:12] != b"WEBP":
+                continue
+            return content_type
+    return None
+
+
+class MediaTransferStats:
+    """Totals for all media transfers in this process."""
+
+    def __init__(self):
+        self.stats = {"transfers": 0, "completed": 0, "rejected_size": 0, "rejected_type": 0, "failed": 0}
+        self.bytes = 0
+        self.seconds = 0.0
+        self.last_bytes_per_second: Optional[float] = None
+
+    def record(self, media: "MediaStream", seconds: float):
+        self.stats["transfers"] += 1
+        self.bytes += media.bytes_read
+        self.seconds += seconds
+        if media.completed:
+            self.stats["completed"] += 1
+            self.last_bytes_per_second = media.bytes_read / seconds if seconds > 0 else None
+
+    def snapshot(self) -> dict:
+        return {
+            "bytes": self.bytes,
+            "avg_bytes_per_second": round(self.bytes / self.seconds) if self.seconds > 0 else None,
+            "last_bytes_per_second": round(self.last_bytes_per_second) if self.last_bytes_per_second else None,
+            "max_bytes": MEDIA_MAX_BYTES,
+            "chunk_size": MEDIA_CHUNK_SIZE,
+            **self.stats
+        }
+
+media_transfers = MediaTransferStats()
+
+
+class MediaStream:
+    """A media download being streamed; iterate ``iter_chunks()`` exactly once.
+
+    ``digest`` is the SHA-256 of the source image when it came from a local store
+    (None when streamed straight from its URL), even if a variant is streamed.
+    ``content_digest`` identifies the bytes actually streamed: the source digest, or
+    the variant's store key when a variant is streamed.
+    """
+
+    def __init__(self, url: str, source: AsyncIterator[bytes], content_type: Optional[str],
+                 content_length: Optional[int], max_bytes: int, digest: Optional[str] = None,
+                 content_digest: Optional[str] = None):
+        self.url = url
+        self.digest = digest
+        self.content_digest = content_digest
+        self._source = source
+        self.content_type = content_type
+        self.content_length = content_length
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.completed = False
+
+    async def iter_chunks(self) -> AsyncIterator[bytes]:
+        first = True
+        async for chunk in self._source:
+            if first:
+                first = False
+                if sniff_content_type(chunk) is None:
+                    media_transfers.stats["rejected_type"] += 1
+                    raise HTTPException(status_code=415, detail=f"Media at {self.url} is not a supported image")
+
+            self.bytes_read += len(chunk)
+            if self.bytes_read > self.max_bytes:
+                media_transfers.stats["rejected_size"] += 1
+                raise HTTPException(status_code=413, detail=f"Media exceeds {self.max_bytes} bytes")
+            yield chunk
+
+        if first:
+            media_transfers.stats["rejected_type"] += 1
+            raise HTTPException(status_code=415, detail=f"Media at {self.url} is empty")
+        if self.content_length is not None and self.bytes_read != self.content_length:
+            raise HTTPException(status_code=502, detail=f"Media download truncated at {self.bytes_read} of {self.content_length} bytes")
+        self.completed = True
+
+
+@asynccontextmanager
+async def open_media(url: str, max_bytes: int = MEDIA_MAX_BYTES, platform: Optional[str] = None):
+    """Open a media URL for streaming, from the blob store when it is enabled.
+
+    With ``platform`` set, the platform's pre-built variant of the image is streamed
+    instead of the original when one can be built.
+    """
+    store, entry = image_store, image_store.entry_for(stored_image_digest(url) or "")
+    if entry is None:
+        if not blob_store.enabled:
+            async with _open_origin(url, max_bytes) as media:
+                yield media
+            return
+
+        lock = blob_store.fill_lock(url)
+        try:
+            async with lock:
+                entry = blob_store.lookup(url)
+                if entry is None:
+                    entry = await fetch_to_store(url, max_bytes)
+        finally:
+            blob_store.release_fill_lock(url, lock)
+        store = blob_store
+
+    digest = entry.digest
+    variant = await image_variants.variant_for(entry, store.path_for(entry), platform) if platform else None
+    if variant is not None:
+        store, entry = image_variants.store, variant
+
+    with store.open(entry) as view:
+        content_type = entry.content_type or sniff_content_type(view[:16])
+        yield MediaStream(url, _iter_view(view), content_type, entry.size, max_bytes, digest, entry.digest)
+
+
+async def _iter_view(view) -> AsyncIterator[bytes]:
+    for offset in range(0, len(view), MEDIA_CHUNK_SIZE):
+        yield view[offset:offset + MEDIA_CHUNK_SIZE]
+
+
+async def fetch_to_store(url: str, max_bytes: int, store: BlobStore = blob_store) -> BlobEntry:
+    """Download a URL into a blob store, hashing it on the way."""
+    fd, temp_path = store.temp_file()
+    try:
+        digest = hashlib.sha256()
+        with os.fdopen(fd, "wb") as f:
+            async with _open_origin(url, max_bytes) as media:
+                async for chunk in media.iter_chunks():
+                    digest.update(chunk)
+                    f.write(chunk)
+                content_type, size = media.content_type, media.bytes_read
+        return store.commit(url, temp_path, digest.hexdigest(), size, content_type)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+@asynccontextmanager
+async def _open_origin(url: str, max_bytes: int):
+    """Start streaming a media URL, rejecting it early from its headers where possible."""
+    start = time.perf_counter()
+    async with platform_http.client_for(url).stream("GET", url, timeout=UPLOAD_TIMEOUT) as response:
+        if response.status_code != 200:
+            media_transfers.stats["failed"] += 1
+            raise HTTPException(status_code=400, detail=f"Could not fetch media from {url}: HTTP {response.status_code}")
+
+        content_type = response.headers.get("content-type", "").split(";")[0].strip().lower() or None
+        if content_type and content_type not in MEDIA_ALLOWED_CONTENT_TYPES:
+            media_transfers.stats["rejected_type"] += 1
+            raise HTTPException(status_code=415, detail=f"Unsupported media type: {content_type}")
+
+        length_header = response.headers.get("content-length")
+        content_length = int(length_header) if length_header and length_header.isdigit() else None
+        if content_length is not None and content_length > max_bytes:
+            media_transfers.stats["rejected_size"] += 1
+            raise HTTPException(status_code=413, detail=f"Media is {content_length} bytes, limit is {max_bytes}")
+
+        media = MediaStream(url, response.aiter_bytes(MEDIA_CHUNK_SIZE), content_type, content_length, max_bytes)
+        try:
+            yield media
+        finally:
+            media_transfers.record(media, time.perf_counter() - start)
+
+
+def multipart_body(fields: Dict[str, str], file_field: str, media: MediaStream, filename: str = "upload") -> Tuple[dict, AsyncIterator[bytes]]:
+    """Build streaming ``multipart/form-data`` headers and body around a media stream."""
+    boundary = uuid.uuid4().hex
+    head = b"".join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    )
+    head += (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+        f'Content-Type: {media.content_type or "application/octet-stream"}\r\n\r\n'
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+
+    headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+    if media.content_length is not None:
+        headers["Content-Length"] = str(len(head) + media.content_length + len(tail))
+
+    async def body():
+        yield head
+        async for chunk in media.iter_chunks():
+            yield chunk
+        yield tail
+
+    return headers, body()
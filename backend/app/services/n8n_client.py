@@ -0,0 +1,298 @@
+"""Shared async client for the n8n webhook workflows.
+
+A single pooled ``httpx.AsyncClient`` is created by the app lifespan and reused by
+every handler that talks to n8n, so slow Gemini/DALL-E runs never block the event loop.
+"""
+import asyncio
+import os
+import time
+import httpx
+from typing import Dict, Optional
+from dotenv import load_dotenv
+from .generation_cache import generation_cache, cache_key, GENERATION_CACHE_ENABLED
+from .single_flight import SingleFlight, payload_hash
+from .circuit_breaker import CircuitBreaker, AIMDLimiter, UpstreamGuard
+from .hedging import LatencyTracker, RetryBudget
+
+load_dotenv()
+
+# Get n8n webhook URLs from environment
+N8N_BASE_URL = os.getenv("N8N_BASE_URL", "https://ganeshicogz.app.n8n.cloud")
+N8N_SUMMARY_WEBHOOK = os.getenv("N8N_SUMMARY_WEBHOOK", "/webhook/summary")
+N8N_POSTGEN_WEBHOOK = os.getenv("N8N_POSTGEN_WEBHOOK", "/webhook/generate-posts")
+N8N_REGENERATE_WEBHOOK = os.getenv("N8N_REGENERATE_WEBHOOK", "/webhook/regenerate-text")
+N8N_REGENERATE_IMAGE_WEBHOOK = os.getenv("N8N_REGENERATE_IMAGE_WEBHOOK", "/webhook/regenerate-image")
+N8N_PUBLISH_WEBHOOK = os.getenv("N8N_PUBLISH_WEBHOOK", "/webhook/publish")
+
+# Connection pool settings
+N8N_MAX_CONNECTIONS = int(os.getenv("N8N_MAX_CONNECTIONS", "100"))
+N8N_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("N8N_MAX_KEEPALIVE_CONNECTIONS", "20"))
+N8N_KEEPALIVE_EXPIRY = float(os.getenv("N8N_KEEPALIVE_EXPIRY", "30"))
+N8N_CONNECT_TIMEOUT = float(os.getenv("N8N_CONNECT_TIMEOUT", "10"))
+
+# Per-webhook read timeouts (seconds)
+WEBHOOK_TIMEOUTS = {
+    N8N_SUMMARY_WEBHOOK: float(os.getenv("N8N_SUMMARY_TIMEOUT", "60")),
+    N8N_POSTGEN_WEBHOOK: float(os.getenv("N8N_POSTGEN_TIMEOUT", "60")),
+    N8N_REGENERATE_WEBHOOK: float(os.getenv("N8N_REGENERATE_TIMEOUT", "60")),
+    N8N_REGENERATE_IMAGE_WEBHOOK: float(os.getenv("N8N_REGENERATE_IMAGE_TIMEOUT", "60")),
+    N8N_PUBLISH_WEBHOOK: float(os.getenv("N8N_PUBLISH_TIMEOUT", "60")),
+}
+DEFAULT_WEBHOOK_TIMEOUT = 60.0
+
+# Per-webhook circuit breaker settings
+N8N_BREAKER_WINDOW = int(os.getenv("N8N_BREAKER_WINDOW", "20"))
+N8N_BREAKER_MIN_CALLS = int(os.getenv("N8N_BREAKER_MIN_CALLS", "5"))
+N8N_BREAKER_FAILURE_RATE = float(os.getenv("N8N_BREAKER_FAILURE_RATE", "0.5"))
+N8N_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("N8N_BREAKER_SLOW_CALL_SECONDS", "45"))
+N8N_BREAKER_SLOW_CALL_RATE = float(os.getenv("N8N_BREAKER_SLOW_CALL_RATE", "0.8"))
+N8N_BREAKER_OPEN_SECONDS = float(os.getenv("N8N_BREAKER_OPEN_SECONDS", "30"))
+N8N_BREAKER_HALF_OPEN_PROBES = int(os.getenv("N8N_BREAKER_HALF_OPEN_PROBES", "1"))
+
+# Per-webhook adaptive (AIMD) concurrency limit settings
+N8N_LIMIT_INITIAL = float(os.getenv("N8N_LIMIT_INITIAL", "20"))
+N8N_LIMIT_MIN = float(os.getenv("N8N_LIMIT_MIN", "2"))
+N8N_LIMIT_MAX = float(os.getenv("N8N_LIMIT_MAX", "100"))
+N8N_LIMIT_TARGET_LATENCY = float(os.getenv("N8N_LIMIT_TARGET_LATENCY", "20"))
+N8N_LIMIT_BACKOFF = float(os.getenv("N8N_LIMIT_BACKOFF", "0.7"))
+N8N_LIMIT_QUEUE_TIMEOUT = float(os.getenv("N8N_LIMIT_QUEUE_TIMEOUT", "5"))
+
+# Hedged requests: send a second call when the first is slower than this percentile
+N8N_HEDGE_ENABLED = os.getenv("N8N_HEDGE_ENABLED", "false").lower() == "true"
+N8N_HEDGE_PERCENTILE = float(os.getenv("N8N_HEDGE_PERCENTILE", "95"))
+N8N_HEDGE_WINDOW = int(os.getenv("N8N_HEDGE_WINDOW", "200"))
+N8N_HEDGE_MIN_SAMPLES = int(os.getenv("N8N_HEDGE_MIN_SAMPLES", "20"))
+N8N_HEDGE_INITIAL_DELAY = float(os.getenv("N8N_HEDGE_INITIAL_DELAY", "10"))  # until enough samples
+N8N_HEDGE_MIN_DELAY = float(os.getenv("N8N_HEDGE_MIN_DELAY", "0.1"))
+
+# Global budget shared by hedges and retries
+N8N_RETRY_BUDGET_RATIO = float(os.getenv("N8N_RETRY_BUDGET_RATIO", "0.1"))
+N8N_RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("N8N_RETRY_BUDGET_MIN_PER_SECOND", "1"))
+N8N_RETRY_BUDGET_MAX_TOKENS = float(os.getenv("N8N_RETRY_BUDGET_MAX_TOKENS", "10"))
+
+
+class N8NError(Exception):
+    """Raised when an n8n webhook answers with a non-200 status."""
+
+    def __init__(self, webhook: str, status_code: int, body: str = ""):
+        self.webhook = webhook
+        self.status_code = status_code
+        self.body = body
+        super().__init__(f"n8n webhook {webhook} returned {status_code}")
+
+
+class N8NClient:
+    """Keep-alive connection pool for all n8n webhook calls."""
+
+    def __init__(self, base_url: str = N8N_BASE_URL, hedging: bool = N8N_HEDGE_ENABLED):
+        self.base_url = base_url
+        self.hedging = hedging
+        self._client: Optional[httpx.AsyncClient] = None
+        self.single_flight = SingleFlight()
+        self.guards: Dict[str, UpstreamGuard] = {}
+        self.latency: Dict[str, LatencyTracker] = {}
+        self.retry_budget = RetryBudget(
+            ratio=N8N_RETRY_BUDGET_RATIO,
+            min_per_second=N8N_RETRY_BUDGET_MIN_PER_SECOND,
+            max_tokens=N8N_RETRY_BUDGET_MAX_TOKENS
+        )
+        self.hedge_stats = {"hedged_calls": 0, "hedges": 0, "retries": 0, "hedge_wins": 0}
+
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(
+                max_connections=N8N_MAX_CONNECTIONS,
+                max_keepalive_connections=N8N_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=N8N_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(DEFAULT_WEBHOOK_TIMEOUT, connect=N8N_CONNECT_TIMEOUT)
+        )
+
+    async def start(self):
+        """Open the connection pool (called from the app lifespan)."""
+        if self._client is None:
+            self._client = self._build_client()
+
+    async def close(self):
+        """Close the connection pool (called from the app lifespan)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Scripts and tests may run without the lifespan, so open the pool on first use
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+
+    def guard_for(self, webhook: str) -> UpstreamGuard:
+        """Get the circuit breaker and concurrency limiter for a webhook."""
+        guard = self.guards.get(webhook)
+        if guard is None:
+            name = f"n8n {webhook}"
+            guard = UpstreamGuard(
+                CircuitBreaker(
+                    name,
+                    window_size=N8N_BREAKER_WINDOW,
+                    min_calls=N8N_BREAKER_MIN_CALLS,
+                    failure_rate_threshold=N8N_BREAKER_FAILURE_RATE,
+                    slow_call_seconds=N8N_BREAKER_SLOW_CALL_SECONDS,
+                    slow_call_rate_threshold=N8N_BREAKER_SLOW_CALL_RATE,
+                    open_seconds=N8N_BREAKER_OPEN_SECONDS,
+                    half_open_probes=N8N_BREAKER_HALF_OPEN_PROBES
+                ),
+                AIMDLimiter(
+                    name,
+                    initial_limit=N8N_LIMIT_INITIAL,
+                    min_limit=N8N_LIMIT_MIN,
+                    max_limit=N8N_LIMIT_MAX,
+                    target_latency=N8N_LIMIT_TARGET_LATENCY,
+                    backoff=N8N_LIMIT_BACKOFF,
+                    queue_timeout=N8N_LIMIT_QUEUE_TIMEOUT
+                )
+            )
+            self.guards[webhook] = guard
+        return guard
+
+    def latency_for(self, webhook: str) -> LatencyTracker:
+        """Get the latency window used to pick a webhook's hedge delay."""
+        tracker = self.latency.get(webhook)
+        if tracker is None:
+            tracker = LatencyTracker(window_size=N8N_HEDGE_WINDOW, min_samples=N8N_HEDGE_MIN_SAMPLES)
+            self.latency[webhook] = tracker
+        return tracker
+
+    def hedge_delay(self, webhook: str) -> float:
+        """Seconds to wait on the first call before sending a hedge."""
+        delay = self.latency_for(webhook).percentile(N8N_HEDGE_PERCENTILE)
+        if delay is None:
+            return N8N_HEDGE_INITIAL_DELAY
+        return max(N8N_HEDGE_MIN_DELAY, delay)
+
+    def timeout_for(self, webhook: str) -> httpx.Timeout:
+        """Get the timeout configured for a webhook path."""
+        read_timeout = WEBHOOK_TIMEOUTS.get(webhook, DEFAULT_WEBHOOK_TIMEOUT)
+        return httpx.Timeout(read_timeout, connect=N8N_CONNECT_TIMEOUT)
+
+    async def post(
+        self,
+        webhook: str,
+        payload: dict,
+        cache: bool = False,
+        bypass_cache: bool = False,
+        coalesce: bool = False,
+        hedge: bool = False
+    ) -> dict:
+        """POST a payload to an n8n webhook and return the JSON body.
+
+        With ``cache=True`` the result is looked up in and stored to the generation cache;
+        ``bypass_cache=True`` skips the lookup but still refreshes the stored entry.
+        With ``coalesce=True`` identical concurrent calls from the same user share one
+        webhook execution.
+        With ``hedge=True`` (and hedging enabled) a second call is sent when the first is
+        slower than the webhook's hedge percentile or fails with a 5xx/transport error,
+        and whichever answers first wins. Only use it for side-effect-free webhooks.
+        Raises ``N8NError`` on non-200 responses, ``httpx.HTTPError`` on transport errors and
+        ``ServiceUnavailableError`` (a 503 with Retry-After) when the webhook's circuit is
+        open or its concurrency limit is exhausted.
+        """
+        key = None
+        if cache and GENERATION_CACHE_ENABLED:
+            key = cache_key(webhook, payload)
+            if bypass_cache:
+                generation_cache.stats["bypassed"] += 1
+            else:
+                cached = generation_cache.get(key)
+                if cached is not None:
+                    return cached
+
+        async def call():
+            if hedge and self.hedging:
+                result = await self._send_hedged(webhook, payload)
+            else:
+                result = await self._send(webhook, payload)
+            if key is not None:
+                generation_cache.set(key, webhook, result)
+            return result
+
+        if coalesce:
+            flight_key = f"{payload.get('user_id', '')}:{webhook}:{payload_hash(payload)}"
+            return await self.single_flight.do(flight_key, call)
+        return await call()
+
+    async def _send(self, webhook: str, payload: dict) -> dict:
+        async with self.guard_for(webhook).slot() as outcome:
+            response = await self.client.post(webhook, json=payload, timeout=self.timeout_for(webhook))
+            # Only server-side errors count against the webhook's health
+            outcome["failed"] = response.status_code >= 500
+
+        if response.status_code != 200:
+            raise N8NError(webhook, response.status_code, response.text)
+
+        return response.json()
+
+    async def _send_timed(self, webhook: str, payload: dict) -> dict:
+        start = time.monotonic()
+        result = await self._send(webhook, payload)
+        self.latency_for(webhook).record(time.monotonic() - start)
+        return result
+
+    @staticmethod
+    def _retryable(e: Exception) -> bool:
+        if isinstance(e, N8NError):
+            return e.status_code >= 500
+        return isinstance(e, httpx.TransportError)
+
+    async def _send_hedged(self, webhook: str, payload: dict) -> dict:
+        """Send a call plus at most one hedge or retry, paid for by the retry budget."""
+        self.retry_budget.deposit()
+        self.hedge_stats["hedged_calls"] += 1
+
+        pending = {asyncio.ensure_future(self._send_timed(webhook, payload))}
+        extra = None
+        extra_considered = False
+        last_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=None if extra_considered else self.hedge_delay(webhook),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        if not self._retryable(e):
+                            raise
+                        last_error = e
+                        continue
+                    if task is extra:
+                        self.hedge_stats["hedge_wins"] += 1
+                    return result
+
+                # First call is slow (hedge) or failed (retry): one extra attempt if affordable
+                if not extra_considered:
+                    extra_considered = True
+                    if self.retry_budget.try_spend():
+                        extra = asyncio.ensure_future(self._send_timed(webhook, payload))
+                        pending.add(extra)
+                        self.hedge_stats["retries" if done else "hedges"] += 1
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def hedging_snapshot(self) -> dict:
+        return {
+            "enabled": self.hedging,
+            "percentile": N8N_HEDGE_PERCENTILE,
+            **self.hedge_stats,
+            "retry_budget": self.retry_budget.snapshot(),
+            "latency": {webhook: tracker.snapshot() for webhook, tracker in self.latency.items()}
+        }
+
+
+n8n_client = N8NClient()
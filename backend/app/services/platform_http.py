@@ -0,0 +1,147 @@
+"""Long-lived pooled HTTP clients for the social platform APIs.
+
+One ``httpx.AsyncClient`` per platform API host is opened by the app lifespan and
+reused by every posting service, so consecutive posts skip the TCP and TLS handshakes.
+HTTP/2 is negotiated (ALPN, falling back to HTTP/1.1) when the ``h2`` package is
+installed. Any other host (image downloads, upload URLs on CDNs) shares one default
+pool. Every request is traced so the diagnostics show how many connections were opened
+versus reused per host.
+"""
+import os
+import httpx
+from collections import Counter
+from typing import Dict
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+
+load_dotenv()
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+PLATFORM_API_HOSTS = (
+    "api.linkedin.com",
+    "api.twitter.com",
+    "upload.twitter.com",
+    "graph.facebook.com",
+    "graph.instagram.com"
+)
+
+PLATFORM_HTTP2_ENABLED = os.getenv("PLATFORM_HTTP2_ENABLED", "true").lower() == "true"
+PLATFORM_HTTP_MAX_CONNECTIONS = int(os.getenv("PLATFORM_HTTP_MAX_CONNECTIONS", "20"))
+PLATFORM_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("PLATFORM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+PLATFORM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("PLATFORM_HTTP_KEEPALIVE_EXPIRY", "60"))
+PLATFORM_HTTP_TIMEOUT = float(os.getenv("PLATFORM_HTTP_TIMEOUT", "30"))
+PLATFORM_HTTP_CONNECT_TIMEOUT = float(os.getenv("PLATFORM_HTTP_CONNECT_TIMEOUT", "10"))
+PLATFORM_HTTP_UPLOAD_TIMEOUT = float(os.getenv("PLATFORM_HTTP_UPLOAD_TIMEOUT", "120"))  # media downloads/uploads
+
+# Pass as ``timeout=`` for requests that move image bytes
+UPLOAD_TIMEOUT = httpx.Timeout(PLATFORM_HTTP_UPLOAD_TIMEOUT, connect=PLATFORM_HTTP_CONNECT_TIMEOUT)
+
+DEFAULT_POOL = "default"
+
+
+def error_detail(e: httpx.HTTPError):
+    """The platform's JSON error body for a failed response, else the exception text."""
+    if isinstance(e, httpx.HTTPStatusError):
+        try:
+            return e.response.json()
+        except ValueError:
+            return e.response.text
+    return str(e) or type(e).__name__
+
+
+class ConnectionStats:
+    """Requests, new connections and TLS handshakes seen by one pool."""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self.http_versions: Counter = Counter()
+
+    async def trace(self, event_name: str, info: dict):
+        # httpcore reports connection setup only when a request can't reuse one
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+        elif event_name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    def snapshot(self) -> dict:
+        reused = max(0, self.requests - self.connections_opened)
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "tls_handshakes": self.tls_handshakes,
+            "reused_requests": reused,
+            "reuse_ratio": round(reused / self.requests, 3) if self.requests else None,
+            "http_versions": dict(self.http_versions)
+        }
+
+
+class PlatformHTTPClients:
+    """Registry of pooled clients keyed by platform API host."""
+
+    def __init__(self, hosts=PLATFORM_API_HOSTS, http2: bool = PLATFORM_HTTP2_ENABLED and HTTP2_AVAILABLE):
+        self.hosts = tuple(hosts)
+        self.http2 = http2
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self.stats: Dict[str, ConnectionStats] = {}
+
+    def _build_client(self, pool: str) -> httpx.AsyncClient:
+        stats = self.stats.setdefault(pool, ConnectionStats())
+
+        async def on_request(request: httpx.Request):
+            stats.requests += 1
+            request.extensions["trace"] = stats.trace
+
+        async def on_response(response: httpx.Response):
+            stats.http_versions[response.http_version] += 1
+
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=PLATFORM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=PLATFORM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=PLATFORM_HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(PLATFORM_HTTP_TIMEOUT, connect=PLATFORM_HTTP_CONNECT_TIMEOUT),
+            event_hooks={"request": [on_request], "response": [on_response]}
+        )
+
+    async def start(self):
+        """Open a pool for every platform API host (called from the app lifespan)."""
+        for pool in self.hosts + (DEFAULT_POOL,):
+            if pool not in self._clients:
+                self._clients[pool] = self._build_client(pool)
+
+    async def close(self):
+        """Close every pool (called from the app lifespan)."""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    def client_for(self, url: str) -> httpx.AsyncClient:
+        """Get the pooled client for a URL's host (the shared default pool for other hosts)."""
+        host = urlsplit(url).hostname or ""
+        pool = host if host in self.hosts else DEFAULT_POOL
+        client = self._clients.get(pool)
+        if client is None:
+            # Scripts and tests may run without the lifespan, so open the pool on first use
+            client = self._build_client(pool)
+            self._clients[pool] = client
+        return client
+
+    def snapshot(self) -> dict:
+        return {
+            "http2": self.http2,
+            "http2_available": HTTP2_AVAILABLE,
+            "open_pools": sorted(self._clients),
+            "pools": {pool: stats.snapshot() for pool, stats in self.stats.items()}
+        }
+
+
+platform_http = PlatformHTTPClients()
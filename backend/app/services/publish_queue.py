@@ -0,0 +1,329 @@
+"""Durable publish queue backed by the ``publish_jobs`` table.
+
+``/posts/publish`` only inserts a job; a worker pool claims due jobs per platform and
+runs the platform services. On Postgres jobs are claimed with
+``SELECT ... FOR UPDATE SKIP LOCKED`` so several app processes can run workers against
+the same table; SQLite has no row locks, so each job is claimed with a conditional
+UPDATE instead. Jobs left ``running`` by a process that died are re-queued once their
+lock times out.
+"""
+import asyncio
+import json
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from ..database import SessionLocal
+from ..models import PublishJob, PostPlatform
+from .publishing_service import PUBLISH_CONCURRENCY, post_to_platform, mark_published, mark_failed
+from .idempotency import purge_expired_keys
+from .linkedin_service import purge_expired_assets
+
+load_dotenv()
+
+PUBLISH_WORKERS_ENABLED = os.getenv("PUBLISH_WORKERS_ENABLED", "true").lower() == "true"
+PUBLISH_POLL_INTERVAL = float(os.getenv("PUBLISH_POLL_INTERVAL", "2"))
+PUBLISH_MAX_ATTEMPTS = int(os.getenv("PUBLISH_MAX_ATTEMPTS", "3"))
+PUBLISH_RETRY_BASE_DELAY = float(os.getenv("PUBLISH_RETRY_BASE_DELAY", "30"))
+PUBLISH_LOCK_TIMEOUT = float(os.getenv("PUBLISH_LOCK_TIMEOUT", "600"))  # seconds
+PUBLISH_SHUTDOWN_GRACE = float(os.getenv("PUBLISH_SHUTDOWN_GRACE", "10"))
+
+ACTIVE_STATUSES = ("queued", "running")
+
+def new_publish_job(platform_post_id: str, user_id: str, platform_name: str) -> PublishJob:
+    """Build a queued job for a post (the caller adds and commits it)."""
+    return PublishJob(
+        platform_post_id=platform_post_id,
+        user_id=user_id,
+        platform_name=platform_name.lower(),
+        status="queued",
+        attempts=0,
+        available_at=datetime.utcnow()
+    )
+
+def enqueue_publish(db: Session, platform_post: PostPlatform, user_id: str) -> PublishJob:
+    """Queue a post for publishing; an already queued or running job is returned as is."""
+    existing = db.query(PublishJob).filter(
+        PublishJob.platform_post_id == platform_post.id,
+        PublishJob.status.in_(ACTIVE_STATUSES)
+    ).first()
+    if existing:
+        return existing
+
+    job = new_publish_job(platform_post.id, user_id, platform_post.platform_name)
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request queued it first (one active job per post)
+        db.rollback()
+        return db.query(PublishJob).filter(
+            PublishJob.platform_post_id == platform_post.id,
+            PublishJob.status.in_(ACTIVE_STATUSES)
+        ).one()
+    db.refresh(job)
+
+    publish_workers.notify(job.platform_name)
+    return job
+
+def claim_inline_publish(db: Session, platform_post: PostPlatform, user_id: str, worker_id: str) -> Optional[PublishJob]:
+    """Record a publish made outside the workers as a running job.
+
+    Returns None if the post already has a queued or running job, so the same post is
+    never sent to the platform twice at once.
+    """
+    now = datetime.utcnow()
+    job = new_publish_job(platform_post.id, user_id, platform_post.platform_name)
+    job.status = "running"
+    job.attempts = 1
+    job.locked_by = worker_id
+    job.locked_at = now
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+    return job
+
+def publish_job_to_dict(job: PublishJob) -> dict:
+    """Serialize a publish job for the status endpoint."""
+    return {
+        "job_id": str(job.id),
+        "platform_id": str(job.platform_post_id),
+        "platform_name": job.platform_name,
+        "status": job.status,
+        "attempts": job.attempts,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error_message,
+        "available_at": job.available_at.isoformat() if job.available_at else None,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None
+    }
+
+def claim_jobs(db: Session, platform_name: str, limit: int, worker_id: str) -> List[str]:
+    """Mark up to ``limit`` due jobs for a platform as running and return their ids."""
+    now = datetime.utcnow()
+    due = db.query(PublishJob).filter(
+        PublishJob.status == "queued",
+        PublishJob.platform_name == platform_name,
+        PublishJob.available_at <= now
+    ).order_by(PublishJob.available_at).limit(limit)
+
+    if db.bind.dialect.name == "postgresql":
+        jobs = due.with_for_update(skip_locked=True).all()
+        for job in jobs:
+            job.status = "running"
+            job.locked_by = worker_id
+            job.locked_at = now
+            job.attempts = (job.attempts or 0) + 1
+        db.commit()
+        return [job.id for job in jobs]
+
+    # No row locks: only the worker whose UPDATE still sees "queued" gets the job
+    claimed = []
+    for job in due.all():
+        updated = db.query(PublishJob).filter(
+            PublishJob.id == job.id,
+            PublishJob.status == "queued"
+        ).update({
+            "status": "running",
+            "locked_by": worker_id,
+            "locked_at": now,
+            "attempts": PublishJob.attempts + 1
+        }, synchronize_session=False)
+        if updated:
+            claimed.append(job.id)
+    db.commit()
+    return claimed
+
+def requeue_stale_jobs(db: Session) -> int:
+    """Put jobs locked for longer than ``PUBLISH_LOCK_TIMEOUT`` (worker died) back in the queue."""
+    cutoff = datetime.utcnow() - timedelta(seconds=PUBLISH_LOCK_TIMEOUT)
+    requeued = db.query(PublishJob).filter(
+        PublishJob.status == "running",
+        PublishJob.locked_at < cutoff
+    ).update({
+        "status": "queued",
+        "locked_by": None,
+        "locked_at": None,
+        "available_at": datetime.utcnow()
+    }, synchronize_session=False)
+    db.commit()
+    return requeued
+
+def _is_retryable(e: Exception) -> bool:
+    if isinstance(e, HTTPException):
+        return e.status_code >= 500 or e.status_code == 429
+    return True
+
+def _retry_delay(e: Exception, attempts: int) -> float:
+    delay = PUBLISH_RETRY_BASE_DELAY * 2 ** (attempts - 1)
+    # Rate-limited publishes wait at least until the platform quota allows another call
+    retry_after = (getattr(e, "headers", None) or {}).get("Retry-After")
+    if retry_after and str(retry_after).isdigit():
+        delay = max(delay, float(retry_after))
+    return delay
+
+def record_job_outcome(job: PublishJob, status: str, result: dict = None, error: str = None):
+    """Set a job's final (or re-queued) state and release its lock (the caller commits)."""
+    job.status = status
+    if result is not None:
+        job.result = json.dumps(result, default=str)
+    job.error_message = error
+    job.locked_by = None
+    job.locked_at = None
+    job.updated_at = datetime.utcnow()
+
+def _finish(db: Session, job: PublishJob, status: str, result: dict = None, error: str = None):
+    record_job_outcome(job, status, result, error)
+    db.commit()
+
+async def process_publish_job(job_id: str) -> str:
+    """Publish one claimed job and return its new status."""
+    db = SessionLocal()
+    try:
+        job = db.query(PublishJob).filter(PublishJob.id == job_id).first()
+        if not job:
+            return "missing"
+
+        platform_post = db.query(PostPlatform).filter(PostPlatform.id == job.platform_post_id).first()
+        if not platform_post:
+            _finish(db, job, "failed", error="Platform post not found")
+            return job.status
+
+        if platform_post.published or platform_post.external_post_id:
+            # A re-queued job whose earlier attempt got through; don't post twice
+            _finish(db, job, "published", result={
+                "post_id": platform_post.external_post_id,
+                "url": platform_post.external_post_url
+            })
+            return job.status
+
+        try:
+            result = await post_to_platform(db, platform_post, job.user_id)
+        except Exception as e:
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            print(f"[PUBLISH QUEUE] Job {job_id} attempt {job.attempts} failed: {error}")
+            mark_failed(platform_post, error)
+
+            if _is_retryable(e) and job.attempts < PUBLISH_MAX_ATTEMPTS:
+                job.available_at = datetime.utcnow() + timedelta(seconds=_retry_delay(e, job.attempts))
+                _finish(db, job, "queued", error=error)
+            else:
+                _finish(db, job, "failed", error=error)
+            return job.status
+
+        mark_published(platform_post, result)
+        _finish(db, job, "published", result=result)
+        return job.status
+    finally:
+        db.close()
+
+class PublishWorkerPool:
+    """One dispatcher per platform keeps up to that platform's concurrency in flight."""
+
+    def __init__(self, concurrency: Dict[str, int], poll_interval: float = PUBLISH_POLL_INTERVAL):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._running: Dict[str, set] = {platform: set() for platform in concurrency}
+        self._wakeups: Dict[str, asyncio.Event] = {platform: asyncio.Event() for platform in concurrency}
+        self._loops: List[asyncio.Task] = []
+        self.stats = {"claimed": 0, "published": 0, "failed": 0, "retried": 0, "requeued_stale": 0}
+
+    def start(self):
+        """Start the dispatcher loops (called from the app lifespan)."""
+        if self._loops:
+            return
+        for platform in self.concurrency:
+            self._loops.append(asyncio.ensure_future(self._dispatch(platform)))
+        self._loops.append(asyncio.ensure_future(self._sweep()))
+
+    async def stop(self):
+        """Stop claiming and give in-flight publishes a grace period to finish."""
+        for loop in self._loops:
+            loop.cancel()
+        self._loops = []
+
+        in_flight = [task for tasks in self._running.values() for task in tasks]
+        if in_flight:
+            # Anything still running is re-queued by another worker after the lock timeout
+            _, pending = await asyncio.wait(in_flight, timeout=PUBLISH_SHUTDOWN_GRACE)
+            for task in pending:
+                task.cancel()
+
+    def notify(self, platform_name: str):
+        """Wake a platform's dispatcher right away instead of at the next poll."""
+        wakeup = self._wakeups.get(platform_name)
+        if wakeup is not None:
+            wakeup.set()
+
+    async def _dispatch(self, platform_name: str):
+        running = self._running[platform_name]
+        wakeup = self._wakeups[platform_name]
+        while True:
+            wakeup.clear()
+            free = self.concurrency[platform_name] - len(running)
+            if free > 0:
+                db = SessionLocal()
+                try:
+                    job_ids = claim_jobs(db, platform_name, free, self.worker_id)
+                except Exception as e:
+                    print(f"[PUBLISH QUEUE] Claiming {platform_name} jobs failed: {str(e)}")
+                    job_ids = []
+                finally:
+                    db.close()
+
+                for job_id in job_ids:
+                    self.stats["claimed"] += 1
+                    task = asyncio.ensure_future(self._run(job_id))
+                    running.add(task)
+                    task.add_done_callback(lambda t: (running.discard(t), wakeup.set()))
+
+            try:
+                await asyncio.wait_for(wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self, job_id: str):
+        try:
+            status = await process_publish_job(job_id)
+        except Exception as e:
+            print(f"[PUBLISH QUEUE] Job {job_id} crashed: {str(e)}")
+            return
+        if status == "published":
+            self.stats["published"] += 1
+        elif status == "failed":
+            self.stats["failed"] += 1
+        elif status == "queued":
+            self.stats["retried"] += 1
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(max(self.poll_interval, PUBLISH_LOCK_TIMEOUT / 10))
+            db = SessionLocal()
+            try:
+                self.stats["requeued_stale"] += requeue_stale_jobs(db)
+                purge_expired_keys(db)
+                purge_expired_assets(db)
+            except Exception as e:
+                print(f"[PUBLISH QUEUE] Sweeping stale jobs and expired records failed: {str(e)}")
+            finally:
+                db.close()
+
+    def snapshot(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "running": bool(self._loops),
+            "in_flight": {platform: len(tasks) for platform, tasks in self._running.items()},
+            "concurrency": self.concurrency,
+            **self.stats
+        }
+
+publish_workers = PublishWorkerPool(PUBLISH_CONCURRENCY)
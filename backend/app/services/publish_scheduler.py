@@ -0,0 +1,134 @@
+"""Scheduler that moves due scheduled posts into the publish queue.
+
+Due rows are found through the partial ``ix_post_platforms_due`` index, so each scan
+only touches posts that are approved, unpublished and scheduled, no matter how many
+are waiting further in the future. A batch is claimed by clearing ``scheduled_at`` and
+inserting its publish jobs in one transaction. On Postgres the rows are locked with
+``FOR UPDATE SKIP LOCKED``, so schedulers in several app processes split the work;
+on SQLite each row is claimed with a conditional UPDATE. Either way a post is only
+handed to the workers once.
+"""
+import asyncio
+import os
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from ..database import SessionLocal
+from ..models import PostPlatform, PostSummary, PublishJob
+from .publish_queue import new_publish_job, publish_workers, ACTIVE_STATUSES
+
+load_dotenv()
+
+PUBLISH_SCHEDULER_ENABLED = os.getenv("PUBLISH_SCHEDULER_ENABLED", "true").lower() == "true"
+PUBLISH_SCHEDULER_INTERVAL = float(os.getenv("PUBLISH_SCHEDULER_INTERVAL", "15"))  # seconds
+PUBLISH_SCHEDULER_BATCH_SIZE = int(os.getenv("PUBLISH_SCHEDULER_BATCH_SIZE", "100"))
+
+def claim_due_posts(db: Session, batch_size: int) -> List[str]:
+    """Claim up to ``batch_size`` due posts and queue their publish jobs; returns the jobs' platforms."""
+    now = datetime.utcnow()
+    # Filters mirror the partial index predicate so the planner can use it
+    due = db.query(
+        PostPlatform.id, PostPlatform.platform_name, PostPlatform.scheduled_at, PostSummary.user_id
+    ).join(PostSummary).filter(
+        PostPlatform.published == False,
+        PostPlatform.approved == True,
+        PostPlatform.scheduled_at.isnot(None),
+        PostPlatform.scheduled_at <= now
+    ).order_by(PostPlatform.scheduled_at).limit(batch_size)
+
+    if db.bind.dialect.name == "postgresql":
+        rows = due.with_for_update(skip_locked=True, of=PostPlatform).all()
+        if rows:
+            db.query(PostPlatform).filter(PostPlatform.id.in_([r.id for r in rows])).update(
+                {"scheduled_at": None, "updated_at": now},
+                synchronize_session=False
+            )
+    else:
+        # No row locks: only the scheduler whose UPDATE still sees the same time wins
+        rows = []
+        for row in due.all():
+            updated = db.query(PostPlatform).filter(
+                PostPlatform.id == row.id,
+                PostPlatform.scheduled_at == row.scheduled_at
+            ).update({"scheduled_at": None, "updated_at": now}, synchronize_session=False)
+            if updated:
+                rows.append(row)
+
+    if not rows:
+        db.commit()
+        return []
+
+    # A post already queued (e.g. published by hand meanwhile) doesn't get a second job
+    active = {
+        platform_post_id for (platform_post_id,) in db.query(PublishJob.platform_post_id).filter(
+            PublishJob.platform_post_id.in_([r.id for r in rows]),
+            PublishJob.status.in_(ACTIVE_STATUSES)
+        )
+    }
+    jobs = [
+        new_publish_job(row.id, row.user_id, row.platform_name)
+        for row in rows if row.id not in active
+    ]
+    platforms = [job.platform_name for job in jobs]
+    db.add_all(jobs)
+    db.commit()
+    return platforms
+
+class PublishScheduler:
+    """Periodically claims due scheduled posts in batches."""
+
+    def __init__(self, interval: float = PUBLISH_SCHEDULER_INTERVAL, batch_size: int = PUBLISH_SCHEDULER_BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self.last_run_at: Optional[datetime] = None
+        self.stats = {"runs": 0, "dispatched": 0, "errors": 0}
+
+    def start(self):
+        """Start the scheduler loop (called from the app lifespan)."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def run_once(self) -> int:
+        """Claim one batch of due posts and wake the workers for them."""
+        db = SessionLocal()
+        try:
+            platforms = claim_due_posts(db, self.batch_size)
+        finally:
+            db.close()
+
+        for platform_name in set(platforms):
+            publish_workers.notify(platform_name)
+        self.stats["runs"] += 1
+        self.stats["dispatched"] += len(platforms)
+        self.last_run_at = datetime.utcnow()
+        return len(platforms)
+
+    async def _loop(self):
+        while True:
+            try:
+                claimed = self.run_once()
+            except Exception as e:
+                print(f"[PUBLISH SCHEDULER] Claiming due posts failed: {str(e)}")
+                self.stats["errors"] += 1
+                claimed = 0
+
+            # A full batch means more are probably due; keep draining
+            await asyncio.sleep(self.interval if claimed < self.batch_size else 0)
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "interval_seconds": self.interval,
+            "batch_size": self.batch_size,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            **self.stats
+        }
+
+publish_scheduler = PublishScheduler()
@@ -0,0 +1,80 @@
+"""Publish PostPlatform rows through the direct platform API services."""
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from ..models import PostPlatform
+from .linkedin_service import LinkedInPostingService
+from .twitter_service import TwitterPostingService
+from .facebook_service import FacebookPostingService
+from .instagram_service import InstagramPostingService
+
+load_dotenv()
+
+PLATFORM_SERVICES = {
+    "linkedin": LinkedInPostingService,
+    "twitter": TwitterPostingService,
+    "facebook": FacebookPostingService,
+    "instagram": InstagramPostingService
+}
+
+# Max concurrent publishes per platform, e.g. PUBLISH_CONCURRENCY_LINKEDIN=4
+PUBLISH_WORKER_CONCURRENCY = int(os.getenv("PUBLISH_WORKER_CONCURRENCY", "2"))
+PUBLISH_CONCURRENCY = {
+    platform: int(os.getenv(f"PUBLISH_CONCURRENCY_{platform.upper()}", str(PUBLISH_WORKER_CONCURRENCY)))
+    for platform in PLATFORM_SERVICES
+}
+
+_platform_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+def platform_semaphore(platform_name: str) -> asyncio.Semaphore:
+    """Get the semaphore bounding inline publishes to one platform in this process."""
+    semaphore = _platform_semaphores.get(platform_name)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(PUBLISH_CONCURRENCY.get(platform_name, PUBLISH_WORKER_CONCURRENCY))
+        _platform_semaphores[platform_name] = semaphore
+    return semaphore
+
+def check_publishable(platform_post: PostPlatform):
+    """Raise a 400 if the post can't be published yet, or a 409 if it already was."""
+    if platform_post.published or platform_post.external_post_id:
+        raise HTTPException(status_code=409, detail=f"Post already published to {platform_post.platform_name}")
+
+    if not platform_post.approved:
+        raise HTTPException(status_code=400, detail=f"Post not approved for {platform_post.platform_name}")
+
+    if not platform_post.post_text:
+        raise HTTPException(status_code=400, detail="No post content generated yet")
+
+    if platform_post.platform_name.lower() not in PLATFORM_SERVICES:
+        raise HTTPException(status_code=400, detail=f"Unsupported platform: {platform_post.platform_name.lower()}")
+
+async def post_to_platform(db: Session, platform_post: PostPlatform, user_id: str) -> dict:
+    """Call the platform service for a post and return its result."""
+    platform_name = platform_post.platform_name.lower()
+    service_class = PLATFORM_SERVICES.get(platform_name)
+    if service_class is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported platform: {platform_name}")
+
+    post_text = platform_post.post_text
+    if platform_name == "linkedin":
+        post_text = post_text[:280]
+
+    return await service_class().post_content(user_id, post_text, platform_post.image_url, db)
+
+def mark_published(platform_post: PostPlatform, result: dict):
+    """Record a successful publish on the row (the caller commits)."""
+    platform_post.published = True
+    platform_post.published_at = datetime.utcnow()
+    platform_post.external_post_id = result.get("post_id")
+    platform_post.external_post_url = result.get("url")
+    platform_post.error_message = None
+    platform_post.updated_at = datetime.utcnow()
+
+def mark_failed(platform_post: PostPlatform, error: str):
+    """Record a failed publish on the row (the caller commits)."""
+    platform_post.error_message = error
+    platform_post.updated_at = datetime.utcnow()
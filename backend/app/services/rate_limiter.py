@@ -0,0 +1,280 @@
+"""Token-bucket rate limiting for the social platform APIs.
+
+Every publish takes a token from the platform's app-wide bucket and from the user's
+bucket for that platform. Buckets refill from configured quotas (``N/SECONDS``) at a
+rate and burst chosen so no window can exceed the quota, and they are tightened from
+what the platforms report back: X's ``x-rate-limit-*`` and ``x-app-limit-24hour-*``
+headers, the Graph API's ``x-app-usage`` / ``x-business-use-case-usage`` percentages,
+and ``Retry-After`` on 429s. A caller that would have to wait longer than
+``RATE_LIMIT_MAX_WAIT`` gets a 429 with Retry-After instead of sleeping.
+
+Buckets are per process; with several app processes, divide the quotas between them.
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Default quotas as "calls/seconds"; override with RATE_LIMIT_<PLATFORM>_APP / _USER
+DEFAULT_QUOTAS = {
+    "twitter": {"app": "10000/86400", "user": "100/900"},
+    "linkedin": {"app": "100000/86400", "user": "150/86400"},
+    "facebook": {"app": "10000/3600", "user": "200/3600"},
+    "instagram": {"app": "5000/3600", "user": "50/86400"}
+}
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "30"))  # seconds
+RATE_LIMIT_BURST_FRACTION = float(os.getenv("RATE_LIMIT_BURST_FRACTION", "0.1"))
+RATE_LIMIT_USAGE_THROTTLE = float(os.getenv("RATE_LIMIT_USAGE_THROTTLE", "80"))  # percent
+RATE_LIMIT_USAGE_BLOCK_SECONDS = float(os.getenv("RATE_LIMIT_USAGE_BLOCK_SECONDS", "300"))
+RATE_LIMIT_DEFAULT_RETRY_AFTER = float(os.getenv("RATE_LIMIT_DEFAULT_RETRY_AFTER", "60"))
+RATE_LIMIT_MAX_USER_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_USER_BUCKETS", "10000"))
+
+# Graph API error codes for app, user, page and business use case throttling (sent with a 400/403)
+GRAPH_THROTTLE_CODES = {4, 17, 32, 613, 80001, 80002, 80004, 80005, 80006, 80008}
+
+def parse_quota(quota: str) -> Tuple[int, float]:
+    """Parse ``"calls/seconds"`` into (calls, seconds)."""
+    calls, _, seconds = quota.partition("/")
+    return int(calls), float(seconds)
+
+def quota_for(platform: str, scope: str) -> Tuple[int, float]:
+    default = DEFAULT_QUOTAS.get(platform, {}).get(scope, "100/60")
+    return parse_quota(os.getenv(f"RATE_LIMIT_{platform.upper()}_{scope.upper()}", default))
+
+class RateLimitedError(HTTPException):
+    """429 raised instead of waiting too long for a platform quota."""
+
+    def __init__(self, platform: str, retry_after: float):
+        self.platform = platform
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(
+            status_code=429,
+            detail=f"{platform} rate limit reached, retry in {self.retry_after}s",
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+class TokenBucket:
+    """Token bucket whose tokens may go negative to reserve slots for waiting callers."""
+
+    def __init__(self, calls: int, seconds: float):
+        # Burst + refill over any window of ``seconds`` never exceeds ``calls``
+        self.capacity = max(1.0, math.floor(calls * RATE_LIMIT_BURST_FRACTION))
+        self.rate = max(calls - self.capacity, 1.0) / seconds
+        self.tokens = self.capacity
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token would be available."""
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def take(self):
+        self.tokens -= 1
+
+    def limit_remaining(self, remaining: int, reset_in: Optional[float], now: float):
+        """Never allow more calls than the platform says are left in its window."""
+        self._refill(now)
+        if remaining <= 0:
+            self.block(reset_in if reset_in is not None else RATE_LIMIT_DEFAULT_RETRY_AFTER, now)
+        else:
+            self.tokens = min(self.tokens, float(remaining))
+
+    def block(self, seconds: float, now: float):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and self.blocked_until <= now
+
+    def snapshot(self, now: float) -> dict:
+        self._refill(now)
+        return {
+            "tokens": round(self.tokens, 2),
+            "capacity": self.capacity,
+            "refill_per_second": round(self.rate, 5),
+            "blocked_for_seconds": round(max(0.0, self.blocked_until - now), 1)
+        }
+
+def _number(value) -> float:
+    """A usage figure from a response header, 0 when missing or malformed."""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+class PlatformRateLimiter:
+    """App-wide and per-user token buckets for every platform."""
+
+    def __init__(self, enabled: bool = RATE_LIMIT_ENABLED, max_wait: float = RATE_LIMIT_MAX_WAIT):
+        self.enabled = enabled
+        self.max_wait = max_wait
+        self._app_buckets: Dict[str, TokenBucket] = {}
+        self._user_buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self.stats = {"acquired": 0, "delayed": 0, "rejected": 0, "header_adjustments": 0, "throttled_responses": 0}
+
+    def app_bucket(self, platform: str) -> TokenBucket:
+        bucket = self._app_buckets.get(platform)
+        if bucket is None:
+            bucket = TokenBucket(*quota_for(platform, "app"))
+            self._app_buckets[platform] = bucket
+        return bucket
+
+    def user_bucket(self, platform: str, user_id: str) -> TokenBucket:
+        key = (platform, str(user_id))
+        bucket = self._user_buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(*quota_for(platform, "user"))
+            self._user_buckets[key] = bucket
+            self._prune()
+        self._user_buckets.move_to_end(key)
+        return bucket
+
+    def _prune(self):
+        # Forget the least recently used users whose buckets have fully refilled
+        now = time.monotonic()
+        for key in list(self._user_buckets):
+            if len(self._user_buckets) <= RATE_LIMIT_MAX_USER_BUCKETS:
+                break
+            if self._user_buckets[key].is_idle(now):
+                del self._user_buckets[key]
+
+    async def acquire(self, platform: str, user_id: str):
+        """Take a token for one call, waiting up to ``max_wait`` or raising ``RateLimitedError``."""
+        if not self.enabled:
+            return
+        wait = self.retry_after(platform, user_id)
+        if wait > self.max_wait:
+            self.stats["rejected"] += 1
+            raise RateLimitedError(platform, wait)
+
+        # Reserve now so later callers queue behind this one
+        self.app_bucket(platform).take()
+        self.user_bucket(platform, user_id).take()
+        self.stats["acquired"] += 1
+        if wait > 0:
+            self.stats["delayed"] += 1
+            await asyncio.sleep(wait)
+
+    def retry_after(self, platform: str, user_id: str) -> float:
+        """Seconds until the platform's buckets would allow another call for the user."""
+        now = time.monotonic()
+        return max(self.app_bucket(platform).wait_time(now), self.user_bucket(platform, user_id).wait_time(now))
+
+    def observe(self, platform: str, user_id: str, status_code: int, headers):
+        """Tighten the buckets from a platform response's rate-limit headers."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        app_bucket = self.app_bucket(platform)
+        user_bucket = self.user_bucket(platform, user_id)
+        adjusted = False
+
+        # X: per-user endpoint window and the app / user 24 hour caps
+        for prefix, bucket in (
+            ("x-rate-limit", user_bucket),
+            ("x-app-limit-24hour", app_bucket),
+            ("x-user-limit-24hour", user_bucket)
+        ):
+            remaining = headers.get(f"{prefix}-remaining")
+            if remaining is not None and remaining.strip().isdigit():
+                bucket.limit_remaining(int(remaining), self._reset_in(headers.get(f"{prefix}-reset")), now)
+                adjusted = True
+
+        # Graph API (Facebook, Instagram): usage as a percentage of the app / page quota
+        app_usage = self._parse_usage(headers.get("x-app-usage"))
+        if app_usage:
+            self._apply_usage(app_bucket, app_usage, now)
+            adjusted = True
+        for usage in self._parse_business_usage(headers.get("x-business-use-case-usage")):
+            self._apply_usage(user_bucket, usage, now)
+            adjusted = True
+
+        if status_code == 429:
+            self.stats["throttled_responses"] += 1
+            retry_after = headers.get("retry-after")
+            user_bucket.block(float(retry_after) if retry_after and retry_after.isdigit() else RATE_LIMIT_DEFAULT_RETRY_AFTER, now)
+            adjusted = True
+
+        if adjusted:
+            self.stats["header_adjustments"] += 1
+
+    def check_graph_response(self, platform: str, user_id: str, response):
+        """Observe a Graph API response and raise ``RateLimitedError`` if it was throttled."""
+        throttled = response.status_code == 429
+        if not throttled and response.status_code >= 400:
+            try:
+                error = response.json().get("error") or {}
+            except ValueError:
+                error = {}
+            throttled = isinstance(error, dict) and error.get("code") in GRAPH_THROTTLE_CODES
+
+        self.observe(platform, user_id, 429 if throttled else response.status_code, response.headers)
+        if throttled:
+            raise RateLimitedError(platform, self.retry_after(platform, user_id))
+
+    @staticmethod
+    def _reset_in(reset: Optional[str]) -> Optional[float]:
+        # X sends the reset time as epoch seconds
+        if not reset or not reset.isdigit():
+            return None
+        return max(0.0, int(reset) - time.time())
+
+    @staticmethod
+    def _parse_usage(value: Optional[str]) -> Optional[dict]:
+        if not value:
+            return None
+        try:
+            usage = json.loads(value)
+        except ValueError:
+            return None
+        return usage if isinstance(usage, dict) else None
+
+    @classmethod
+    def _parse_business_usage(cls, value: Optional[str]) -> list:
+        usage = cls._parse_usage(value) or {}
+        return [entry for entries in usage.values() if isinstance(entries, list) for entry in entries if isinstance(entry, dict)]
+
+    @staticmethod
+    def _apply_usage(bucket: TokenBucket, usage: dict, now: float):
+        percent = max(
+            _number(usage.get("call_count")),
+            _number(usage.get("total_cputime")),
+            _number(usage.get("total_time"))
+        )
+        regain_minutes = _number(usage.get("estimated_time_to_regain_access"))
+        if regain_minutes > 0:
+            bucket.block(regain_minutes * 60, now)
+        elif percent >= 100:
+            bucket.block(RATE_LIMIT_USAGE_BLOCK_SECONDS, now)
+        elif percent >= RATE_LIMIT_USAGE_THROTTLE:
+            # Close to the cap: drop any burst and go at the refill rate
+            bucket._refill(now)
+            bucket.tokens = min(bucket.tokens, 0.0)
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        return {
+            "enabled": self.enabled,
+            "max_wait_seconds": self.max_wait,
+            "app": {platform: bucket.snapshot(now) for platform, bucket in self._app_buckets.items()},
+            "user_buckets": len(self._user_buckets),
+            "blocked_users": sum(1 for b in self._user_buckets.values() if b.blocked_until > now),
+            **self.stats
+        }
+
+rate_limiter = PlatformRateLimiter()
@@ -0,0 +1,45 @@
+"""Coalesce identical in-flight calls so duplicates share one execution."""
+import asyncio
+import copy
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict
+
+def payload_hash(payload: dict) -> str:
+    """Stable SHA-256 of a JSON payload."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+class SingleFlight:
+    """Run at most one call per key; concurrent callers await the same result.
+
+    The shared call runs as its own task, so a leader whose request is cancelled
+    (client disconnect) does not cancel the call for the callers waiting on it.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {"executions": 0, "coalesced": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            result = await asyncio.shield(task)
+            # Followers get their own copy so handlers can't mutate each other's result
+            return copy.deepcopy(result)
+
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t))
+        self.stats["executions"] += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "in_flight": len(self._inflight)}
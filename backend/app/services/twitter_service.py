@@ -1,14 +1,29 @@
-import httpx
+import asyncio
 import os
+import tempfile
+import time
+from typing import AsyncIterator, Optional
 from fastapi import HTTPException
+from dotenv import load_dotenv
 from ..utils.token_manager import get_token_for_user
 from ..utils.crypto import decrypt_val
 from ..routers.auth_x import refresh_x_token
+from .rate_limiter import rate_limiter, RateLimitedError
+from .platform_http import platform_http, UPLOAD_TIMEOUT
+from .media_stream import open_media, MEDIA_CHUNK_SIZE
 from datetime import datetime, timedelta, timezone
 
+load_dotenv()
+
+# Chunked media upload: APPEND segment size (X accepts up to 5 MB per segment)
+TWITTER_MEDIA_SEGMENT_BYTES = int(os.getenv("TWITTER_MEDIA_SEGMENT_BYTES", str(1024 * 1024)))
+TWITTER_IMAGE_MAX_BYTES = int(os.getenv("TWITTER_IMAGE_MAX_BYTES", str(5 * 1024 * 1024)))
+TWITTER_MEDIA_PROCESSING_TIMEOUT = float(os.getenv("TWITTER_MEDIA_PROCESSING_TIMEOUT", "60"))
+
 class TwitterPostingService:
     def __init__(self):
         self.base_url = "https://api.twitter.com/2"
+        self.media_url = f"{self.base_url}/media/upload"
 
     async def post_content(self, user_id: str, content: str, image_url: str = None, db=None):
         """Post content to Twitter/X."""
@@ -29,16 +44,25 @@ class TwitterPostingService:
             access_token = decrypt_val(token_row.access_token)
 
             # Post to Twitter API
-            async with httpx.AsyncClient() as client:
-                res = await client.post(
-                    "https://api.twitter.com/2/tweets",
-                    headers={
-                        "Authorization": f"Bearer {access_token}",
-                        "Content-Type": "application/json"
-                    },
-                    json={"text": content}
-                )
+            await rate_limiter.acquire("twitter", user_id)
+            tweet = {"text": content}
+            if image_url:
+                media_id = await self._upload_media(user_id, access_token, image_url)
+                tweet["media"] = {"media_ids": [media_id]}
 
+            tweets_url = f"{self.base_url}/tweets"
+            res = await platform_http.client_for(tweets_url).post(
+                tweets_url,
+                headers={
+                    "Authorization": f"Bearer {access_token}",
+                    "Content-Type": "application/json"
+                },
+                json=tweet
+            )
+            rate_limiter.observe("twitter", user_id, res.status_code, res.headers)
+
+            if res.status_code == 429:
+                raise RateLimitedError("twitter", rate_limiter.retry_after("twitter", user_id))
             if res.status_code not in (200, 201):
                 raise HTTPException(status_code=500, detail=f"X post failed: {res.text}")
 
@@ -50,5 +74,110 @@ class TwitterPostingService:
                 "url": f"https://twitter.com/i/web/status/{result['data']['id']}"
             }
 
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Twitter posting failed: {str(e)}")
+
+    async def _upload_media(self, user_id: str, access_token: str, image_url: str) -> str:
+        """Upload an image with the chunked INIT / APPEND / FINALIZE / STATUS flow.
+
+        The image (its X variant when one can be built) is streamed from the local
+        store or its URL and sent in ``TWITTER_MEDIA_SEGMENT_BYTES`` segments, so at
+        most one segment is held in memory. An image served without a Content-Length
+        is spooled first (to disk past one segment), since INIT needs its size.
+        """
+        headers = {"Authorization": f"Bearer {access_token}"}
+        client = platform_http.client_for(self.media_url)
+
+        async with open_media(image_url, TWITTER_IMAGE_MAX_BYTES, platform="twitter") as media:
+            content_type = media.content_type or "image/jpeg"
+            if media.content_length is not None:
+                media_id = await self._send_segments(user_id, client, headers, content_type, media.content_length, media.iter_chunks())
+            else:
+                # INIT needs the total size up front; spool an image sent without one
+                with tempfile.SpooledTemporaryFile(max_size=TWITTER_MEDIA_SEGMENT_BYTES) as spool:
+                    async for chunk in media.iter_chunks():
+                        spool.write(chunk)
+                    total_bytes = spool.tell()
+                    spool.seek(0)
+                    media_id = await self._send_segments(user_id, client, headers, content_type, total_bytes, _iter_file(spool))
+
+        finalize = await client.post(self.media_url, headers=headers, data={"command": "FINALIZE", "media_id": media_id})
+        processing = self._check_media_response(user_id, finalize, "FINALIZE").json().get("data", {}).get("processing_info")
+        await self._wait_for_processing(user_id, client, headers, media_id, processing)
+        return media_id
+
+    async def _send_segments(self, user_id: str, client, headers: dict, content_type: str, total_bytes: int,
+                             chunks: AsyncIterator[bytes]) -> str:
+        """INIT an upload and APPEND the image in segments; returns the media id."""
+        init = await client.post(self.media_url, headers=headers, data={
+            "command": "INIT",
+            "media_type": content_type,
+            "total_bytes": str(total_bytes),
+            "media_category": "tweet_image"
+        })
+        media_id = self._check_media_response(user_id, init, "INIT").json()["data"]["id"]
+
+        segment_index = 0
+        segment = bytearray()
+        async for chunk in chunks:
+            segment += chunk
+            while len(segment) >= TWITTER_MEDIA_SEGMENT_BYTES:
+                await self._append(user_id, client, headers, media_id, segment_index, bytes(segment[:TWITTER_MEDIA_SEGMENT_BYTES]))
+                del segment[:TWITTER_MEDIA_SEGMENT_BYTES]
+                segment_index += 1
+        if segment:
+            await self._append(user_id, client, headers, media_id, segment_index, bytes(segment))
+        return media_id
+
+    async def _append(self, user_id: str, client, headers: dict, media_id: str, segment_index: int, segment: bytes):
+        res = await client.post(
+            self.media_url,
+            headers=headers,
+            data={"command": "APPEND", "media_id": media_id, "segment_index": str(segment_index)},
+            files={"media": segment},
+            timeout=UPLOAD_TIMEOUT
+        )
+        self._check_media_response(user_id, res, "APPEND")
+
+    async def _wait_for_processing(self, user_id: str, client, headers: dict, media_id: str, processing: Optional[dict]):
+        """Poll STATUS until X has processed the upload (images usually need no processing)."""
+        deadline = time.monotonic() + TWITTER_MEDIA_PROCESSING_TIMEOUT
+        while processing and processing.get("state") in ("pending", "in_progress"):
+            delay = float(processing.get("check_after_secs") or 1)
+            if time.monotonic() + delay > deadline:
+                raise HTTPException(status_code=504, detail=f"X media {media_id} was not processed within {TWITTER_MEDIA_PROCESSING_TIMEOUT:.0f}s")
+            await asyncio.sleep(delay)
+            status = await client.get(self.media_url, headers=headers, params={"command": "STATUS", "media_id": media_id})
+            processing = self._check_media_response(user_id, status, "STATUS").json().get("data", {}).get("processing_info")
+
+        if processing and processing.get("state") == "failed":
+            error = processing.get("error") or {}
+            raise HTTPException(status_code=500, detail=f"X media processing failed: {error.get('message') or error}")
+
+    @staticmethod
+    def _check_media_response(user_id: str, res, step: str):
+        if res.status_code == 429:
+            rate_limiter.observe("twitter", user_id, res.status_code, res.headers)
+            raise RateLimitedError("twitter", rate_limiter.retry_after("twitter", user_id))
+        if res.status_code in (401, 403):
+            # Accounts linked before media.write was requested can post text but not upload
+            raise HTTPException(
+                status_code=403,
+                detail="X refused the image upload; reconnect your X account to grant media upload permission"
+            )
+        if 400 <= res.status_code < 500:
+            # The image itself was rejected; retrying won't change that
+            raise HTTPException(status_code=400, detail=f"X media {step} rejected: {res.text}")
+        if res.status_code >= 500:
+            raise HTTPException(status_code=500, detail=f"X media {step} failed: {res.text}")
+        return res
+
+
+async def _iter_file(f) -> AsyncIterator[bytes]:
+    while True:
+        chunk = f.read(MEDIA_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,217 @@
+"""Benchmark event loop responsiveness while Facebook and Instagram publishes run.
+
+Starts a Graph API stand-in on its own thread (``/me/accounts``, ``/{page}/feed``,
+``/{page}/photos``, ``/me``, ``/{id}/media``, container status, ``/{id}/media_publish``
+and an image URL, each with log-normal latency), then runs the same publish workload
+two ways:
+
+* ``blocking``: the call sequence made with a synchronous HTTP client inside the
+  coroutine, as the services did with ``requests``
+* ``async``: the real ``FacebookPostingService`` / ``InstagramPostingService``
+
+While publishes are in flight a probe task sleeps for a fixed tick and records how late
+it wakes up; the report shows that lag next to publish latency and throughput.
+
+Usage:
+    cd backend
+    python3 scripts/bench_event_loop.py --publishes 60 --concurrency 10 --latency 80:0.3
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import threading
+import time
+
+# The services pull in the database layer; the benchmark never touches it
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from n8n_standin import make_png
+from app.services.facebook_service import FacebookPostingService, facebook_page_cache
+from app.services.instagram_service import InstagramPostingService
+from app.services.platform_http import platform_http
+from app.services.rate_limiter import rate_limiter
+
+GRAPH_VERSION = "v18.0"
+
+def percentile(sorted_values: list, pct: float) -> float:
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def create_graph_app(median_ms: float, sigma: float) -> FastAPI:
+    """Graph API stand-in answering with the shapes the posting services read."""
+    app = FastAPI()
+    png = make_png(512, 512)
+    counter = {"n": 0}
+
+    async def simulate():
+        await asyncio.sleep(median_ms / 1000.0 * math.exp(random.gauss(0, sigma)))
+        counter["n"] += 1
+        return counter["n"]
+
+    @app.get(f"/{GRAPH_VERSION}/me/accounts")
+    async def accounts():
+        await simulate()
+        return {"data": [{"id": "1001", "name": "Stand-in Page", "access_token": "page-token"}]}
+
+    @app.post(f"/{GRAPH_VERSION}/{{page_id}}/feed")
+    @app.post(f"/{GRAPH_VERSION}/{{page_id}}/photos")
+    async def page_post(page_id: str, request: Request):
+        await request.body()
+        n = await simulate()
+        return {"id": f"{page_id}_{n}", "post_id": f"{page_id}_{n}"}
+
+    @app.get("/me")
+    async def me():
+        await simulate()
+        return {"id": "2001", "username": "standin"}
+
+    @app.post("/{ig_user_id}/media")
+    async def media(ig_user_id: str):
+        return {"id": f"container-{await simulate()}"}
+
+    @app.get("/{container_id}")
+    async def container_status(container_id: str):
+        await simulate()
+        return {"id": container_id, "status_code": "FINISHED"}
+
+    @app.post("/{ig_user_id}/media_publish")
+    async def media_publish(ig_user_id: str):
+        return {"id": f"media-{await simulate()}"}
+
+    @app.get("/images/post.png")
+    async def image():
+        await simulate()
+        return Response(content=png, media_type="image/png")
+
+    return app
+
+def blocking_publish(client: httpx.Client, base_url: str, platform: str, image_url: str) -> str:
+    """The request sequence of a publish, made with a synchronous client."""
+    graph_url = f"{base_url}/{GRAPH_VERSION}"
+    if platform == "facebook":
+        page = client.get(f"{graph_url}/me/accounts", params={"access_token": "t"}).json()["data"][0]
+        image = client.get(image_url).content
+        data = {"message": "hello", "access_token": page["access_token"]}
+        return client.post(f"{graph_url}/{page['id']}/photos", data=data, files={"source": image}).json()["id"]
+
+    ig_user = client.get(f"{base_url}/me", params={"fields": "id,username", "access_token": "t"}).json()["id"]
+    container = client.post(f"{base_url}/{ig_user}/media", data={"image_url": image_url, "access_token": "t"}).json()["id"]
+    return client.post(f"{base_url}/{ig_user}/media_publish", data={"creation_id": container, "access_token": "t"}).json()["id"]
+
+async def run(mode: str, base_url: str, args) -> dict:
+    image_url = f"{base_url}/images/post.png"
+
+    async def token_manager(user_id, platform, db):
+        return "user-token"
+
+    facebook = FacebookPostingService(token_manager=token_manager)
+    facebook.base_url = f"{base_url}/{GRAPH_VERSION}"
+    instagram = InstagramPostingService(token_manager=token_manager)
+    instagram.base_url = base_url
+    sync_client = httpx.Client(timeout=30)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, lags = [], []
+    errors = 0
+    done = asyncio.Event()
+
+    async def probe():
+        tick = args.tick_ms / 1000.0
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(tick)
+            lags.append(time.perf_counter() - start - tick)
+
+    async def one(i: int):
+        nonlocal errors
+        platform = "facebook" if i % 2 == 0 else "instagram"
+        # Stand-in for the page resolved at OAuth time (no token rows in this benchmark)
+        facebook_page_cache.set(f"user-{i}", {"id": "1001", "name": "Stand-in Page", "access_token": "page-token"})
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if mode == "blocking":
+                    blocking_publish(sync_client, base_url, platform, image_url)
+                elif platform == "facebook":
+                    await facebook.post_content(f"user-{i}", "hello", image_url)
+                else:
+                    await instagram.post_content(f"user-{i}", "hello", image_url)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    probe_task = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.publishes)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe_task
+    sync_client.close()
+
+    latencies.sort()
+    lags.sort()
+    return {
+        "publishes_per_sec": round(args.publishes / elapsed, 1),
+        "publish_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "publish_p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "lag_p50_ms": round(percentile(lags, 50) * 1000, 1),
+        "lag_p99_ms": round(percentile(lags, 99) * 1000, 1),
+        "lag_max_ms": round(lags[-1] * 1000, 1),
+        "errors": errors
+    }
+
+async def main_async(args):
+    # Quotas would throttle the synthetic users; this measures I/O only
+    rate_limiter.enabled = False
+    median, _, sigma = args.latency.partition(":")
+    app = create_graph_app(float(median), float(sigma or 0.3))
+    # Own thread and loop, so the blocking run can't stall the stand-in as well
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    server_thread = threading.Thread(target=server.run, daemon=True)
+    server_thread.start()
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        results = {
+            "blocking": await run("blocking", base_url, args),
+            "async": await run("async", base_url, args)
+        }
+    finally:
+        await platform_http.close()
+        server.should_exit = True
+        server_thread.join()
+
+    print(f"\n{args.publishes} publishes (Facebook photo / Instagram alternating), concurrency "
+          f"{args.concurrency}, Graph latency {args.latency} ms, probe tick {args.tick_ms} ms\n")
+    header = (f"{'':<10}{'pub/s':>8}{'pub p50':>10}{'pub p95':>10}"
+              f"{'lag p50':>10}{'lag p99':>10}{'lag max':>10}{'errors':>8}")
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(
+            f"{name:<10}{r['publishes_per_sec']:>8}{r['publish_p50_ms']:>10}{r['publish_p95_ms']:>10}"
+            f"{r['lag_p50_ms']:>10}{r['lag_p99_ms']:>10}{r['lag_max_ms']:>10}{r['errors']:>8}"
+        )
+    print("\nlatency and lag in ms; lag is how late a sleeping task wakes up while publishes run")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark event loop lag during Facebook/Instagram publishes")
+    parser.add_argument("--publishes", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", default="80:0.3", metavar="MEDIAN_MS[:SIGMA]")
+    parser.add_argument("--tick-ms", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=5681)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Benchmark hedged n8n requests against the local stand-in.
+
+Starts `n8n_standin.py` in-process with a long-tailed regenerate-text webhook, then
+sends the same workload through an `N8NClient` with hedging off and on and reports
+p50/p95/p99 latency plus how many extra webhook calls the hedges cost.
+
+Usage:
+    cd backend
+    python3 scripts/bench_hedging.py --requests 400 --concurrency 10 \
+        --latency 300:0.3 --tail 0.05:3000
+
+Hedge percentile and retry budget come from the usual N8N_HEDGE_* and
+N8N_RETRY_BUDGET_* environment variables.
+"""
+import argparse
+import asyncio
+import math
+import os
+import sys
+import time
+
+# The client module pulls in the database layer; the benchmark never touches it
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import httpx
+import uvicorn
+from n8n_standin import DEFAULT_LATENCY, create_app, parse_latency, parse_tail
+from app.services.n8n_client import N8NClient, N8N_REGENERATE_WEBHOOK
+
+def percentile(sorted_values: list, pct: float) -> float:
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+async def stand_in_calls(base_url: str) -> int:
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        response = await client.get("/stats")
+        return response.json()["regenerate-text"]["calls"]
+
+async def run(client: N8NClient, base_url: str, args) -> dict:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i: int, record: bool):
+        nonlocal errors
+        payload = {
+            "content_type": "post",
+            "existing_content": "Stand-in post",
+            "user_suggestions": f"variant {i}"
+        }
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await client.post(N8N_REGENERATE_WEBHOOK, payload, hedge=True)
+            except Exception:
+                if record:
+                    errors += 1
+            if record:
+                latencies.append(time.perf_counter() - start)
+
+    # Warm up so the hedge delay is based on observed latency rather than the default
+    await asyncio.gather(*(one(i, False) for i in range(args.warmup)))
+    calls_before = await stand_in_calls(base_url)
+    await asyncio.gather(*(one(i, True) for i in range(args.requests)))
+    calls = await stand_in_calls(base_url) - calls_before
+    await client.close()
+
+    latencies.sort()
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "errors": errors,
+        "webhook_calls": calls,
+        "extra_load_pct": round((calls - args.requests) / args.requests * 100, 1),
+        "hedging": client.hedging_snapshot() if client.hedging else None
+    }
+
+async def main_async(args):
+    latency = dict(DEFAULT_LATENCY)
+    latency["regenerate-text"] = parse_latency(args.latency)
+    app = create_app(
+        latency,
+        {"regenerate-text": args.error_rate},
+        tails={"regenerate-text": parse_tail(args.tail)}
+    )
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        results = {
+            "hedging off": await run(N8NClient(base_url, hedging=False), base_url, args),
+            "hedging on": await run(N8NClient(base_url, hedging=True), base_url, args)
+        }
+    finally:
+        server.should_exit = True
+        await server_task
+
+    print(f"\n{args.requests} regenerate-text calls, concurrency {args.concurrency}, "
+          f"latency {args.latency} ms, tail {args.tail}\n")
+    header = f"{'':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}{'n8n calls':>11}{'extra load':>12}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(
+            f"{name:<14}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['errors']:>8}"
+            f"{r['webhook_calls']:>11}{str(r['extra_load_pct']) + '%':>12}"
+        )
+    hedging = results["hedging on"]["hedging"]
+    print(f"\nhedges {hedging['hedges']}, retries {hedging['retries']}, hedge wins {hedging['hedge_wins']}, "
+          f"budget exhausted {hedging['retry_budget']['exhausted']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hedged n8n regenerate-text calls")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", default="300:0.3", metavar="MEDIAN_MS[:SIGMA]")
+    parser.add_argument("--tail", default="0.05:3000", metavar="PROBABILITY:EXTRA_MS")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=5680)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Load driver for the posts router.
+
+Signs up a throwaway user, seeds an approved summary with platform posts, then drives
+the generation endpoints concurrently for a fixed duration and reports throughput and
+p50/p95/p99 latency per endpoint. Point the backend at `n8n_standin.py` so no Gemini
+or DALL-E quota is used.
+
+Usage:
+    python3 backend/scripts/n8n_standin.py --port 5679 &
+    N8N_BASE_URL=http://localhost:5679 uvicorn app.main:app --port 8000 &
+    python3 backend/scripts/loadtest_posts.py --base-url http://localhost:8000 \
+        --concurrency 20 --duration 30 --endpoints summary,regenerate-text
+
+Requests use unique topics and suggestions so every call reaches n8n; pass
+--cacheable to repeat identical payloads and measure the generation cache instead.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import sys
+import time
+import uuid
+from collections import defaultdict
+import httpx
+
+ENDPOINTS = ["summary", "content", "regenerate-text", "regenerate-image"]
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.client = httpx.AsyncClient(
+            base_url=args.base_url.rstrip("/"),
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=args.concurrency * 2)
+        )
+        self.summary_id = None
+        self.platform_ids = []
+        self.counter = itertools.count()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+
+    async def setup(self):
+        email = self.args.email or f"loadtest+{uuid.uuid4().hex[:12]}@example.com"
+        if not self.args.email:
+            # Login below is the real check: signup can fail to serialize the stored
+            # preferences after the user has already been created, and the server then
+            # drops the connection, so keep it off the shared client
+            async with httpx.AsyncClient(base_url=self.client.base_url, timeout=self.args.timeout) as signup_client:
+                await signup_client.post("/auth/signup", json={
+                    "name": "Load Test",
+                    "email": email,
+                    "password": self.args.password,
+                    "preferences": ["technology", "marketing"]
+                })
+
+        response = await self.client.post("/auth/login", json={"email": email, "password": self.args.password})
+        response.raise_for_status()
+        self.client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+        # Seed an approved summary with platform posts for the regenerate endpoints
+        response = await self.client.post("/posts/generate-summary", json={"topic": f"load test seed {uuid.uuid4().hex[:8]}"})
+        response.raise_for_status()
+        self.summary_id = response.json()["summary_id"]
+
+        response = await self.client.post("/posts/approve-summary", json={"summary_id": self.summary_id})
+        response.raise_for_status()
+
+        response = await self.client.post("/posts/generate-content", json={
+            "summary_id": self.summary_id,
+            "platforms": self.args.platforms
+        })
+        response.raise_for_status()
+        self.platform_ids = [p["platform_id"] for p in response.json().get("platforms", [])]
+        if not self.platform_ids:
+            raise RuntimeError("Seeding content returned no platform posts")
+
+    def unique(self) -> str:
+        return "same" if self.args.cacheable else f"{next(self.counter)}-{uuid.uuid4().hex[:8]}"
+
+    def build_request(self, endpoint: str, n: int):
+        if endpoint == "summary":
+            return "/posts/generate-summary", {"topic": f"load test topic {self.unique()}"}
+        if endpoint == "content":
+            return "/posts/generate-content", {
+                "summary_id": self.summary_id,
+                "platforms": self.args.platforms,
+                "bypass_cache": not self.args.cacheable
+            }
+        if endpoint == "regenerate-text":
+            return "/posts/regenerate-text", {
+                "platform_id": self.platform_ids[n % len(self.platform_ids)],
+                "content_type": "post",
+                "user_suggestions": f"make it punchier {self.unique()}"
+            }
+        return "/posts/regenerate-image", {
+            "platform_id": self.platform_ids[n % len(self.platform_ids)],
+            "user_suggestions": f"brighter colours {self.unique()}"
+        }
+
+    async def worker(self, endpoints: list, deadline: float, offset: int):
+        for n in itertools.count(offset):
+            if time.monotonic() >= deadline:
+                return
+            endpoint = endpoints[n % len(endpoints)]
+            path, body = self.build_request(endpoint, n)
+            start = time.perf_counter()
+            try:
+                response = await self.client.post(path, json=body)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+
+            self.latencies[endpoint].append(elapsed)
+            if status != 200:
+                self.errors[endpoint][str(status)] += 1
+
+    async def run(self) -> dict:
+        await self.setup()
+        endpoints = self.args.endpoints
+        start = time.monotonic()
+        deadline = start + self.args.duration
+        await asyncio.gather(*(
+            self.worker(endpoints, deadline, i) for i in range(self.args.concurrency)
+        ))
+        wall = time.monotonic() - start
+        await self.client.aclose()
+        return self.report(wall)
+
+    def report(self, wall: float) -> dict:
+        results = {}
+        for endpoint in self.args.endpoints:
+            values = sorted(self.latencies[endpoint])
+            errors = sum(self.errors[endpoint].values())
+            results[endpoint] = {
+                "requests": len(values),
+                "errors": errors,
+                "error_breakdown": dict(self.errors[endpoint]),
+                "throughput_rps": round(len(values) / wall, 2) if wall else 0.0,
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1) if values else 0.0
+            }
+        return {
+            "duration_seconds": round(wall, 2),
+            "concurrency": self.args.concurrency,
+            "endpoints": results
+        }
+
+def print_report(report: dict):
+    print(f"\nDuration {report['duration_seconds']}s, concurrency {report['concurrency']}\n")
+    header = f"{'endpoint':<18}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for endpoint, r in report["endpoints"].items():
+        print(
+            f"{endpoint:<18}{r['requests']:>9}{r['errors']:>8}{r['throughput_rps']:>9}"
+            f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['max_ms']:>10}"
+        )
+        if r["error_breakdown"]:
+            print(f"{'':<18}errors by status: {r['error_breakdown']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the posts router")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to drive load for")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS),
+                        help=f"Comma-separated subset of: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--platforms", default="x,linkedin,facebook,instagram",
+                        help="Comma-separated platforms for content generation")
+    parser.add_argument("--email", help="Log in as an existing user instead of signing up")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--cacheable", action="store_true", help="Repeat identical payloads")
+    parser.add_argument("--json", metavar="PATH", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    args.endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = [e for e in args.endpoints if e not in ENDPOINTS]
+    if unknown:
+        print(f"Unknown endpoints: {', '.join(unknown)}")
+        sys.exit(1)
+    args.platforms = [p.strip() for p in args.platforms.split(",") if p.strip()]
+
+    report = asyncio.run(LoadTest(args).run())
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
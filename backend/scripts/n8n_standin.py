@@ -0,0 +1,201 @@
+"""Local stand-in for the n8n workflows used by the posts router.
+
+Serves the summary, generate-posts, regenerate-text, regenerate-image and publish
+webhooks with responses shaped like the real workflows in `n8n/*.json`, but without
+calling Gemini or DALL-E. Latency is drawn from a log-normal distribution per webhook,
+and configurable fractions of calls fail with a 500 or stall behind a simulated n8n
+queue (a long latency tail), so the backend can be load tested without burning API
+quota. Generated "image url" values point back at this server, which serves a real
+PNG for them.
+
+Usage:
+    python3 backend/scripts/n8n_standin.py --port 5679 \
+        --latency summary=800:0.5 --latency generate-posts=2500 --error-rate summary=0.02 \
+        --tail regenerate-text=0.05:4000
+
+    # then start the backend against it
+    export N8N_BASE_URL=http://localhost:5679
+    uvicorn app.main:app --port 8000
+
+GET /stats returns per-webhook call, error and image generation counts.
+"""
+import argparse
+import asyncio
+import random
+import struct
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+import uvicorn
+
+# Default median latency (ms) and log-normal sigma per webhook
+DEFAULT_LATENCY = {
+    "summary": (800.0, 0.5),
+    "generate-posts": (2500.0, 0.5),
+    "regenerate-text": (700.0, 0.6),
+    "regenerate-image": (2000.0, 0.5),
+    "publish": (500.0, 0.4)
+}
+
+CONTENT_KEYS = {
+    "x": "X Post",
+    "twitter": "X Post",
+    "linkedin": "LinkedIn Post",
+    "facebook": "facebook Caption",
+    "instagram": "Instagram Caption",
+    "youtube": "youtube Caption"
+}
+
+def make_png(width: int, height: int, rgb=(66, 133, 244)) -> bytes:
+    """Build a solid-colour RGB PNG without any imaging library."""
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    row = b"\x00" + bytes(rgb) * width
+    raw = row * height
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw, 9))
+        + chunk(b"IEND", b"")
+    )
+
+def create_app(latency: dict, error_rates: dict, image_size: int = 1024, tails: dict = None) -> FastAPI:
+    app = FastAPI(title="n8n stand-in")
+    stats = {name: {"calls": 0, "errors": 0, "images": 0} for name in DEFAULT_LATENCY}
+    image_bytes = make_png(image_size, image_size)
+    tails = tails or {}
+
+    async def simulate(name: str):
+        """Sleep for a sampled latency; return an error response if this call should fail."""
+        stats[name]["calls"] += 1
+        median_ms, sigma = latency[name]
+        delay_ms = random.lognormvariate(0, sigma) * median_ms
+        tail_probability, tail_ms = tails.get(name, (0.0, 0.0))
+        if random.random() < tail_probability:
+            delay_ms += tail_ms
+        await asyncio.sleep(delay_ms / 1000.0)
+        if random.random() < error_rates.get(name, 0.0):
+            stats[name]["errors"] += 1
+            return JSONResponse(status_code=500, content={"message": "Workflow execution failed"})
+        return None
+
+    def image_url(request: Request) -> str:
+        # Signed-URL shape similar to the DALL-E blob links, with a short expiry
+        expiry = (datetime.now(timezone.utc) + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return f"{str(request.base_url).rstrip('/')}/images/{uuid.uuid4()}/generated_00.png?se={expiry}&sig=standin"
+
+    @app.post("/webhook/summary")
+    async def summary(request: Request):
+        body = await request.json()
+        error = await simulate("summary")
+        if error:
+            return error
+        return {
+            "summary": f"Stand-in summary about {body.get('topic', '')}: key trends, why they matter and what to do next.",
+            "user_id": body.get("user_id"),
+            "post_id": body.get("summary_id")
+        }
+
+    @app.post("/webhook/generate-posts")
+    async def generate_posts(request: Request):
+        body = await request.json()
+        error = await simulate("generate-posts")
+        if error:
+            return error
+        platforms = body.get("platforms", [])
+        result = {"Platforms": platforms}
+        for platform in platforms:
+            key = CONTENT_KEYS.get(str(platform).lower(), f"{str(platform).title()} Post")
+            result[key] = f"Stand-in {platform} post: {body.get('summary_text', '')[:120]}"
+        if body.get("generate_image") is not False:
+            # Like the postgen workflow: DALL-E runs once per platform unless the flag is false
+            stats["generate-posts"]["images"] += len(platforms)
+            result["image url"] = image_url(request)
+        return result
+
+    @app.post("/webhook/regenerate-text")
+    async def regenerate_text(request: Request):
+        body = await request.json()
+        error = await simulate("regenerate-text")
+        if error:
+            return error
+        text = f"Regenerated ({body.get('user_suggestions', '') or 'no suggestions'}): {body.get('existing_content', '')[:200]}"
+        if body.get("content_type") == "post":
+            return {"output": text}
+        return {"summary": text}
+
+    @app.post("/webhook/regenerate-image")
+    async def regenerate_image(request: Request):
+        await request.json()
+        error = await simulate("regenerate-image")
+        if error:
+            return error
+        stats["regenerate-image"]["images"] += 1
+        return {"image url": image_url(request)}
+
+    @app.post("/webhook/publish")
+    async def publish(request: Request):
+        body = await request.json()
+        error = await simulate("publish")
+        if error:
+            return error
+        return {
+            "status": "success",
+            "platform": body.get("platform_name"),
+            "post_id": body.get("platform_id"),
+            "user_id": body.get("user_id")
+        }
+
+    @app.get("/images/{image_id}/{filename}")
+    async def image(image_id: str, filename: str):
+        return Response(content=image_bytes, media_type="image/png")
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+def parse_pairs(values, cast):
+    result = {}
+    for value in values or []:
+        name, _, raw = value.partition("=")
+        if name not in DEFAULT_LATENCY:
+            raise SystemExit(f"Unknown webhook '{name}'. Choose from: {', '.join(DEFAULT_LATENCY)}")
+        result[name] = cast(raw)
+    return result
+
+def parse_latency(raw: str):
+    median, _, sigma = raw.partition(":")
+    return float(median), float(sigma) if sigma else 0.5
+
+def parse_tail(raw: str):
+    probability, _, extra_ms = raw.partition(":")
+    return float(probability), float(extra_ms or 0)
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the n8n webhooks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5679)
+    parser.add_argument("--latency", action="append", metavar="WEBHOOK=MEDIAN_MS[:SIGMA]",
+                        help="Log-normal latency for a webhook (repeatable)")
+    parser.add_argument("--error-rate", action="append", metavar="WEBHOOK=RATE",
+                        help="Fraction of calls that fail with 500 (repeatable)")
+    parser.add_argument("--tail", action="append", metavar="WEBHOOK=PROBABILITY:EXTRA_MS",
+                        help="Fraction of calls delayed by an extra queueing stall (repeatable)")
+    parser.add_argument("--image-size", type=int, default=1024, help="Width/height of served PNGs")
+    args = parser.parse_args()
+
+    latency = dict(DEFAULT_LATENCY)
+    latency.update(parse_pairs(args.latency, parse_latency))
+    error_rates = parse_pairs(args.error_rate, float)
+    tails = parse_pairs(args.tail, parse_tail)
+
+    uvicorn.run(create_app(latency, error_rates, args.image_size, tails), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()